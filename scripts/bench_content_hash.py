@@ -0,0 +1,78 @@
+"""
+Compare the full-page content hash with the product-region fingerprint.
+
+Uses the saved parser fixtures. For each pair of page loads it reports whether
+each hash treats the pair as unchanged, then times both hashes. The
+fingerprint reuses the tree that price parsing already built, so its cost is
+timed on a document whose tree is already built.
+
+    python scripts/bench_content_hash.py [--rounds 200]
+"""
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from services.scraper_worker.parsers.amazon import AmazonParser  # noqa: E402
+from services.scraper_worker.parsers.document import ParsedDocument  # noqa: E402
+from services.scraper_worker.parsers.flipkart import FlipkartParser  # noqa: E402
+
+FIXTURES = ROOT / "services" / "scraper_worker" / "tests" / "fixtures"
+
+# (parser, first load, second load, product region actually unchanged?)
+PAIRS = [
+    (AmazonParser(), "amazon_run1.html", "amazon_run2.html", True),
+    (AmazonParser(), "amazon_run1.html", "amazon_price_drop.html", False),
+    (FlipkartParser(), "flipkart_run1.html", "flipkart_run2.html", True),
+    (FlipkartParser(), "flipkart_run1.html", "flipkart_out_of_stock.html", False),
+]
+
+
+def load(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rounds", type=int, default=200)
+    args = ap.parse_args()
+
+    full_hits = region_hits = correct_full = correct_region = 0
+    print(f"{'pair':<55} {'expect':>8} {'full':>8} {'region':>8}")
+    for parser, a, b, same in PAIRS:
+        html_a, html_b = load(a), load(b)
+        full_same = parser.compute_content_hash(html_a) == parser.compute_content_hash(html_b)
+        region_same = (
+            parser.compute_fingerprint(ParsedDocument(html_a))
+            == parser.compute_fingerprint(ParsedDocument(html_b))
+        )
+        full_hits += full_same
+        region_hits += region_same
+        correct_full += full_same == same
+        correct_region += region_same == same
+        print(f"{a + ' vs ' + b:<55} {str(same):>8} {str(full_same):>8} {str(region_same):>8}")
+
+    expected_hits = sum(same for *_, same in PAIRS)
+    print()
+    print(f"unchanged hits: full {full_hits}/{expected_hits}, region {region_hits}/{expected_hits}")
+    print(f"correct verdicts: full {correct_full}/{len(PAIRS)}, region {correct_region}/{len(PAIRS)}")
+
+    print()
+    print(f"{'fixture':<30} {'full us':>10} {'region us':>10} {'tree us':>10}")
+    for parser, name in {(type(p), a): (p, a) for p, a, *_ in PAIRS}.values():
+        html = load(name)
+        doc = ParsedDocument(html)
+        # The fingerprint reads the lxml tree, so build it outside the timing
+        doc.tree
+        full = timeit.timeit(lambda: parser.compute_content_hash(html), number=args.rounds)
+        region = timeit.timeit(lambda: parser.compute_fingerprint(doc), number=args.rounds)
+        parse = timeit.timeit(lambda: ParsedDocument(html).tree, number=args.rounds)
+        scale = 1e6 / args.rounds
+        print(f"{name:<30} {full * scale:>10.1f} {region * scale:>10.1f} {parse * scale:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
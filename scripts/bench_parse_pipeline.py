@@ -0,0 +1,166 @@
+"""
+Per-page CPU time of the parse pipeline: CAPTCHA check, price extraction and
+content hash.
+
+Three pipelines are compared:
+
+- "legacy" runs each stage on the raw HTML the way the worker used to. The
+  CAPTCHA check lowercases the whole page and scans it for seven markers,
+  the parser builds a BeautifulSoup tree, and the full-page hash encodes the
+  HTML again.
+- "shared" builds one ParsedDocument per page and hands it to all three
+  stages, still extracting through BeautifulSoup.
+- "plans" is the worker today: the shared document queried through the
+  parsers' compiled XPath plans on an lxml tree.
+
+Pages are the parser fixtures as saved, and the same pages padded with
+recommendation-style markup to about the size of a real product page
+(``--pad-kb``). Per-stage times for "plans" follow the totals.
+
+    python scripts/bench_parse_pipeline.py [--rounds 100] [--pad-kb 600]
+"""
+import argparse
+import hashlib
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from services.scraper_worker.parsers.amazon import AmazonParser  # noqa: E402
+from services.scraper_worker.parsers.document import ParsedDocument  # noqa: E402
+from services.scraper_worker.parsers.flipkart import FlipkartParser  # noqa: E402
+
+FIXTURES = ROOT / "services" / "scraper_worker" / "tests" / "fixtures"
+
+PAGES = [
+    (AmazonParser(), "amazon_run1.html"),
+    (AmazonParser(), "amazon_price_drop.html"),
+    (FlipkartParser(), "flipkart_run1.html"),
+    (FlipkartParser(), "flipkart_out_of_stock.html"),
+]
+
+# Carousel card with non-ASCII prices and inline script, like the
+# recommendation widgets that make up most of a real product page
+NOISE = (
+    '<div class="a-carousel-card" data-asin="B0{i:08d}"><a href="/dp/B0{i:08d}">'
+    '<img alt="Sponsored product {i}" src="https://m.media-amazon.com/images/I/{i}.jpg">'
+    '<span class="p13n-sc-price">₹{i},499</span></a>'
+    '<script>P.when("A").execute(function(A){{A.state("card-{i}", {{"rank": {i}}});}});</script></div>\n'
+)
+
+LEGACY_CAPTCHA_CHECKS = [
+    "recaptcha", "g-recaptcha", "captcha", "cf-chl-manual-challenge",
+    "verify you are human", "robot check", "security check",
+]
+
+
+def load(name: str, pad_kb: int) -> str:
+    html = (FIXTURES / name).read_text(encoding="utf-8")
+    if not pad_kb:
+        return html
+    cards, i = [], 0
+    while sum(len(c) for c in cards) < pad_kb * 1024:
+        cards.append(NOISE.format(i=i))
+        i += 1
+    return html.replace("</body>", "".join(cards) + "</body>")
+
+
+def soup_document(html: str) -> ParsedDocument:
+    """A document without the lxml tree, so every stage uses BeautifulSoup."""
+    doc = ParsedDocument(html)
+    doc.__dict__["tree"] = None  # pre-seeds the cached_property
+    return doc
+
+
+def legacy(parser, html: str):
+    low = html.lower()
+    if any(k in low for k in LEGACY_CAPTCHA_CHECKS):
+        return None
+    result = parser.parse_price(soup_document(html))
+    return result, hashlib.sha256(html.encode()).hexdigest()[:16]
+
+
+def run_pipeline(parser, doc: ParsedDocument):
+    if parser.detect_captcha(doc):
+        return None
+    return parser.parse_price(doc), parser.compute_content_hash(doc)
+
+
+def shared(parser, html: str):
+    return run_pipeline(parser, soup_document(html))
+
+
+def plans(parser, html: str):
+    return run_pipeline(parser, ParsedDocument(html))
+
+
+PIPELINES = (("legacy", legacy), ("shared", shared), ("plans", plans))
+
+
+def cpu_us(fn, parser, html: str, rounds: int, repeat: int = 5) -> float:
+    """Best of ``repeat`` batches, so GC pauses and noise do not decide it."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        for _ in range(rounds):
+            fn(parser, html)
+        best = min(best, time.process_time() - start)
+    return best / rounds * 1e6
+
+
+def stages_us(parser, html: str, rounds: int) -> dict:
+    """Where the "plans" time goes, stage by stage on fresh documents."""
+    totals = dict.fromkeys(("captcha", "tree", "price", "fingerprint", "hash"), 0.0)
+    for _ in range(rounds):
+        doc = ParsedDocument(html)
+        for stage, fn in (
+            ("captcha", lambda: parser.detect_captcha(doc)),
+            ("tree", lambda: doc.tree),
+            ("price", lambda: parser._extract_fast(doc)),
+            ("fingerprint", lambda: parser.compute_fingerprint(doc)),
+            ("hash", lambda: parser.compute_content_hash(doc)),
+        ):
+            start = time.process_time()
+            fn()
+            totals[stage] += time.process_time() - start
+    return {stage: total / rounds * 1e6 for stage, total in totals.items()}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rounds", type=int, default=100)
+    ap.add_argument("--pad-kb", type=int, default=600)
+    args = ap.parse_args()
+
+    runs = []
+    for pad_kb in (0, args.pad_kb):
+        rounds = args.rounds if not pad_kb else max(1, args.rounds // 50)
+        for parser, name in PAGES:
+            html = load(name, pad_kb)
+            # Same price, method and fingerprint whichever path runs
+            assert legacy(parser, html) == shared(parser, html) == plans(parser, html)
+            label = name if not pad_kb else f"{name} +{pad_kb}KB"
+            runs.append((label, parser, html, rounds))
+
+    header = " ".join(f"{name + ' us':>10}" for name, _ in PIPELINES)
+    print(f"{'page':<36} {'size KB':>8} {header} {'speedup':>8} {'pages/s':>8}")
+    for label, parser, html, rounds in runs:
+        times = [cpu_us(fn, parser, html, rounds) for _, fn in PIPELINES]
+        cells = " ".join(f"{t:>10.0f}" for t in times)
+        print(
+            f"{label:<36} {len(html.encode()) / 1024:>8.0f} {cells} "
+            f"{times[0] / times[-1]:>7.1f}x {1e6 / times[-1]:>8.0f}"
+        )
+
+    print()
+    columns = ("captcha", "tree", "price", "fingerprint", "hash")
+    print(f"{'plans, per stage (us)':<36} " + " ".join(f"{c:>11}" for c in columns))
+    for label, parser, html, rounds in runs:
+        stages = stages_us(parser, html, rounds)
+        print(f"{label:<36} " + " ".join(f"{stages[c]:>11.0f}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Measure the request rate the shared token bucket actually admits.
+
+Starts several simulated workers, each with its own Redis connection pool as
+separate replicas would have. They hammer one domain for a fixed time and
+sleep whatever wait the limiter returns. Prints the achieved rate next to
+the configured one. The expected admits are rate * duration + burst; more
+than that would mean the limiter is leaking under contention.
+
+    REDIS_URL=redis://localhost:6379/15 python scripts/bench_rate_limiter.py \
+        --workers 8 --rate 5 --burst 2 --duration 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from services.scraper_worker.rate_limiter import RateLimiter  # noqa: E402
+from services.scraper_worker.redis_client import create_redis  # noqa: E402
+
+
+async def worker(limiter: RateLimiter, domain: str, proxies, deadline: float, stats: dict):
+    while time.monotonic() < deadline:
+        proxy = random.choice(proxies) if proxies else None
+        wait = await limiter.acquire(domain, proxy)
+        if wait > 0:
+            stats["throttled"] += 1
+            await asyncio.sleep(min(wait, max(0.0, deadline - time.monotonic())))
+            continue
+        stats["admitted"] += 1
+
+
+async def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--rate", type=float, default=5.0, help="domain tokens per second")
+    ap.add_argument("--burst", type=float, default=2.0)
+    ap.add_argument("--proxies", type=int, default=0, help="also limit per proxy+domain")
+    ap.add_argument("--proxy-rate", type=float, default=2.0)
+    ap.add_argument("--duration", type=float, default=20.0)
+    ap.add_argument("--redis-url", default=os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    args = ap.parse_args()
+
+    domain = f"bench-{uuid.uuid4().hex[:8]}.example"
+    proxies = [f"http://proxy{i}.bench:8080" for i in range(args.proxies)]
+    clients = [create_redis(args.redis_url) for _ in range(args.workers)]
+    limiters = [
+        RateLimiter(c, rate=args.rate, burst=args.burst, proxy_rate=args.proxy_rate, proxy_burst=1)
+        for c in clients
+    ]
+    stats = {"admitted": 0, "throttled": 0}
+
+    start = time.monotonic()
+    deadline = start + args.duration
+    await asyncio.gather(*(worker(lim, domain, proxies, deadline, stats) for lim in limiters))
+    elapsed = time.monotonic() - start
+
+    configured = args.rate
+    if proxies:
+        configured = min(configured, args.proxy_rate * len(proxies))
+    expected = configured * elapsed + args.burst
+    print(f"workers={args.workers} proxies={len(proxies)} duration={elapsed:.1f}s")
+    print(f"configured rate: {configured:.2f}/s (burst {args.burst:g})")
+    print(f"achieved rate:   {stats['admitted'] / elapsed:.2f}/s")
+    print(f"admitted {stats['admitted']} (ceiling {expected:.0f}), throttled {stats['throttled']}")
+
+    await clients[0].delete(
+        f"rate_limit:bucket:{domain}", *(f"rate_limit:bucket:{domain}:{p}" for p in proxies)
+    )
+    for client in clients:
+        await client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -17,10 +17,17 @@ CREATE TABLE IF NOT EXISTS targets (
   url TEXT NOT NULL,
   site_sku TEXT,
   active BOOLEAN DEFAULT TRUE,
+  -- Business weight for scrape frequency (higher = checked more often)
+  priority REAL NOT NULL DEFAULT 1.0,
+  -- When the scheduler should next queue this target
+  next_due_at TIMESTAMPTZ NOT NULL DEFAULT now(),
   created_at TIMESTAMPTZ DEFAULT now(),
   UNIQUE(product_id, domain)
 );
 
+ALTER TABLE targets ADD COLUMN IF NOT EXISTS priority REAL NOT NULL DEFAULT 1.0;
+ALTER TABLE targets ADD COLUMN IF NOT EXISTS next_due_at TIMESTAMPTZ NOT NULL DEFAULT now();
+
 -- Price history
 CREATE TABLE IF NOT EXISTS price_history (
   id BIGSERIAL PRIMARY KEY,
@@ -34,9 +41,16 @@ CREATE TABLE IF NOT EXISTS price_history (
   user_agent TEXT,
   response_time_ms INT,
   content_hash TEXT,
+  -- Unchanged scrapes bump these instead of inserting a new row
+  last_seen_at TIMESTAMPTZ DEFAULT now(),
+  observation_count INT NOT NULL DEFAULT 1,
   created_at TIMESTAMPTZ DEFAULT now()
 );
 
+-- Upgrade path for databases created before change detection
+ALTER TABLE price_history ADD COLUMN IF NOT EXISTS last_seen_at TIMESTAMPTZ DEFAULT now();
+ALTER TABLE price_history ADD COLUMN IF NOT EXISTS observation_count INT NOT NULL DEFAULT 1;
+
 -- Scraper job log / audit
 CREATE TABLE IF NOT EXISTS scrape_jobs (
   id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -60,6 +74,7 @@ CREATE TABLE IF NOT EXISTS alerts (
 
 -- Create indexes for performance
 CREATE INDEX IF NOT EXISTS idx_price_history_target_scraped ON price_history(target_id, scraped_at DESC);
+CREATE INDEX IF NOT EXISTS idx_targets_next_due ON targets(next_due_at) WHERE active = TRUE;
 CREATE INDEX IF NOT EXISTS idx_scrape_jobs_status ON scrape_jobs(status, created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_alerts_resolved ON alerts(resolved, created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_alerts_payload ON alerts USING GIN(payload);
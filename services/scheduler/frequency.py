@@ -0,0 +1,100 @@
+import hashlib
+import math
+import os
+import random
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+DAY = 86400.0
+
+
+def parse_domain_costs(raw: str) -> Dict[str, float]:
+    """Parse "amazon.in=2,flipkart.com=1.5" into a cost per domain."""
+    costs = {}
+    for item in (raw or "").split(","):
+        domain, _, cost = item.partition("=")
+        if domain.strip() and cost.strip():
+            costs[domain.strip()] = float(cost)
+    return costs
+
+
+def phase(target_id) -> float:
+    """Stable position in [0, 1) for a target, used to spread its slots."""
+    digest = hashlib.blake2b(str(target_id).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2**64
+
+
+@dataclass
+class ChangeStats:
+    """Price changes seen for a target over ``observed_seconds`` of history."""
+
+    changes: int = 0
+    observed_seconds: float = 0.0
+
+
+class FrequencyPolicy:
+    """
+    Scrape interval per target from its change rate, domain cost and priority.
+
+    A change waits on average half an interval I before we detect it, so with
+    change rate r and priority w, staleness costs r * w * I / 2 per second,
+    while fetching costs c / I. The sum is smallest at I = sqrt(2c / (r * w)).
+    ``base_interval`` is the interval for a target changing once a day at unit
+    cost and priority, and the result is clamped to [min_interval, max_interval].
+
+    The change rate is a smoothed estimate: one change per ``prior_seconds``
+    is mixed in, so new targets start at the base interval and a couple of
+    quiet days do not push a target straight to the maximum.
+
+    ``next_delay`` places each scrape on a per-target grid offset by a hash of
+    the target id, plus up to ``jitter`` of the interval either way. Targets
+    that became due together (e.g. added in one import) end up spread across
+    their interval instead of being dispatched in the same cycle forever.
+    """
+
+    def __init__(
+        self,
+        base_interval: float = None,
+        min_interval: float = None,
+        max_interval: float = None,
+        domain_costs: Dict[str, float] = None,
+        prior_seconds: float = DAY,
+        jitter: float = None,
+    ):
+        self.base_interval = base_interval or float(os.getenv("SCHEDULER_BASE_INTERVAL_SECONDS", "1800"))
+        self.min_interval = min_interval or float(os.getenv("SCHEDULER_MIN_INTERVAL_SECONDS", "300"))
+        self.max_interval = max_interval or float(os.getenv("SCHEDULER_MAX_INTERVAL_SECONDS", "21600"))
+        self.domain_costs = (
+            domain_costs
+            if domain_costs is not None
+            else parse_domain_costs(os.getenv("SCHEDULER_DOMAIN_COSTS", ""))
+        )
+        self.prior_seconds = prior_seconds
+        self.jitter = jitter if jitter is not None else float(os.getenv("SCHEDULER_JITTER_RATIO", "0.1"))
+
+    def change_rate(self, stats: Optional[ChangeStats]) -> float:
+        """Estimated price changes per second."""
+        stats = stats or ChangeStats()
+        return (stats.changes + 1) / (max(stats.observed_seconds, 0.0) + self.prior_seconds)
+
+    def interval_for(
+        self,
+        stats: Optional[ChangeStats],
+        priority: Optional[float] = None,
+        domain: str = "",
+    ) -> float:
+        cost = self.domain_costs.get(domain, 1.0)
+        weight = max(float(priority or 1.0), 1e-3)
+        relative_rate = self.change_rate(stats) * DAY
+        interval = self.base_interval * math.sqrt(cost / (weight * relative_rate))
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def next_delay(self, target_id, interval: float, now: float) -> float:
+        """
+        Seconds from ``now`` until the target's next slot: the first point on
+        its phase-shifted grid at least half an interval away (so the delay
+        averages ``interval``), then jittered.
+        """
+        offset = phase(target_id) * interval
+        slot = math.ceil((now + interval / 2 - offset) / interval) * interval + offset
+        return slot - now + random.uniform(-self.jitter, self.jitter) * interval
@@ -1,6 +1,7 @@
 import asyncio
 import logging
 import os
+import time
 
 from dotenv import load_dotenv
 from prometheus_client import Counter, Gauge, start_http_server
@@ -14,25 +15,42 @@ logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
 )
 
+CYCLES = Counter("scheduler_cycles_total", "Scheduler cycles completed")
+LAST_TARGETS = Gauge(
+    "scheduler_last_targets_count",
+    "Number of targets enqueued in last cycle",
+)
+
 
 class SchedulerService:
-    def __init__(self, interval_seconds: int | None = None):
+    def __init__(
+        self,
+        interval_seconds: int | None = None,
+        staleness_interval_seconds: int | None = None,
+        clock=time.monotonic,
+    ):
         load_dotenv()
         self.interval = interval_seconds or int(
-            os.getenv("SCHEDULER_INTERVAL_SECONDS", "300")
+            os.getenv("SCHEDULER_INTERVAL_SECONDS", "30")
         )
-        self.tasks = SchedulerTasks()
-        self.cycles_counter = Counter(
-            "scheduler_cycles_total", "Scheduler cycles completed"
-        )
-        self.targets_gauge = Gauge(
-            "scheduler_last_targets_count",
-            "Number of targets enqueued in last cycle",
+        # The staleness query scans a day of price history, so it runs on its
+        # own, much slower timer instead of every dispatch cycle
+        self.staleness_interval = staleness_interval_seconds or int(
+            os.getenv("SCHEDULER_STALENESS_INTERVAL_SECONDS", "900")
         )
+        self._clock = clock
+        self._staleness_due = 0.0
+        self.tasks = SchedulerTasks()
+        self.cycles_counter = CYCLES
+        self.targets_gauge = LAST_TARGETS
 
     async def run_once(self) -> int:
         """Trigger a single scheduling cycle."""
         count = await asyncio.to_thread(self.tasks.enqueue_targets)
+        now = self._clock()
+        if now >= self._staleness_due:
+            self._staleness_due = now + self.staleness_interval
+            await asyncio.to_thread(self.tasks.report_change_staleness)
         logger.info("Scheduler cycle complete: %s targets", count)
         self.cycles_counter.inc()
         self.targets_gauge.set(count)
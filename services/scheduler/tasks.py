@@ -1,50 +1,250 @@
 import logging
-from typing import Dict
+import os
+import time
+from typing import Dict, List, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from psycopg2.extras import RealDictCursor
 
 from services.scraper_worker.db_manager import DBManager
+from services.scraper_worker.job_queue import JobPublisher, MODE_QUEUE
+
+from .frequency import ChangeStats, FrequencyPolicy
 
 
 logger = logging.getLogger(__name__)
 
+FETCHES = Counter(
+    "scheduler_fetches_total",
+    "Fetches dispatched, and fetches a fixed reference cadence would have made",
+    ["result"],
+)
+BUDGET_SAVED = Gauge(
+    "scheduler_fetch_budget_saved_ratio",
+    "Share of fetches saved versus scraping every active target at the reference interval",
+)
+TARGET_INTERVAL = Histogram(
+    "scheduler_target_interval_seconds",
+    "Scrape interval assigned to targets",
+    buckets=(300, 600, 1800, 3600, 7200, 14400, 21600, 43200, 86400),
+)
+CHANGE_STALENESS = Gauge(
+    "scheduler_change_staleness_median_seconds",
+    "Median estimated delay between a price change and its detection",
+)
+CYCLE_DURATION = Histogram(
+    "scheduler_cycle_duration_seconds",
+    "Time to claim and queue all due targets",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+DISPATCH_RATE = Histogram(
+    "scheduler_dispatch_rate",
+    "Targets dispatched per second, measured between consecutive cycles",
+    buckets=(0, 0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100),
+)
+BATCH_SIZE = Histogram(
+    "scheduler_batch_size",
+    "Targets claimed per batch",
+    buckets=(0, 1, 10, 50, 100, 250, 500, 1000, 5000),
+)
+
+# Due targets, oldest first. Rows another scheduler has locked are skipped.
+# Price changes are rows after the first in price_history (unchanged scrapes
+# only bump last_seen_at), counted over the volatility window.
+CLAIM_DUE_SQL = """
+    WITH due AS (
+        SELECT id
+        FROM targets
+        WHERE active = TRUE AND next_due_at <= NOW()
+        ORDER BY next_due_at
+        LIMIT %(batch)s
+        FOR UPDATE SKIP LOCKED
+    )
+    SELECT t.*, p.sku, p.title, p.brand, s.changes, s.observed_seconds
+    FROM due
+    JOIN targets t ON t.id = due.id
+    JOIN products p ON t.product_id = p.id
+    LEFT JOIN LATERAL (
+        SELECT COUNT(*) FILTER (WHERE ph.scraped_at > NOW() - %(window)s * INTERVAL '1 day')
+                 - CASE WHEN MIN(ph.scraped_at) > NOW() - %(window)s * INTERVAL '1 day'
+                        THEN 1 ELSE 0 END AS changes,
+               EXTRACT(EPOCH FROM NOW() - GREATEST(
+                   COALESCE(MIN(ph.scraped_at), NOW()),
+                   NOW() - %(window)s * INTERVAL '1 day')) AS observed_seconds
+        FROM price_history ph
+        WHERE ph.target_id = t.id
+    ) s ON TRUE
+"""
+
+# Upsert one pending job per claimed target and push its next_due_at forward
+DISPATCH_SQL = """
+    WITH claimed AS (
+        SELECT *
+        FROM unnest(%(ids)s::uuid[], %(delays)s::float8[]) AS c(id, delay_seconds)
+    ), rescheduled AS (
+        UPDATE targets t
+        SET next_due_at = NOW() + c.delay_seconds * INTERVAL '1 second'
+        FROM claimed c
+        WHERE t.id = c.id
+    )
+    INSERT INTO scrape_jobs (id, target_id, status, attempts, created_at, updated_at)
+    SELECT id, id, 'pending', 0, NOW(), NOW()
+    FROM claimed
+    ON CONFLICT (id) DO UPDATE
+    SET status = 'pending',
+        last_error = NULL,
+        updated_at = NOW(),
+        attempts = scrape_jobs.attempts + 1
+"""
+
 
 class SchedulerTasks:
     """
     Simple scheduler helpers that mark targets as pending scrape jobs.
     Scraper workers later update these rows to success/failure.
+
+    Due targets are claimed straight from the ``targets.next_due_at`` index in
+    batches of ``batch_size``. Each batch is one transaction: a
+    ``FOR UPDATE SKIP LOCKED`` select (so several schedulers never claim the
+    same target) and one statement that upserts the jobs and moves
+    ``next_due_at`` to the target's next slot (FrequencyPolicy interval,
+    phase-shifted per target and jittered so dispatches stay evenly spread).
+
+    With SCRAPER_MODE=queue each committed batch is also published to the
+    Redis Stream that scraper workers consume.
     """
 
-    def __init__(self, db_manager: DBManager | None = None):
+    def __init__(
+        self,
+        db_manager: DBManager | None = None,
+        publisher: JobPublisher | None = None,
+        policy: FrequencyPolicy | None = None,
+        batch_size: int | None = None,
+    ):
         self.db = db_manager or DBManager()
+        if publisher is None and os.getenv("SCRAPER_MODE", "poll") == MODE_QUEUE:
+            publisher = JobPublisher()
+        self.publisher = publisher
+        self.policy = policy or FrequencyPolicy()
+        self.batch_size = batch_size or int(os.getenv("SCHEDULER_BATCH_SIZE", "500"))
+        self.volatility_window_days = int(os.getenv("SCHEDULER_VOLATILITY_WINDOW_DAYS", "14"))
+        # Savings are measured against scraping every active target at this
+        # fixed interval (the old poll cadence), whatever the tick length
+        self.reference_interval = float(os.getenv("SCHEDULER_BUDGET_REFERENCE_SECONDS", "300"))
+        self._dispatched = 0
+        self._reference = 0.0
+        self._last_cycle_at: Optional[float] = None
 
     def enqueue_targets(self) -> int:
-        """Fetch active targets and mark each as pending."""
-        targets = self.db.get_active_targets()
+        """Claim every due target, batch by batch, and return how many were queued."""
+        start = time.perf_counter()
         count = 0
-        for target in targets:
-            if not target.get("id"):
-                continue
-            self._mark_job_pending(target)
-            count += 1
+        try:
+            while True:
+                batch = self._claim_batch()
+                BATCH_SIZE.observe(len(batch))
+                count += len(batch)
+                if len(batch) < self.batch_size:
+                    break
+        finally:
+            CYCLE_DURATION.observe(time.perf_counter() - start)
+
+        now = time.monotonic()
+        active = self._active_count()
+        if self._last_cycle_at is not None:
+            elapsed = max(now - self._last_cycle_at, 1e-3)
+            DISPATCH_RATE.observe(count / elapsed)
+            # The first cycle has no elapsed time to compare against
+            self._record_budget(count, active * elapsed / self.reference_interval)
+        self._last_cycle_at = now
 
-        logger.info("Scheduler queued %s targets", count)
+        logger.info("Scheduler queued %s of %s active targets", count, active)
         return count
 
-    def _mark_job_pending(self, target: Dict):
-        target_id = target["id"]
+    def _claim_batch(self) -> List[Dict]:
+        """Lock up to ``batch_size`` due targets, queue them and reschedule them."""
         with self.db.get_connection() as conn:
-            with conn.cursor() as cur:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute(CLAIM_DUE_SQL, {"batch": self.batch_size, "window": self.volatility_window_days})
+                targets = cur.fetchall()
+                if not targets:
+                    return []
+
+                now = time.time()
+                delays = []
+                for target in targets:
+                    stats = ChangeStats(
+                        changes=max(int(target.pop("changes") or 0), 0),
+                        observed_seconds=float(target.pop("observed_seconds") or 0.0),
+                    )
+                    interval = self.policy.interval_for(stats, target.get("priority"), target.get("domain", ""))
+                    delays.append(self.policy.next_delay(target["id"], interval, now))
+                    TARGET_INTERVAL.observe(interval)
+
                 cur.execute(
-                    """
-                    INSERT INTO scrape_jobs (id, target_id, status, attempts, created_at, updated_at)
-                    VALUES (%s, %s, %s, 0, NOW(), NOW())
-                    ON CONFLICT (id) DO UPDATE
-                    SET status = 'pending',
-                        last_error = NULL,
-                        updated_at = NOW(),
-                        attempts = scrape_jobs.attempts + 1
-                    """,
-                    (target_id, target_id, "pending"),
+                    DISPATCH_SQL,
+                    {"ids": [str(t["id"]) for t in targets], "delays": delays},
                 )
-        logger.debug("Target %s marked pending", target_id)
+                # Published before the reschedule commits: if Redis fails, the
+                # transaction rolls back and the batch is claimed again next
+                # cycle instead of waiting out its new next_due_at. A batch
+                # published twice is deduplicated by the publisher.
+                if self.publisher is not None:
+                    published = self.publisher.publish(targets)
+                    logger.info("Published %s scrape jobs (%s already queued)", published, len(targets) - published)
+        return targets
+
+    def _active_count(self) -> int:
+        try:
+            with self.db.get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT COUNT(*) FROM targets WHERE active = TRUE")
+                    row = cur.fetchone()
+                    return int(row[0]) if row else 0
+        except Exception as e:
+            logger.error("Failed to count active targets: %s", e)
+            return 0
 
+    def _record_budget(self, dispatched: int, reference: float):
+        """``reference``: fetches the reference cadence would have made over the same time."""
+        FETCHES.labels(result="dispatched").inc(dispatched)
+        FETCHES.labels(result="reference").inc(reference)
+        self._dispatched += dispatched
+        self._reference += reference
+        if self._reference:
+            # Negative when the schedule fetches more than the reference would
+            BUDGET_SAVED.set(1 - self._dispatched / self._reference)
 
+    def report_change_staleness(self, window_hours: int = 24) -> Optional[float]:
+        """
+        Median staleness of price changes detected in the last ``window_hours``.
+        A change happened somewhere between the last sighting of the old price
+        and the scrape that stored the new one, so half that gap is used.
+        """
+        try:
+            with self.db.get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        """
+                        SELECT percentile_cont(0.5) WITHIN GROUP (
+                            ORDER BY EXTRACT(EPOCH FROM ph.scraped_at - prev.last_seen_at) / 2)
+                        FROM price_history ph
+                        JOIN LATERAL (
+                            SELECT last_seen_at
+                            FROM price_history p
+                            WHERE p.target_id = ph.target_id AND p.scraped_at < ph.scraped_at
+                            ORDER BY p.scraped_at DESC
+                            LIMIT 1
+                        ) prev ON TRUE
+                        WHERE ph.scraped_at > NOW() - %s * INTERVAL '1 hour'
+                        """,
+                        (window_hours,),
+                    )
+                    row = cur.fetchone()
+        except Exception as e:
+            logger.error("Failed to compute change staleness: %s", e)
+            return None
+        median = row[0] if row else None
+        if median is not None:
+            CHANGE_STALENESS.set(float(median))
+        return median
@@ -0,0 +1,69 @@
+from services.scheduler.frequency import DAY, ChangeStats, FrequencyPolicy, parse_domain_costs, phase
+
+
+def make_policy(**kwargs):
+    defaults = dict(base_interval=1800, min_interval=300, max_interval=21600, domain_costs={}, jitter=0)
+    defaults.update(kwargs)
+    return FrequencyPolicy(**defaults)
+
+
+def test_new_target_gets_base_interval():
+    assert make_policy().interval_for(None) == 1800
+
+
+def test_volatile_targets_are_scraped_more_often_than_quiet_ones():
+    policy = make_policy()
+    quiet = policy.interval_for(ChangeStats(changes=0, observed_seconds=14 * DAY))
+    daily = policy.interval_for(ChangeStats(changes=14, observed_seconds=14 * DAY))
+    hourly = policy.interval_for(ChangeStats(changes=14 * 24, observed_seconds=14 * DAY))
+
+    assert quiet > daily > hourly
+    # 1 change over 15 days of (smoothed) history: base * sqrt(15)
+    assert abs(quiet - 1800 * 15 ** 0.5) < 1
+
+
+def test_interval_is_clamped_to_bounds():
+    policy = make_policy(max_interval=3600)
+    assert policy.interval_for(ChangeStats(changes=5000, observed_seconds=DAY)) == 300
+    assert policy.interval_for(ChangeStats(changes=0, observed_seconds=365 * DAY)) == 3600
+
+
+def test_priority_and_domain_cost_scale_interval():
+    policy = make_policy(domain_costs={"amazon.in": 4})
+    assert policy.interval_for(None, priority=4) == 900
+    assert policy.interval_for(None, domain="amazon.in") == 3600
+
+
+def test_parse_domain_costs():
+    assert parse_domain_costs("amazon.in=2, flipkart.com=1.5,,bad") == {
+        "amazon.in": 2.0,
+        "flipkart.com": 1.5,
+    }
+
+
+def test_next_delay_keeps_each_target_on_its_own_phase():
+    policy = make_policy()
+    now = 1_000_000.0
+    for target_id in ("a", "b", "c"):
+        delay = policy.next_delay(target_id, 3600, now)
+        assert 1800 <= delay < 5400
+        assert abs((now + delay) % 3600 - phase(target_id) * 3600) < 1e-6
+        # Rescheduling later lands on the same grid
+        later = now + 123
+        assert abs((later + policy.next_delay(target_id, 3600, later)) % 3600 - phase(target_id) * 3600) < 1e-6
+
+
+def test_targets_due_together_are_spread_across_the_interval():
+    policy = make_policy()
+    slots = [policy.next_delay(f"target-{i}", 3600, 0.0) % 3600 for i in range(1000)]
+    per_bucket = [0] * 10
+    for slot in slots:
+        per_bucket[int(slot // 360)] += 1
+    assert min(per_bucket) > 60 and max(per_bucket) < 140
+
+
+def test_next_delay_jitter_is_bounded():
+    policy = make_policy(jitter=0.1)
+    base = make_policy().next_delay("a", 3600, 0.0)
+    for _ in range(50):
+        assert abs(policy.next_delay("a", 3600, 0.0) - base) <= 360
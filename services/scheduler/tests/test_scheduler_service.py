@@ -16,3 +16,18 @@ def test_scheduler_run_once_uses_tasks(monkeypatch):
     mock_tasks.enqueue_targets.assert_called_once()
 
 
+def test_change_staleness_runs_on_its_own_interval():
+    now = [1000.0]
+    service = SchedulerService(interval_seconds=1, staleness_interval_seconds=900, clock=lambda: now[0])
+    service.tasks = MagicMock()
+    service.tasks.enqueue_targets.return_value = 0
+
+    for _ in range(3):
+        asyncio.run(service.run_once())
+        now[0] += 30
+    assert service.tasks.enqueue_targets.call_count == 3
+    service.tasks.report_change_staleness.assert_called_once()
+
+    now[0] += 900
+    asyncio.run(service.run_once())
+    assert service.tasks.report_change_staleness.call_count == 2
@@ -1,37 +1,163 @@
 from unittest.mock import MagicMock, patch
 
-from services.scheduler.tasks import SchedulerTasks
+import pytest
 
+from services.scheduler.frequency import DAY, FrequencyPolicy
+from services.scheduler.tasks import CLAIM_DUE_SQL, DISPATCH_SQL, SchedulerTasks
 
-@patch("services.scheduler.tasks.DBManager")
-def test_enqueue_targets_marks_each_pending(mock_db_cls):
+
+def make_db(batches, active=None):
+    """DBManager mock whose claim query returns ``batches`` one after another."""
+    batches = [list(b) for b in batches]
+    mock_cursor = MagicMock()
+
+    def fetchall():
+        return batches.pop(0) if batches else []
+
+    mock_cursor.fetchall.side_effect = fetchall
+    mock_cursor.fetchone.return_value = (active,) if active is not None else (0,)
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
     mock_db = MagicMock()
-    mock_db.get_active_targets.return_value = [{"id": "t1"}, {"id": "t2"}]
+    mock_db.get_connection.return_value.__enter__.return_value = mock_conn
+    return mock_db, mock_cursor
+
+
+def due(target_id, changes=0, observed=0.0, **extra):
+    return {"id": target_id, "domain": "amazon.in", "changes": changes, "observed_seconds": observed, **extra}
+
+
+def executed(mock_cursor, sql):
+    return [c.args[1] for c in mock_cursor.execute.call_args_list if c.args[0] == sql]
+
+
+def policy():
+    return FrequencyPolicy(base_interval=1800, min_interval=300, max_interval=21600, domain_costs={}, jitter=0)
+
+
+@patch("services.scheduler.tasks.DBManager")
+def test_enqueue_targets_claims_due_batches_until_short_batch(mock_db_cls):
+    mock_db, mock_cursor = make_db([[due("t1"), due("t2")], [due("t3")]], active=10)
+    mock_db_cls.return_value = mock_db
+
+    tasks = SchedulerTasks(batch_size=2, policy=policy())
+    count = tasks.enqueue_targets()
+
+    assert count == 3
+    claims = executed(mock_cursor, CLAIM_DUE_SQL)
+    assert len(claims) == 2
+    assert claims[0]["batch"] == 2
+    dispatches = executed(mock_cursor, DISPATCH_SQL)
+    assert [d["ids"] for d in dispatches] == [["t1", "t2"], ["t3"]]
+
+
+@patch("services.scheduler.tasks.DBManager")
+def test_enqueue_targets_with_nothing_due_runs_one_claim(mock_db_cls):
+    mock_db, mock_cursor = make_db([[]], active=5)
     mock_db_cls.return_value = mock_db
 
-    tasks = SchedulerTasks()
-    tasks._mark_job_pending = MagicMock()
+    assert SchedulerTasks(batch_size=2).enqueue_targets() == 0
+    assert len(executed(mock_cursor, CLAIM_DUE_SQL)) == 1
+    assert executed(mock_cursor, DISPATCH_SQL) == []
 
+
+@patch("services.scheduler.tasks.TARGET_INTERVAL")
+@patch("services.scheduler.tasks.DBManager")
+def test_claim_batch_reschedules_from_change_rate_and_priority(mock_db_cls, mock_interval):
+    mock_db, mock_cursor = make_db(
+        [[
+            due("quiet", changes=0, observed=14 * DAY),
+            due("volatile", changes=100, observed=DAY),
+            due("new"),
+            due("vip", priority=4),
+        ]]
+    )
+    mock_db_cls.return_value = mock_db
+
+    targets = SchedulerTasks(batch_size=10, policy=policy())._claim_batch()
+
+    intervals = [c.args[0] for c in mock_interval.observe.call_args_list]
+    quiet, volatile, new, vip = intervals
+    assert volatile == 300
+    assert new == 1800
+    assert vip == 900
+    assert quiet > new
+    # Next slot is within half an interval either side of the interval
+    delays = executed(mock_cursor, DISPATCH_SQL)[0]["delays"]
+    for delay, interval in zip(delays, intervals):
+        assert interval / 2 <= delay <= interval * 1.5
+    # Stats columns are not passed on to the queue
+    assert "changes" not in targets[0] and "observed_seconds" not in targets[0]
+
+
+@patch("services.scheduler.tasks.DBManager")
+def test_enqueue_targets_publishes_each_batch_when_queue_enabled(mock_db_cls):
+    mock_db, _ = make_db([[due("t1"), due("t2")], [due("t3")]])
+    mock_db_cls.return_value = mock_db
+    publisher = MagicMock()
+    publisher.publish.return_value = 1
+
+    tasks = SchedulerTasks(publisher=publisher, batch_size=2)
     count = tasks.enqueue_targets()
 
-    assert count == 2
-    tasks._mark_job_pending.assert_any_call({"id": "t1"})
-    tasks._mark_job_pending.assert_any_call({"id": "t2"})
+    assert count == 3
+    assert publisher.publish.call_count == 2
+    assert [t["id"] for t in publisher.publish.call_args_list[0].args[0]] == ["t1", "t2"]
+    assert [t["id"] for t in publisher.publish.call_args_list[1].args[0]] == ["t3"]
 
 
 @patch("services.scheduler.tasks.DBManager")
-def test_mark_job_pending_upserts_job(mock_db_cls):
-    mock_conn = MagicMock()
-    mock_cursor = MagicMock()
-    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+def test_failed_publish_rolls_back_the_reschedule(mock_db_cls):
+    mock_db, mock_cursor = make_db([[due("t1")]])
+    mock_db_cls.return_value = mock_db
+    publisher = MagicMock()
+    publisher.publish.side_effect = ConnectionError("redis down")
 
-    mock_db = MagicMock()
-    mock_db.get_connection.return_value.__enter__.return_value = mock_conn
+    with pytest.raises(ConnectionError):
+        SchedulerTasks(publisher=publisher, batch_size=2).enqueue_targets()
+
+    # DISPATCH_SQL ran inside the claim transaction, which exits with the error
+    assert len(executed(mock_cursor, DISPATCH_SQL)) == 1
+    exit_args = mock_db.get_connection.return_value.__exit__.call_args.args
+    assert exit_args[0] is ConnectionError
+
+
+@patch("services.scheduler.tasks.BUDGET_SAVED")
+@patch("services.scheduler.tasks.time")
+@patch("services.scheduler.tasks.DBManager")
+def test_budget_saved_is_measured_against_the_reference_cadence(mock_db_cls, mock_time, mock_budget, monkeypatch):
+    monkeypatch.setenv("SCHEDULER_BUDGET_REFERENCE_SECONDS", "300")
+    # 100 active targets; one dispatched per 30s tick
+    mock_db, _ = make_db([[due(f"t{i}")] for i in range(11)], active=100)
     mock_db_cls.return_value = mock_db
+    mock_time.time.return_value = 0.0
+    mock_time.perf_counter.return_value = 0.0
+    tasks = SchedulerTasks(batch_size=10)
+
+    for tick in range(11):
+        mock_time.monotonic.return_value = tick * 30.0
+        tasks.enqueue_targets()
 
-    tasks = SchedulerTasks()
-    tasks._mark_job_pending({"id": "t1"})
+    # 10 fetches in 300s against 100 for every target every 300s, however
+    # short the tick is
+    assert mock_budget.set.call_count == 10
+    assert abs(mock_budget.set.call_args.args[0] - 0.9) < 1e-9
 
-    mock_cursor.execute.assert_called_once()
 
+@patch("services.scheduler.tasks.DISPATCH_RATE")
+@patch("services.scheduler.tasks.time")
+@patch("services.scheduler.tasks.DBManager")
+def test_enqueue_targets_observes_dispatch_rate_between_cycles(mock_db_cls, mock_time, mock_rate):
+    mock_db, _ = make_db([[due("t1"), due("t2")], [due("t3")]])
+    mock_db_cls.return_value = mock_db
+    mock_time.time.return_value = 0.0
+    mock_time.perf_counter.return_value = 0.0
+    tasks = SchedulerTasks(batch_size=10)
+
+    mock_time.monotonic.return_value = 100.0
+    tasks.enqueue_targets()
+    mock_rate.observe.assert_not_called()
 
+    mock_time.monotonic.return_value = 110.0
+    tasks.enqueue_targets()
+    mock_rate.observe.assert_called_once_with(0.1)
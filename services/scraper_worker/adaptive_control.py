@@ -0,0 +1,231 @@
+import logging
+import os
+from typing import Dict, Iterable, Tuple
+
+from prometheus_client import Counter, Gauge
+
+try:
+    from .rate_limiter import bucket_key
+except ImportError:
+    from rate_limiter import bucket_key
+
+logger = logging.getLogger(__name__)
+
+SUCCESS = "success"
+ERROR = "error"
+THROTTLE = "throttle"
+
+# Responses that mean "slow down" rather than "something broke"
+THROTTLE_STATUSES = (429, 503)
+
+
+class SiteThrottled(Exception):
+    """The site answered with a throttling status instead of the page."""
+
+    def __init__(self, status: int):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+DOMAIN_RATE = Gauge("scraper_domain_rate", "Adaptive request rate per domain (req/s)", ["domain"])
+DOMAIN_CONCURRENCY = Gauge("scraper_domain_concurrency", "Adaptive concurrency per domain", ["domain"])
+RATE_CUTS = Counter("scraper_domain_rate_cuts_total", "Multiplicative rate decreases", ["domain", "reason"])
+
+# One AIMD step for a domain, applied atomically so replicas share one state.
+#
+# KEYS[1] controller state hash, KEYS[2] the domain's token bucket
+# ARGV    event, initial rate, min rate, max rate, additive increase,
+#         decrease factor, window, max error ratio, initial concurrency,
+#         max concurrency, throttle penalty (tokens), hold (ms), state ttl (ms),
+#         adaptive (1/0)
+#
+# Successes and errors are counted over a window; a clean window adds to the
+# rate and concurrency, a window over the error ratio cuts them. Throttle
+# signals cut immediately and leave the bucket in debt so every worker backs
+# off at once. Cuts are at most one per hold period, so replicas reporting the
+# same burst of 429s do not compound it. With adaptive=0 the rate and
+# concurrency stay at their initial values but throttles still put the bucket
+# in debt. Returns {rate, concurrency, cut}.
+AIMD_LUA = """
+local event = ARGV[1]
+local initial_rate = tonumber(ARGV[2])
+local min_rate = tonumber(ARGV[3])
+local max_rate = tonumber(ARGV[4])
+local increase = tonumber(ARGV[5])
+local decrease = tonumber(ARGV[6])
+local window = tonumber(ARGV[7])
+local max_error_ratio = tonumber(ARGV[8])
+local initial_conc = tonumber(ARGV[9])
+local max_conc = tonumber(ARGV[10])
+local penalty = tonumber(ARGV[11])
+local hold = tonumber(ARGV[12])
+local ttl = tonumber(ARGV[13])
+local adaptive = ARGV[14] == '1'
+
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local s = redis.call('HMGET', KEYS[1], 'rate', 'concurrency', 'ok', 'err', 'cut_at')
+local rate = tonumber(s[1]) or initial_rate
+local conc = tonumber(s[2]) or initial_conc
+local ok = tonumber(s[3]) or 0
+local err = tonumber(s[4]) or 0
+local cut_at = tonumber(s[5]) or 0
+local cut = 0
+if not adaptive then
+    rate = initial_rate
+    conc = initial_conc
+end
+
+local function decrease_now()
+    if now - cut_at < hold then
+        return
+    end
+    if adaptive then
+        rate = math.max(min_rate, rate * decrease)
+        conc = math.max(1, math.floor(conc * decrease))
+    end
+    cut_at = now
+    cut = 1
+end
+
+if event == 'throttle' then
+    decrease_now()
+    ok = 0
+    err = 0
+    if cut == 1 then
+        redis.call('HSET', KEYS[2], 'tokens', tostring(-penalty), 'ts', now)
+        redis.call('PEXPIRE', KEYS[2], math.ceil((1 + penalty) / rate * 1000) + 1000)
+    end
+else
+    if event == 'success' then
+        ok = ok + 1
+    else
+        err = err + 1
+    end
+    if ok + err >= window then
+        if err / (ok + err) > max_error_ratio then
+            decrease_now()
+        elseif adaptive then
+            rate = math.min(max_rate, rate + increase)
+            conc = math.min(max_conc, conc + 1)
+        end
+        ok = 0
+        err = 0
+    end
+end
+
+redis.call('HSET', KEYS[1], 'rate', tostring(rate), 'concurrency', conc,
+           'ok', ok, 'err', err, 'cut_at', cut_at)
+redis.call('PEXPIRE', KEYS[1], ttl)
+return {tostring(rate), tostring(conc), cut}
+"""
+
+
+class AdaptiveController:
+    """
+    AIMD rate and concurrency control per domain.
+
+    Each domain starts at the configured rate and concurrency. Windows of
+    clean scrapes raise both additively, while CAPTCHAs, 429/503 responses
+    or a high error ratio cut them multiplicatively. State lives in Redis, so
+    every replica converges on the same numbers. Lookups are served from a
+    local cache that events and ``refresh`` keep current.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        initial_rate: float,
+        initial_concurrency: int,
+        enabled: bool = None,
+        min_rate: float = None,
+        max_rate: float = None,
+        increase: float = None,
+        decrease: float = None,
+        window: int = None,
+        max_error_ratio: float = None,
+        max_concurrency: int = None,
+        penalty: float = None,
+        hold: float = None,
+    ):
+        self.redis = redis_client
+        if enabled is None:
+            enabled = os.getenv("AIMD_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.enabled = enabled
+        self.initial_rate = initial_rate
+        self.initial_concurrency = initial_concurrency
+        self.min_rate = min_rate or float(os.getenv("AIMD_MIN_RPS", "0.02"))
+        self.max_rate = max_rate or float(os.getenv("AIMD_MAX_RPS", "2.0"))
+        self.increase = increase or float(os.getenv("AIMD_INCREASE_RPS", "0.05"))
+        self.decrease = decrease or float(os.getenv("AIMD_DECREASE_FACTOR", "0.5"))
+        self.window = window or int(os.getenv("AIMD_WINDOW", "20"))
+        self.max_error_ratio = (
+            max_error_ratio
+            if max_error_ratio is not None
+            else float(os.getenv("AIMD_MAX_ERROR_RATIO", "0.2"))
+        )
+        self.max_concurrency = max_concurrency or int(os.getenv("AIMD_MAX_CONCURRENCY", "4"))
+        self.penalty = penalty if penalty is not None else float(os.getenv("AIMD_THROTTLE_PENALTY", "2"))
+        self.hold = hold if hold is not None else float(os.getenv("AIMD_HOLD_SECONDS", "30"))
+        self.state_ttl = 7 * 24 * 3600
+        self._state: Dict[str, Tuple[float, int]] = {}
+        self._script = redis_client.register_script(AIMD_LUA)
+
+    @staticmethod
+    def _key(domain: str) -> str:
+        return f"aimd:{domain}"
+
+    def rate(self, domain: str) -> float:
+        return self._state.get(domain, (self.initial_rate, self.initial_concurrency))[0]
+
+    def concurrency(self, domain: str) -> int:
+        return self._state.get(domain, (self.initial_rate, self.initial_concurrency))[1]
+
+    def _store(self, domain: str, rate: float, concurrency: int):
+        self._state[domain] = (rate, concurrency)
+        DOMAIN_RATE.labels(domain=domain).set(rate)
+        DOMAIN_CONCURRENCY.labels(domain=domain).set(concurrency)
+
+    async def record(self, domain: str, event: str):
+        try:
+            rate, concurrency, cut = await self._script(
+                keys=[self._key(domain), bucket_key(domain)],
+                args=[
+                    event, self.initial_rate, self.min_rate, self.max_rate, self.increase,
+                    self.decrease, self.window, self.max_error_ratio, self.initial_concurrency,
+                    self.max_concurrency, self.penalty, int(self.hold * 1000), self.state_ttl * 1000,
+                    1 if self.enabled else 0,
+                ],
+            )
+        except Exception as e:
+            logger.warning(f"Could not update adaptive state for {domain}: {e}")
+            return
+        before = self.rate(domain)
+        self._store(domain, float(rate), int(float(concurrency)))
+        if int(cut):
+            reason = event if event == THROTTLE else "error_ratio"
+            RATE_CUTS.labels(domain=domain, reason=reason).inc()
+            logger.warning(
+                f"{domain} backing off ({reason}): rate {before:.3f} -> {float(rate):.3f}/s, "
+                f"concurrency {int(float(concurrency))}"
+            )
+
+    async def refresh(self, domains: Iterable[str]):
+        """Pick up adjustments other replicas made since our last event."""
+        if not self.enabled:
+            return
+        domains = list(dict.fromkeys(domains))
+        if not domains:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for domain in domains:
+                    pipe.hmget(self._key(domain), "rate", "concurrency")
+                results = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Could not refresh adaptive state: {e}")
+            return
+        for domain, (rate, concurrency) in zip(domains, results):
+            if rate is not None and concurrency is not None:
+                self._store(domain, float(rate), int(float(concurrency)))
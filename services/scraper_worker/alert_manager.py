@@ -1,59 +1,232 @@
-import requests
+import asyncio
 import logging
 import os
-from typing import Dict
+import random
+import time
 from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import httpx
+import requests
+from prometheus_client import Counter, Gauge, Histogram
 
 logger = logging.getLogger(__name__)
 
+ALERT_QUEUE_DEPTH = Gauge("alert_queue_depth", "Alerts waiting to be delivered", ["channel"])
+ALERT_DELIVERY_SECONDS = Histogram(
+    "alert_delivery_seconds",
+    "Time from enqueue to successful delivery",
+    ["channel"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0),
+)
+ALERT_DELIVERIES = Counter(
+    "alert_deliveries_total",
+    "Alert delivery outcomes",
+    ["channel", "outcome"],
+)
+
+DISCORD = "discord"
+TELEGRAM = "telegram"
+
+
+def _retry_after_seconds(response) -> Optional[float]:
+    """Seconds to wait after a 429, from the header or the JSON body."""
+    header = response.headers.get("Retry-After")
+    if header:
+        try:
+            return float(header)
+        except ValueError:
+            pass
+    try:
+        body = response.json()
+    except Exception:
+        return None
+    value = body.get("retry_after") or (body.get("parameters") or {}).get("retry_after")
+    return float(value) if value is not None else None
+
+
 class AlertManager:
-    def __init__(self):
+    def __init__(
+        self,
+        queue_size: int = None,
+        max_attempts: int = None,
+        timeout: float = None,
+        max_retry_after: float = None,
+    ):
         self.discord_webhook = os.getenv('DISCORD_WEBHOOK_URL')
         self.telegram_token = os.getenv('TELEGRAM_BOT_TOKEN')
         self.telegram_chat_id = os.getenv('TELEGRAM_CHAT_ID')
-    
+        self.queue_size = queue_size or int(os.getenv('ALERT_QUEUE_SIZE', '1000'))
+        self.max_attempts = max_attempts or int(os.getenv('ALERT_MAX_ATTEMPTS', '5'))
+        self.timeout = timeout or float(os.getenv('ALERT_HTTP_TIMEOUT_SECONDS', '10'))
+        self.backoff_cap = 60.0
+        # Longest Retry-After honoured; a bogus hour-long value would stall the channel
+        self.max_retry_after = max_retry_after or float(os.getenv('ALERT_MAX_RETRY_AFTER_SECONDS', '60'))
+
+        # Populated by start(): one queue, pooled client and dispatcher per channel
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._dispatchers: Dict[str, asyncio.Task] = {}
+
+    def _discord_request(self, title: str, message: str, color: int) -> Tuple[str, Dict]:
+        payload = {
+            "embeds": [{
+                "title": title,
+                "description": message,
+                "color": color,
+                "timestamp": datetime.utcnow().isoformat()
+            }]
+        }
+        return self.discord_webhook, payload
+
+    def _telegram_request(self, message: str) -> Tuple[str, Dict]:
+        url = f"https://api.telegram.org/bot{self.telegram_token}/sendMessage"
+        payload = {
+            "chat_id": self.telegram_chat_id,
+            "text": message,
+            "parse_mode": "Markdown"
+        }
+        return url, payload
+
     def send_discord_alert(self, title: str, message: str, color: int = 0xFF0000):
         if not self.discord_webhook:
             logger.warning("Discord webhook not configured")
             return False
-        
+
         try:
-            payload = {
-                "embeds": [{
-                    "title": title,
-                    "description": message,
-                    "color": color,
-                    "timestamp": datetime.utcnow().isoformat()
-                }]
-            }
-            response = requests.post(self.discord_webhook, json=payload)
+            url, payload = self._discord_request(title, message, color)
+            response = requests.post(url, json=payload, timeout=self.timeout)
             response.raise_for_status()
             logger.info(f"Discord alert sent: {title}")
             return True
         except Exception as e:
             logger.error(f"Failed to send Discord alert: {e}")
             return False
-    
+
     def send_telegram_alert(self, message: str):
         if not self.telegram_token or not self.telegram_chat_id:
             logger.warning("Telegram not configured")
             return False
-        
+
         try:
-            url = f"https://api.telegram.org/bot{self.telegram_token}/sendMessage"
-            payload = {
-                "chat_id": self.telegram_chat_id,
-                "text": message,
-                "parse_mode": "Markdown"
-            }
-            response = requests.post(url, json=payload)
+            url, payload = self._telegram_request(message)
+            response = requests.post(url, json=payload, timeout=self.timeout)
             response.raise_for_status()
             logger.info("Telegram alert sent")
             return True
         except Exception as e:
             logger.error(f"Failed to send Telegram alert: {e}")
             return False
-    
+
+    async def start(self):
+        """Start background dispatchers; alerts are queued instead of sent inline from now on."""
+        channels = []
+        if self.discord_webhook:
+            channels.append(DISCORD)
+        if self.telegram_token and self.telegram_chat_id:
+            channels.append(TELEGRAM)
+        for channel in channels:
+            if channel in self._dispatchers:
+                continue
+            self._queues[channel] = asyncio.Queue(maxsize=self.queue_size)
+            self._clients[channel] = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=2, max_keepalive_connections=2),
+            )
+            self._dispatchers[channel] = asyncio.create_task(self._dispatch(channel))
+        if channels:
+            logger.info(f"Alert dispatchers started: {', '.join(channels)}")
+
+    async def close(self, drain_timeout: float = 10.0):
+        """Give queued alerts a chance to go out, then stop dispatchers."""
+        if self._queues:
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*(q.join() for q in self._queues.values())),
+                    timeout=drain_timeout,
+                )
+            except asyncio.TimeoutError:
+                pending = sum(q.qsize() for q in self._queues.values())
+                logger.warning(f"Alert queue not drained on shutdown, {pending} alerts dropped")
+        for task in self._dispatchers.values():
+            task.cancel()
+        for task in self._dispatchers.values():
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        for client in self._clients.values():
+            await client.aclose()
+        self._dispatchers.clear()
+        self._clients.clear()
+        self._queues.clear()
+
+    def _enqueue(self, channel: str, url: str, payload: Dict) -> bool:
+        queue = self._queues[channel]
+        try:
+            queue.put_nowait((time.monotonic(), url, payload))
+        except asyncio.QueueFull:
+            logger.error(f"{channel} alert queue full, dropping alert")
+            ALERT_DELIVERIES.labels(channel=channel, outcome="dropped").inc()
+            return False
+        ALERT_QUEUE_DEPTH.labels(channel=channel).set(queue.qsize())
+        return True
+
+    async def _dispatch(self, channel: str):
+        queue = self._queues[channel]
+        while True:
+            enqueued_at, url, payload = await queue.get()
+            try:
+                await self._deliver(channel, enqueued_at, url, payload)
+            except Exception as e:
+                logger.error(f"Unexpected {channel} dispatcher error: {e}")
+            finally:
+                queue.task_done()
+                ALERT_QUEUE_DEPTH.labels(channel=channel).set(queue.qsize())
+
+    async def _deliver(self, channel: str, enqueued_at: float, url: str, payload: Dict) -> bool:
+        client = self._clients[channel]
+        for attempt in range(1, self.max_attempts + 1):
+            delay = min(self.backoff_cap, 2 ** attempt) * random.uniform(0.5, 1.0)
+            try:
+                response = await client.post(url, json=payload)
+                if response.status_code == 429:
+                    # Honour the webhook's rate limit rather than our own backoff
+                    delay = min(max(_retry_after_seconds(response) or delay, 0.0), self.max_retry_after)
+                    logger.warning(f"{channel} rate limited, retrying in {delay:.1f}s")
+                elif response.status_code >= 500:
+                    logger.warning(f"{channel} returned {response.status_code}, retrying in {delay:.1f}s")
+                else:
+                    response.raise_for_status()
+                    ALERT_DELIVERY_SECONDS.labels(channel=channel).observe(time.monotonic() - enqueued_at)
+                    ALERT_DELIVERIES.labels(channel=channel, outcome="delivered").inc()
+                    logger.info(f"{channel} alert sent")
+                    return True
+            except httpx.HTTPStatusError as e:
+                # Other 4xx responses will not succeed on retry
+                logger.error(f"Failed to send {channel} alert: {e}")
+                break
+            except httpx.HTTPError as e:
+                logger.warning(f"{channel} alert attempt {attempt} failed: {e}")
+            if attempt < self.max_attempts:
+                await asyncio.sleep(delay)
+
+        ALERT_DELIVERIES.labels(channel=channel, outcome="failed").inc()
+        return False
+
+    def _notify(self, title: str, message: str, color: int):
+        """Queue an alert on every configured channel, or send inline if dispatchers are not running."""
+        if DISCORD in self._queues:
+            self._enqueue(DISCORD, *self._discord_request(title, message, color))
+        else:
+            self.send_discord_alert(title, message, color=color)
+
+        text = f"{title}\n\n{message}"
+        if TELEGRAM in self._queues:
+            self._enqueue(TELEGRAM, *self._telegram_request(text))
+        else:
+            self.send_telegram_alert(text)
+
     def alert_captcha_encounter(self, target_info: Dict, screenshot_url: str = None):
         title = "⚠️ CAPTCHA Encountered"
         message = f"""
@@ -64,10 +237,9 @@ class AlertManager:
 """
         if screenshot_url:
             message += f"\n**Screenshot:** {screenshot_url}"
-        
-        self.send_discord_alert(title, message, color=0xFFA500)
-        self.send_telegram_alert(f"{title}\n\n{message}")
-    
+
+        self._notify(title, message, 0xFFA500)
+
     def alert_price_drop(self, product_info: Dict, old_price: float, new_price: float):
         drop_percent = ((old_price - new_price) / old_price) * 100
         title = "📉 Price Drop Alert"
@@ -78,9 +250,8 @@ class AlertManager:
 **New Price:** ₹{new_price:,.2f}
 **Drop:** {drop_percent:.1f}%
 """
-        self.send_discord_alert(title, message, color=0x00FF00)
-        self.send_telegram_alert(f"{title}\n\n{message}")
-    
+        self._notify(title, message, 0x00FF00)
+
     def alert_repeated_errors(self, target_info: Dict, error_count: int):
         title = "❌ Repeated Scraping Errors"
         message = f"""
@@ -89,6 +260,4 @@ class AlertManager:
 **Error Count:** {error_count}
 **Action Required:** Check target configuration
 """
-        self.send_discord_alert(title, message, color=0xFF0000)
-        self.send_telegram_alert(f"{title}\n\n{message}")
-
+        self._notify(title, message, 0xFF0000)
@@ -0,0 +1,144 @@
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from psycopg2.extras import RealDictCursor
+
+try:
+    from .db_pool import ConnectionPool, QUERY_LATENCY
+    from .db_manager import DBManager
+except ImportError:
+    from db_pool import ConnectionPool, QUERY_LATENCY
+    from db_manager import DBManager
+
+logger = logging.getLogger(__name__)
+
+# Hot-path statements, prepared once per pooled connection
+INSERT_PRICE_HISTORY = """
+    INSERT INTO price_history (
+        target_id, price, currency, scraped_at,
+        raw_html, screenshot_url, proxy_used,
+        user_agent, response_time_ms, content_hash
+    ) VALUES ($1, $2, $3, NOW(), $4, $5, $6, $7, $8, $9)
+"""
+UPDATE_SCRAPE_JOB = """
+    UPDATE scrape_jobs
+    SET status = $1, last_error = $2, updated_at = NOW()
+    WHERE id = $3
+"""
+SELECT_LATEST_PRICE = """
+    SELECT price, scraped_at
+    FROM price_history
+    WHERE target_id = $1
+    ORDER BY scraped_at DESC
+    LIMIT 1
+"""
+
+
+class AsyncDBManager:
+    """
+    Async storage backend for the scraper worker with the same method surface
+    as DBManager.
+
+    psycopg2 calls run on a dedicated thread pool sized to the connection pool,
+    so the event loop never blocks on Postgres while the sync DBManager (used by
+    the scheduler) keeps sharing the same pooling code.
+    """
+
+    def __init__(self, connection_string: str = None, pool: ConnectionPool = None):
+        self.pool = pool or ConnectionPool(connection_string)
+        self._sync = DBManager(connection_string, pool=self.pool)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.pool.max_size, thread_name_prefix="db"
+        )
+
+    async def _run(self, operation: str, func, *args):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+        finally:
+            QUERY_LATENCY.labels(operation=operation).observe(time.perf_counter() - start)
+
+    def _save_price_history(self, data: Dict) -> bool:
+        try:
+            with self.pool.connection() as conn:
+                with conn.cursor() as cur:
+                    self.pool.execute_prepared(cur, "insert_price_history", INSERT_PRICE_HISTORY, (
+                        data['target_id'],
+                        data['price'],
+                        data.get('currency', 'INR'),
+                        data.get('raw_html'),
+                        data.get('screenshot_url'),
+                        data.get('proxy_used'),
+                        data.get('user_agent'),
+                        data.get('response_time_ms'),
+                        data.get('content_hash'),
+                    ))
+            logger.info(f"Price history saved for target {data['target_id']}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save price history: {e}")
+            return False
+
+    def _update_scrape_job(self, job_id: str, status: str, error: str = None):
+        try:
+            with self.pool.connection() as conn:
+                with conn.cursor() as cur:
+                    self.pool.execute_prepared(
+                        cur, "update_scrape_job", UPDATE_SCRAPE_JOB, (status, error, job_id)
+                    )
+        except Exception as e:
+            logger.error(f"Failed to update scrape job: {e}")
+
+    def _get_latest_price(self, target_id: str) -> Optional[Dict]:
+        try:
+            with self.pool.connection() as conn:
+                with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                    self.pool.execute_prepared(
+                        cur, "select_latest_price", SELECT_LATEST_PRICE, (target_id,)
+                    )
+                    return cur.fetchone()
+        except Exception as e:
+            logger.error(f"Failed to fetch latest price: {e}")
+            return None
+
+    async def save_price_history(self, data: Dict) -> bool:
+        return await self._run("save_price_history", self._save_price_history, data)
+
+    async def update_scrape_job(self, job_id: str, status: str, error: str = None):
+        await self._run("update_scrape_job", self._update_scrape_job, job_id, status, error)
+
+    async def create_alert(self, product_id: str, alert_type: str, payload: Dict):
+        await self._run("create_alert", self._sync.create_alert, product_id, alert_type, payload)
+
+    async def get_active_targets(self) -> List[Dict]:
+        return await self._run("get_active_targets", self._sync.get_active_targets)
+
+    async def get_latest_price(self, target_id: str) -> Optional[Dict]:
+        return await self._run("get_latest_price", self._get_latest_price, target_id)
+
+    async def save_price_history_batch(self, rows: List[Dict]) -> bool:
+        return await self._run(
+            "save_price_history_batch", self._sync.save_price_history_batch, rows
+        )
+
+    async def update_scrape_jobs_batch(self, updates) -> bool:
+        return await self._run(
+            "update_scrape_jobs_batch", self._sync.update_scrape_jobs_batch, updates
+        )
+
+    async def record_observations_batch(self, observations) -> bool:
+        return await self._run(
+            "record_observations_batch", self._sync.record_observations_batch, observations
+        )
+
+    async def get_latest_prices(self, target_ids) -> Dict[str, float]:
+        return await self._run("get_latest_prices", self._sync.get_latest_prices, target_ids)
+
+    async def close(self):
+        self._executor.shutdown(wait=True)
+        self.pool.close()
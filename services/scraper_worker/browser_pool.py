@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import List, Optional
+
+from playwright.async_api import async_playwright
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+POOL_WAIT = Histogram(
+    "scraper_browser_pool_wait_seconds",
+    "Time spent waiting for a free browser slot",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+POOL_IN_USE = Gauge("scraper_browser_pool_in_use", "Browser contexts currently checked out")
+POOL_BROWSERS = Gauge("scraper_browser_pool_browsers", "Browsers currently running in the pool")
+POOL_RELAUNCHES = Counter(
+    "scraper_browser_pool_relaunch_total",
+    "Browsers relaunched by the pool",
+    ["reason"],
+)
+
+LAUNCH_ARGS = ['--disable-blink-features=AutomationControlled']
+
+
+@dataclass
+class PooledBrowser:
+    browser: object
+    uses: int = 0
+    active: int = 0
+    launched_at: float = 0.0
+
+    def is_healthy(self) -> bool:
+        try:
+            return self.browser.is_connected()
+        except Exception:
+            return False
+
+
+class BrowserPool:
+    """
+    Keeps a fixed number of long-lived Chromium instances behind one Playwright
+    driver process. Callers borrow a browser to open their own context, so the
+    per-fetch cost is a context rather than a full browser launch.
+
+    Sizing: ``size * contexts_per_browser`` bounds concurrent page loads; each
+    browser is recycled after ``max_uses`` contexts to cap renderer memory growth.
+    """
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        contexts_per_browser: Optional[int] = None,
+        max_uses: Optional[int] = None,
+        headless: bool = True,
+    ):
+        self.size = size or int(os.getenv("BROWSER_POOL_SIZE", "2"))
+        self.contexts_per_browser = contexts_per_browser or int(
+            os.getenv("BROWSER_CONTEXTS_PER_BROWSER", "4")
+        )
+        self.max_uses = max_uses or int(os.getenv("BROWSER_MAX_USES", "200"))
+        self.headless = headless
+
+        self._playwright = None
+        self._browsers: List[PooledBrowser] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._lock = asyncio.Lock()
+        self._started = False
+
+    @property
+    def capacity(self) -> int:
+        return self.size * self.contexts_per_browser
+
+    async def start(self):
+        async with self._lock:
+            if self._started:
+                return
+            self._playwright = await async_playwright().start()
+            for _ in range(self.size):
+                self._browsers.append(await self._launch())
+            self._slots = asyncio.Semaphore(self.capacity)
+            self._started = True
+            POOL_BROWSERS.set(len(self._browsers))
+            logger.info(
+                f"Browser pool started: {self.size} browsers x {self.contexts_per_browser} contexts"
+            )
+
+    async def close(self):
+        async with self._lock:
+            for pooled in self._browsers:
+                await self._close_browser(pooled)
+            self._browsers.clear()
+            if self._playwright:
+                await self._playwright.stop()
+                self._playwright = None
+            self._started = False
+            POOL_BROWSERS.set(0)
+            logger.info("Browser pool closed")
+
+    async def _launch(self) -> PooledBrowser:
+        browser = await self._playwright.chromium.launch(
+            headless=self.headless,
+            args=LAUNCH_ARGS,
+        )
+        return PooledBrowser(browser=browser, launched_at=time.time())
+
+    async def _close_browser(self, pooled: PooledBrowser):
+        try:
+            await pooled.browser.close()
+        except Exception as e:
+            logger.debug(f"Error closing pooled browser: {e}")
+
+    async def _replace(self, pooled: PooledBrowser, reason: str) -> PooledBrowser:
+        index = self._browsers.index(pooled)
+        await self._close_browser(pooled)
+        fresh = await self._launch()
+        self._browsers[index] = fresh
+        POOL_RELAUNCHES.labels(reason=reason).inc()
+        logger.info(f"Relaunched pooled browser ({reason})")
+        return fresh
+
+    async def _checkout(self) -> PooledBrowser:
+        async with self._lock:
+            # Prefer browsers that are not due for recycling, least loaded first
+            candidates = sorted(
+                self._browsers,
+                key=lambda b: (b.uses >= self.max_uses, b.active),
+            )
+            pooled = candidates[0]
+            if not pooled.is_healthy():
+                pooled = await self._replace(pooled, "unhealthy")
+            elif pooled.uses >= self.max_uses and pooled.active == 0:
+                pooled = await self._replace(pooled, "max_uses")
+            pooled.active += 1
+            pooled.uses += 1
+            return pooled
+
+    async def _checkin(self, pooled: PooledBrowser):
+        async with self._lock:
+            pooled.active = max(0, pooled.active - 1)
+            if pooled in self._browsers and pooled.active == 0:
+                if not pooled.is_healthy():
+                    await self._replace(pooled, "unhealthy")
+                elif pooled.uses >= self.max_uses:
+                    await self._replace(pooled, "max_uses")
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Borrow a healthy browser for the duration of one context."""
+        if not self._started:
+            await self.start()
+
+        wait_start = time.perf_counter()
+        await self._slots.acquire()
+        POOL_WAIT.observe(time.perf_counter() - wait_start)
+        POOL_IN_USE.inc()
+        try:
+            pooled = await self._checkout()
+        except Exception:
+            POOL_IN_USE.dec()
+            self._slots.release()
+            raise
+
+        try:
+            yield pooled.browser
+        finally:
+            try:
+                await self._checkin(pooled)
+            finally:
+                POOL_IN_USE.dec()
+                self._slots.release()
+
+    def get_stats(self) -> dict:
+        return {
+            "browsers": len(self._browsers),
+            "healthy": sum(1 for b in self._browsers if b.is_healthy()),
+            "in_use": sum(b.active for b in self._browsers),
+            "capacity": self.capacity,
+        }
@@ -0,0 +1,90 @@
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from prometheus_client import Counter
+
+logger = logging.getLogger(__name__)
+
+OBSERVATIONS = Counter(
+    "scraper_observations_total",
+    "Successful scrapes by whether the stored price changed",
+    ["domain", "result"],
+)
+
+
+@dataclass
+class TargetState:
+    price: float
+    content_hash: Optional[str] = None
+
+
+class ChangeDetector:
+    """
+    Remembers the last stored price and content hash per target.
+
+    Redis (one key per target) is the source of truth, so every replica
+    compares against the latest price whichever replica stored it. The
+    in-process copy is only a fallback for when Redis has no state or cannot
+    be reached.
+    """
+
+    def __init__(self, redis_client, enabled: bool = None, ttl: int = None):
+        self.redis = redis_client
+        if enabled is None:
+            enabled = os.getenv("CHANGE_DETECTION_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.enabled = enabled
+        self.ttl = ttl or int(os.getenv("CHANGE_STATE_TTL_SECONDS", str(7 * 24 * 3600)))
+        self._local: Dict[str, TargetState] = {}
+
+    @staticmethod
+    def _key(target_id) -> str:
+        return f"target_state:{target_id}"
+
+    async def get(self, target_id) -> Optional[TargetState]:
+        try:
+            raw = await self.redis.get(self._key(target_id))
+            if raw:
+                data = json.loads(raw)
+                state = TargetState(price=float(data["price"]), content_hash=data.get("hash"))
+                self._local[target_id] = state
+                return state
+        except Exception as e:
+            logger.warning(f"Could not read state for target {target_id}: {e}")
+        return self._local.get(target_id)
+
+    def has_state(self, target_id) -> bool:
+        return target_id in self._local
+
+    def seed(self, target_id, price: float):
+        """Fallback state from the database, used while Redis has none."""
+        self._local[target_id] = TargetState(price=float(price))
+
+    def is_unchanged(
+        self, previous: Optional[TargetState], price: float, content_hash: Optional[str] = None
+    ) -> bool:
+        """
+        Same price and, when both sides have one, the same region fingerprint
+        (so a seller or availability change still stores a new row).
+        """
+        if not self.enabled or previous is None:
+            return False
+        if round(previous.price, 2) != round(float(price), 2):
+            return False
+        if previous.content_hash and content_hash:
+            return previous.content_hash == content_hash
+        return True
+
+    async def remember(self, target_id, price: float, content_hash: Optional[str]):
+        state = TargetState(price=float(price), content_hash=content_hash)
+        self._local[target_id] = state
+        try:
+            await self.redis.set(
+                self._key(target_id),
+                json.dumps({"price": state.price, "hash": content_hash}),
+                ex=self.ttl,
+            )
+        except Exception as e:
+            logger.warning(f"Could not persist state for target {target_id}: {e}")
@@ -1,29 +1,24 @@
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 import logging
-from typing import Optional, Dict, List
-from contextlib import contextmanager
+from typing import Optional, Dict, List, Sequence, Tuple
 import os
 import json
 
+try:
+    from .db_pool import ConnectionPool
+except ImportError:
+    from db_pool import ConnectionPool
+
 logger = logging.getLogger(__name__)
 
 class DBManager:
-    def __init__(self, connection_string: str = None):
+    def __init__(self, connection_string: str = None, pool: ConnectionPool = None):
         self.connection_string = connection_string or os.getenv('DATABASE_URL')
+        self.pool = pool or ConnectionPool(self.connection_string)
         
-    @contextmanager
     def get_connection(self):
-        conn = psycopg2.connect(self.connection_string)
-        try:
-            yield conn
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            logger.error(f"Database error: {e}")
-            raise
-        finally:
-            conn.close()
+        return self.pool.connection()
     
     def save_price_history(self, data: Dict) -> bool:
         try:
@@ -110,3 +105,99 @@ class DBManager:
         except Exception as e:
             logger.error(f"Failed to fetch latest price: {e}")
             return None
+    
+    def save_price_history_batch(self, rows: List[Dict]) -> bool:
+        """Insert many price_history rows with one multi-row INSERT."""
+        if not rows:
+            return True
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor() as cur:
+                    execute_values(cur, """
+                        INSERT INTO price_history (
+                            target_id, price, currency, scraped_at,
+                            raw_html, screenshot_url, proxy_used,
+                            user_agent, response_time_ms, content_hash
+                        ) VALUES %s
+                    """, [
+                        (
+                            data['target_id'],
+                            data['price'],
+                            data.get('currency', 'INR'),
+                            data.get('raw_html'),
+                            data.get('screenshot_url'),
+                            data.get('proxy_used'),
+                            data.get('user_agent'),
+                            data.get('response_time_ms'),
+                            data.get('content_hash'),
+                        )
+                        for data in rows
+                    ], template="(%s, %s, %s, NOW(), %s, %s, %s, %s, %s, %s)", page_size=len(rows))
+            logger.info(f"Price history saved for {len(rows)} targets")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save price history batch: {e}")
+            return False
+    
+    def update_scrape_jobs_batch(self, updates: Sequence[Tuple[str, str, Optional[str]]]) -> bool:
+        """Apply (job_id, status, error) updates with a single UPDATE ... FROM (VALUES ...)."""
+        if not updates:
+            return True
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor() as cur:
+                    execute_values(cur, """
+                        UPDATE scrape_jobs AS j
+                        SET status = v.status, last_error = v.last_error, updated_at = NOW()
+                        FROM (VALUES %s) AS v(id, status, last_error)
+                        WHERE j.id = v.id
+                    """, list(updates), template="(%s::uuid, %s::text, %s::text)", page_size=len(updates))
+            return True
+        except Exception as e:
+            logger.error(f"Failed to update scrape job batch: {e}")
+            return False
+    
+    def record_observations_batch(self, observations: Sequence[Tuple[str, int]]) -> bool:
+        """
+        Bump last_seen_at / observation_count on each target's latest price row
+        for (target_id, times_seen) pairs where the price did not change.
+        """
+        if not observations:
+            return True
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor() as cur:
+                    execute_values(cur, """
+                        UPDATE price_history AS ph
+                        SET last_seen_at = NOW(),
+                            observation_count = ph.observation_count + v.seen
+                        FROM (VALUES %s) AS v(target_id, seen)
+                        WHERE ph.id = (
+                            SELECT id FROM price_history
+                            WHERE target_id = v.target_id
+                            ORDER BY scraped_at DESC
+                            LIMIT 1
+                        )
+                    """, list(observations), template="(%s::uuid, %s::int)", page_size=len(observations))
+            return True
+        except Exception as e:
+            logger.error(f"Failed to record observations: {e}")
+            return False
+    
+    def get_latest_prices(self, target_ids: Sequence[str]) -> Dict[str, float]:
+        """Latest known price per target, for every target that has history."""
+        if not target_ids:
+            return {}
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                    cur.execute("""
+                        SELECT DISTINCT ON (target_id) target_id, price
+                        FROM price_history
+                        WHERE target_id = ANY(%s::uuid[])
+                        ORDER BY target_id, scraped_at DESC
+                    """, ([str(t) for t in target_ids],))
+                    return {str(row['target_id']): float(row['price']) for row in cur.fetchall()}
+        except Exception as e:
+            logger.error(f"Failed to fetch latest prices: {e}")
+            return {}
@@ -0,0 +1,118 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Sequence, Set
+
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+from prometheus_client import Histogram
+
+logger = logging.getLogger(__name__)
+
+POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a pooled database connection",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds",
+    "Database call latency including pool wait",
+    ["operation"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+
+
+class ConnectionPool:
+    """
+    Thread-safe psycopg2 connection pool shared by the sync DBManager and the
+    async storage backend.
+
+    Callers block (rather than erroring) while all ``max_size`` connections
+    are checked out. Transactions are committed on clean exit and rolled back
+    on error, matching the old per-call ``get_connection`` semantics.
+    """
+
+    def __init__(
+        self,
+        connection_string: str = None,
+        min_size: int = None,
+        max_size: int = None,
+    ):
+        self.connection_string = connection_string or os.getenv('DATABASE_URL')
+        self.min_size = min_size if min_size is not None else int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+        self.max_size = max_size or int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+        self._pool: Optional[ThreadedConnectionPool] = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        # Server-side prepared statements live per connection
+        self._prepared: Dict[int, Set[str]] = {}
+
+    def _get_pool(self) -> ThreadedConnectionPool:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    pool = ThreadedConnectionPool(
+                        self.min_size, self.max_size, self.connection_string
+                    )
+                    # psycopg2 closes a returned connection once minconn are
+                    # idle, so busy callers would reconnect (and re-PREPARE)
+                    # on most calls. minconn is only read on return after the
+                    # initial connections are opened, so raising it keeps up
+                    # to max_size warm connections without opening them early.
+                    pool.minconn = self.max_size
+                    self._pool = pool
+        return self._pool
+
+    @contextmanager
+    def connection(self):
+        wait_start = time.perf_counter()
+        self._slots.acquire()
+        POOL_WAIT.observe(time.perf_counter() - wait_start)
+        try:
+            pool = self._get_pool()
+            conn = pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        discard = False
+        try:
+            yield conn
+            conn.commit()
+        except Exception as e:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+            if isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+                discard = True
+            logger.error(f"Database error: {e}")
+            raise
+        finally:
+            try:
+                pool.putconn(conn, close=discard)
+            finally:
+                if discard or conn.closed:
+                    self._prepared.pop(id(conn), None)
+                self._slots.release()
+
+    def execute_prepared(self, cur, name: str, sql: str, params: Sequence):
+        """
+        Run ``sql`` (written with $1..$n placeholders) as a named prepared
+        statement, preparing it on first use for this connection.
+        """
+        prepared = self._prepared.setdefault(id(cur.connection), set())
+        if name not in prepared:
+            cur.execute(f"PREPARE {name} AS {sql}")
+            prepared.add(name)
+        placeholders = ", ".join(["%s"] * len(params))
+        cur.execute(f"EXECUTE {name} ({placeholders})", tuple(params))
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None and not self._pool.closed:
+                self._pool.closeall()
+            self._pool = None
+            self._prepared.clear()
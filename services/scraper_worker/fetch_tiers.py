@@ -0,0 +1,111 @@
+import logging
+import os
+import re
+import time
+from typing import Dict, Tuple
+
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+TIER_HTTP = "http"
+TIER_BROWSER = "browser"
+
+FETCH_TIER_RESULT = Counter(
+    "scraper_fetch_tier_total",
+    "Fetch attempts per tier and outcome",
+    ["domain", "tier", "outcome"],
+)
+FETCH_TIER_LATENCY = Histogram(
+    "scraper_fetch_tier_latency_seconds",
+    "Fetch latency per tier",
+    ["tier"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0),
+)
+
+# Markers of a client-rendered shell that needs a real browser to show prices
+_JS_SHELL_PATTERNS = re.compile(
+    r"enable javascript|javascript is (?:disabled|required)|please turn on javascript"
+    r"|<div id=\"(?:root|app|__next)\">\s*</div>",
+    re.IGNORECASE,
+)
+
+
+def looks_like_js_shell(html: str) -> bool:
+    if not html or len(html) < 512:
+        return True
+    return bool(_JS_SHELL_PATTERNS.search(html))
+
+
+class FetchTierPolicy:
+    """
+    Learns per domain whether the cheap HTTP tier works.
+
+    After ``failure_threshold`` consecutive HTTP misses the domain is pinned to
+    the browser tier in Redis for ``retry_after`` seconds, so every worker skips
+    the failing tier until it is worth probing again.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        http_enabled: bool = None,
+        failure_threshold: int = None,
+        retry_after: int = None,
+        cache_ttl: float = 60.0,
+    ):
+        self.redis = redis_client
+        if http_enabled is None:
+            http_enabled = os.getenv("HTTP_FIRST_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.http_enabled = http_enabled
+        self.failure_threshold = failure_threshold or int(os.getenv("HTTP_TIER_FAILURE_THRESHOLD", "3"))
+        self.retry_after = retry_after or int(os.getenv("HTTP_TIER_RETRY_AFTER_SECONDS", "86400"))
+        self.cache_ttl = cache_ttl
+        self._failures: Dict[str, int] = {}
+        self._cache: Dict[str, Tuple[str, float]] = {}
+
+    @staticmethod
+    def _key(domain: str) -> str:
+        return f"fetch_tier:{domain}"
+
+    async def preferred_tier(self, domain: str) -> str:
+        if not self.http_enabled:
+            return TIER_BROWSER
+
+        cached = self._cache.get(domain)
+        now = time.time()
+        if cached and cached[1] > now:
+            return cached[0]
+
+        tier = TIER_HTTP
+        try:
+            if await self.redis.get(self._key(domain)) == TIER_BROWSER:
+                tier = TIER_BROWSER
+        except Exception as e:
+            logger.warning(f"Could not read fetch tier for {domain}: {e}")
+        self._cache[domain] = (tier, now + self.cache_ttl)
+        return tier
+
+    async def record(self, domain: str, tier: str, success: bool, latency_seconds: float = None):
+        FETCH_TIER_RESULT.labels(
+            domain=domain, tier=tier, outcome="success" if success else "failure"
+        ).inc()
+        if latency_seconds is not None:
+            FETCH_TIER_LATENCY.labels(tier=tier).observe(latency_seconds)
+
+        if tier != TIER_HTTP:
+            return
+
+        if success:
+            self._failures[domain] = 0
+            return
+
+        self._failures[domain] = self._failures.get(domain, 0) + 1
+        if self._failures[domain] >= self.failure_threshold:
+            logger.info(f"HTTP tier keeps failing for {domain}, pinning to browser tier")
+            self._failures[domain] = 0
+            self._cache[domain] = (TIER_BROWSER, time.time() + self.retry_after)
+            try:
+                await self.redis.setex(self._key(domain), self.retry_after, TIER_BROWSER)
+            except Exception as e:
+                logger.warning(f"Could not persist fetch tier for {domain}: {e}")
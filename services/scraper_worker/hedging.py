@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+try:
+    from .resilience import RetryBudget
+except ImportError:
+    from resilience import RetryBudget
+
+logger = logging.getLogger(__name__)
+
+HEDGES = Counter(
+    "scraper_hedges_total",
+    "Hedged fetches: launched, won (backup finished first), lost, skipped or over_budget",
+    ["outcome"],
+)
+FETCH_SECONDS = Histogram(
+    "scraper_hedged_fetch_seconds",
+    "Browser fetch latency seen by the scrape, by whether a backup was launched",
+    ["hedged"],
+    buckets=(0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60),
+)
+LATENCY_QUANTILE = Gauge(
+    "scraper_fetch_latency_quantile_seconds",
+    "Rolling fetch latency quantiles per domain: single attempts vs what the scrape saw with hedging",
+    ["domain", "quantile", "series"],
+)
+
+QUANTILES = (0.95, 0.99)
+
+
+class HedgeSkipped(Exception):
+    """The backup attempt could not be started (no other proxy, no tokens)."""
+
+
+class LatencyWindow:
+    """The last ``size`` latencies of a domain, for percentiles."""
+
+    def __init__(self, size: int):
+        self._samples: deque = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+
+class Hedger:
+    """
+    Hedged requests for browser fetches.
+
+    The primary fetch starts as usual. If it has not finished by the domain's
+    ``quantile`` latency (wall time of recent attempts, including session
+    checkout and pool waits), a backup starts
+    through another proxy and session; whichever finishes first is used and
+    the other is cancelled. Backups are capped at ``max_ratio`` of fetches,
+    so hedging only spends a few percent more requests on the slow tail.
+
+    Latencies are tracked even with hedging disabled, so the p95/p99 gauges
+    give a baseline to compare against once it is switched on.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = None,
+        quantile: float = None,
+        max_ratio: float = None,
+        min_samples: int = None,
+        window: int = 200,
+        budget_window: float = 300.0,
+    ):
+        if enabled is None:
+            enabled = os.getenv("HEDGING_ENABLED", "false").lower() in ("1", "true", "yes")
+        self.enabled = enabled
+        self.quantile = quantile or float(os.getenv("HEDGE_QUANTILE", "0.95"))
+        max_ratio = max_ratio if max_ratio is not None else float(os.getenv("HEDGE_MAX_RATIO", "0.05"))
+        self.min_samples = min_samples or int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+        self.budget = RetryBudget(ratio=max_ratio, min_retries=0, window=budget_window)
+        self._window = window
+        # Per domain: single attempts (sets the hedge delay) and what callers saw
+        self._attempts: Dict[str, LatencyWindow] = {}
+        self._observed: Dict[str, LatencyWindow] = {}
+
+    def _series(self, series: Dict[str, LatencyWindow], domain: str) -> LatencyWindow:
+        window = series.get(domain)
+        if window is None:
+            window = series[domain] = LatencyWindow(self._window)
+        return window
+
+    def delay(self, domain: str) -> Optional[float]:
+        """Seconds to wait before hedging, or None until enough samples exist."""
+        attempts = self._series(self._attempts, domain)
+        if not self.enabled or len(attempts) < self.min_samples:
+            return None
+        return attempts.percentile(self.quantile)
+
+    def _record_attempt(self, domain: str, seconds: float):
+        self._series(self._attempts, domain).add(seconds)
+
+    def _record_observed(self, domain: str, seconds: float, hedged: bool):
+        FETCH_SECONDS.labels(hedged="yes" if hedged else "no").observe(seconds)
+        self._series(self._observed, domain).add(seconds)
+        for q in QUANTILES:
+            for series, windows in (("attempt", self._attempts), ("observed", self._observed)):
+                value = self._series(windows, domain).percentile(q)
+                if value is not None:
+                    LATENCY_QUANTILE.labels(domain=domain, quantile=str(q), series=series).set(value)
+
+    async def run(
+        self,
+        domain: str,
+        primary: Callable[[], Awaitable[Any]],
+        backup: Callable[[], Awaitable[Any]],
+        discard: Optional[Callable[[Any], Awaitable[None]]] = None,
+    ) -> Any:
+        """
+        Result of ``primary()``, or of ``backup()`` when the primary is slow
+        and the backup finishes first. ``backup`` may raise HedgeSkipped.
+        A result that also finished but was not used goes to ``discard``;
+        an unfinished one is cancelled and waited for, so its cleanup is done
+        when this returns.
+        """
+        self.budget.record_request()
+        start = time.perf_counter()
+        first = asyncio.ensure_future(primary())
+        started = {first: start}
+        delay = self.delay(domain)
+        second = winner = None
+        finished = None
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            if not done:
+                if self.budget.try_retry():
+                    HEDGES.labels(outcome="launched").inc()
+                    logger.info(f"{domain} fetch slower than {delay:.1f}s, hedging")
+                    second = asyncio.ensure_future(self._backup(backup))
+                    started[second] = time.perf_counter()
+                else:
+                    HEDGES.labels(outcome="over_budget").inc()
+            winner = await self._first_success(first, second)
+            finished = time.perf_counter()
+        finally:
+            cancelled = []
+            for task in (first, second):
+                if task is None or task is winner:
+                    continue
+                if not task.done():
+                    task.cancel()
+                    cancelled.append(task)
+                    # Censored sample: the attempt took at least this long
+                    self._record_attempt(domain, time.perf_counter() - started[task])
+                elif discard is not None and not task.cancelled() and task.exception() is None:
+                    await discard(task.result())
+            if cancelled:
+                await asyncio.gather(*cancelled, return_exceptions=True)
+
+        result = winner.result()
+        self._record_attempt(domain, finished - started[winner])
+        if second is not None:
+            if winner is second:
+                HEDGES.labels(outcome="won").inc()
+            elif second.done() and not second.cancelled() and isinstance(second.exception(), HedgeSkipped):
+                HEDGES.labels(outcome="skipped").inc()
+            else:
+                HEDGES.labels(outcome="lost").inc()
+        self._record_observed(domain, finished - start, hedged=second is not None)
+        return result
+
+    async def _backup(self, backup: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            return await backup()
+        except HedgeSkipped:
+            # Never started, so it does not count against the hedge budget
+            self.budget.refund()
+            raise
+
+    @staticmethod
+    async def _first_success(first: asyncio.Future, second: Optional[asyncio.Future]) -> asyncio.Future:
+        """The first task to finish without error; the primary's error if both fail."""
+        pending = {first} if second is None else {first, second}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task
+        return first
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import os
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+try:
+    from .ua_manager import pick_ua, get_random_headers
+except ImportError:
+    from ua_manager import pick_ua, get_random_headers
+
+logger = logging.getLogger(__name__)
+
+try:  # httpx only decodes brotli when the optional package is installed
+    import brotli  # noqa: F401
+    _ACCEPT_ENCODING = None
+except ImportError:
+    _ACCEPT_ENCODING = "gzip, deflate"
+
+
+class HttpFetcher:
+    """
+    Plain HTTP fetch tier. Much cheaper than a browser for sites that render
+    the price server-side; returns the same result shape as PlaywrightDriver.
+    """
+
+    def __init__(self, proxy_manager=None, timeout: float = None, max_connections: int = None):
+        self.proxy_manager = proxy_manager
+        self.timeout = timeout or float(os.getenv("HTTP_FETCH_TIMEOUT_SECONDS", "15"))
+        self.max_connections = max_connections or int(os.getenv("HTTP_FETCH_MAX_CONNECTIONS", "20"))
+        # One pooled client per proxy: httpx binds proxies at the client level
+        self._clients: Dict[Optional[str], httpx.AsyncClient] = {}
+
+    def _client(self, proxy: Optional[str]) -> httpx.AsyncClient:
+        client = self._clients.get(proxy)
+        if client is None:
+            client = httpx.AsyncClient(
+                proxies=proxy,
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=self.max_connections),
+            )
+            self._clients[proxy] = client
+        return client
+
+    def _headers(self, user_agent: str) -> dict:
+        headers = get_random_headers()
+        headers["User-Agent"] = user_agent
+        if _ACCEPT_ENCODING:
+            headers["Accept-Encoding"] = _ACCEPT_ENCODING
+        return headers
+
+    async def fetch_page(self, url: str, proxy: Optional[str] = None) -> Dict:
+        # Callers that rate-limit per proxy pass the proxy they were admitted with
+        if proxy is None and self.proxy_manager:
+            proxy = self.proxy_manager.get_proxy()
+        user_agent = pick_ua()
+
+        domain = urlparse(url).hostname or ""
+
+        start_time = asyncio.get_event_loop().time()
+        try:
+            response = await self._client(proxy).get(url, headers=self._headers(user_agent))
+        except Exception as e:
+            if self.proxy_manager:
+                elapsed_ms = (asyncio.get_event_loop().time() - start_time) * 1000
+                self.proxy_manager.mark_failure(proxy, str(e), domain, elapsed_ms)
+            raise
+
+        response_time = int((asyncio.get_event_loop().time() - start_time) * 1000)
+        if self.proxy_manager:
+            self.proxy_manager.record_response(proxy, domain, response.status_code, response_time)
+
+        return {
+            "status": response.status_code,
+            "html": response.text,
+            "screenshot": None,
+            "proxy": proxy,
+            "user_agent": user_agent,
+            "response_time_ms": response_time,
+            "tier": "http",
+        }
+
+    async def close(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
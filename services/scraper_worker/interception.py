@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import os
+from typing import List, Optional, Set
+
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+FETCH_BYTES = Histogram(
+    "scraper_fetch_bytes",
+    "Bytes transferred per browser fetch (headers + bodies)",
+    ["domain"],
+    buckets=(50e3, 100e3, 250e3, 500e3, 1e6, 2e6, 4e6, 8e6, 16e6),
+)
+BLOCKED_REQUESTS = Counter(
+    "scraper_blocked_requests_total",
+    "Sub-requests aborted by the interception policy",
+    ["domain", "reason"],
+)
+
+# Nothing we extract prices from lives in these
+DEFAULT_BLOCKED_TYPES = {"image", "media", "font", "stylesheet"}
+
+# Third-party analytics/ads that only cost bandwidth through paid proxies
+DEFAULT_BLOCKED_PATTERNS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "amazon-adsystem.com",
+    "facebook.net",
+    "connect.facebook",
+    "hotjar.com",
+    "criteo.",
+    "scorecardresearch.com",
+    "adservice.",
+]
+
+
+def _csv_env(name: str) -> List[str]:
+    return [item.strip() for item in os.getenv(name, "").split(",") if item.strip()]
+
+
+def _domain_matches(host: str, domain: str) -> bool:
+    return host == domain or host.endswith("." + domain)
+
+
+class InterceptionPolicy:
+    """
+    Per-domain route policy for Playwright page loads.
+
+    Resource types in ``blocked_types`` and URLs containing any of
+    ``blocked_patterns`` are aborted. Domains on the allowlist (sites that break
+    without their CSS/JS) keep every resource type and only lose trackers.
+    """
+
+    def __init__(
+        self,
+        blocked_types: Optional[Set[str]] = None,
+        blocked_patterns: Optional[List[str]] = None,
+        allowlist_domains: Optional[List[str]] = None,
+        enabled: bool = None,
+    ):
+        if enabled is None:
+            enabled = os.getenv("INTERCEPT_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.enabled = enabled
+        self.blocked_types = (
+            set(blocked_types)
+            if blocked_types is not None
+            else set(_csv_env("INTERCEPT_BLOCK_TYPES")) or set(DEFAULT_BLOCKED_TYPES)
+        )
+        self.blocked_patterns = (
+            list(blocked_patterns)
+            if blocked_patterns is not None
+            else DEFAULT_BLOCKED_PATTERNS + _csv_env("INTERCEPT_BLOCK_PATTERNS")
+        )
+        self.allowlist_domains = (
+            list(allowlist_domains)
+            if allowlist_domains is not None
+            else _csv_env("INTERCEPT_ALLOWLIST_DOMAINS")
+        )
+
+    def is_allowlisted(self, domain: str) -> bool:
+        return any(_domain_matches(domain, allowed) for allowed in self.allowlist_domains)
+
+    def block_reason(self, domain: str, resource_type: str, url: str) -> Optional[str]:
+        """Return why a sub-request should be aborted, or None to let it through."""
+        if not self.enabled:
+            return None
+        if any(pattern in url for pattern in self.blocked_patterns):
+            return "pattern"
+        if resource_type in self.blocked_types and not self.is_allowlisted(domain):
+            return resource_type
+        return None
+
+    async def attach(self, page, domain: str):
+        if not self.enabled:
+            return
+
+        async def _route(route):
+            request = route.request
+            reason = self.block_reason(domain, request.resource_type, request.url)
+            try:
+                if reason:
+                    BLOCKED_REQUESTS.labels(domain=domain, reason=reason).inc()
+                    await route.abort()
+                else:
+                    await route.continue_()
+            except Exception as e:
+                # Page may already be closing; nothing to salvage here
+                logger.debug(f"Route handling failed for {request.url[:80]}: {e}")
+
+        await page.route("**/*", _route)
+
+
+class TransferMeter:
+    """Sums bytes received by a page from Playwright's per-request sizes."""
+
+    def __init__(self, page):
+        self._pending: List[asyncio.Future] = []
+        page.on("requestfinished", self._on_finished)
+
+    def _on_finished(self, request):
+        self._pending.append(asyncio.ensure_future(self._size(request)))
+
+    @staticmethod
+    async def _size(request) -> int:
+        try:
+            sizes = await request.sizes()
+            return max(0, sizes.get("responseBodySize", 0)) + max(0, sizes.get("responseHeadersSize", 0))
+        except Exception:
+            return 0
+
+    async def total(self) -> int:
+        if not self._pending:
+            return 0
+        return sum(await asyncio.gather(*self._pending))
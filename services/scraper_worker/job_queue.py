@@ -0,0 +1,249 @@
+import json
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+import redis
+from redis.exceptions import ResponseError
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+# SCRAPER_MODE values: "poll" re-reads all active targets every round (the
+# original behaviour), "queue" consumes jobs the scheduler publishes here.
+MODE_POLL = "poll"
+MODE_QUEUE = "queue"
+
+QUEUE_LAG = Gauge("scrape_queue_lag", "Jobs published but not yet delivered to any worker")
+QUEUE_PENDING = Gauge("scrape_queue_pending", "Jobs delivered to a worker but not yet acknowledged")
+QUEUE_WAIT = Histogram(
+    "scrape_queue_wait_seconds",
+    "Time from publish to first delivery",
+    buckets=(0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 600, 1800),
+)
+JOBS_PUBLISHED = Counter("scrape_queue_published_total", "Jobs offered to the queue", ["result"])
+JOBS_RECLAIMED = Counter("scrape_queue_reclaimed_total", "Stuck jobs reclaimed from another consumer")
+JOBS_DEAD = Counter("scrape_queue_dead_lettered_total", "Jobs moved aside after too many deliveries")
+
+
+def _stream_name() -> str:
+    return os.getenv("JOB_STREAM", "scrape:jobs")
+
+
+def _dedup_key(target_id) -> str:
+    # Held while a target is queued or being scraped, so a slow worker does
+    # not get the same target published to the stream twice
+    return f"scrape:queued:{target_id}"
+
+
+# KEYS[1]    stream
+# KEYS[2..n] dedup key per target
+# ARGV       dedup TTL, stream MAXLEN, enqueued_at, then one JSON target per key
+#
+# Claims each dedup key and appends its job in the same script, so a key is
+# never left set without its job (which would hide the target for the TTL).
+# Returns 1 per published target and 0 per target already queued.
+PUBLISH_LUA = """
+local published = {}
+for i = 2, #KEYS do
+    if redis.call('SET', KEYS[i], '1', 'NX', 'EX', ARGV[1]) then
+        redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[2], '*',
+            'target', ARGV[i + 2], 'enqueued_at', ARGV[3])
+        published[#published + 1] = 1
+    else
+        published[#published + 1] = 0
+    end
+end
+return published
+"""
+
+
+@dataclass
+class Job:
+    message_id: str
+    target: Dict
+    enqueued_at: float
+
+
+class JobPublisher:
+    """
+    Scheduler side of the queue: appends scrape jobs to a Redis Stream.
+
+    Synchronous, like the rest of the scheduler's tasks. Targets already
+    queued or in flight are skipped via a per-target key that the consumer
+    deletes on ack (and that expires after ``dedup_ttl`` as a safety net).
+    The key and the job are written by one script, so a failed publish
+    leaves neither behind and the scheduler can simply publish again.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis = None,
+        stream: str = None,
+        dedup_ttl: int = None,
+        maxlen: int = None,
+    ):
+        self.redis = redis_client or redis.Redis.from_url(
+            os.getenv("REDIS_URL", "redis://localhost:6379/0"), decode_responses=True
+        )
+        self.stream = stream or _stream_name()
+        self.dedup_ttl = dedup_ttl or int(os.getenv("JOB_DEDUP_TTL_SECONDS", "3600"))
+        self.maxlen = maxlen or int(os.getenv("JOB_STREAM_MAXLEN", "100000"))
+        self._script = self.redis.register_script(PUBLISH_LUA)
+
+    def publish(self, targets: Iterable[Dict]) -> int:
+        targets = [t for t in targets if t.get("id")]
+        if not targets:
+            return 0
+
+        claimed = self._script(
+            keys=[self.stream] + [_dedup_key(t["id"]) for t in targets],
+            args=[self.dedup_ttl, self.maxlen, str(time.time())]
+            + [json.dumps(t, default=str) for t in targets],
+        )
+        fresh = sum(1 for flag in claimed if int(flag))
+
+        JOBS_PUBLISHED.labels(result="published").inc(fresh)
+        JOBS_PUBLISHED.labels(result="duplicate").inc(len(targets) - fresh)
+        return fresh
+
+
+class JobQueue:
+    """
+    Worker side of the queue: a consumer in a Redis Streams consumer group.
+
+    Each job is delivered to exactly one worker and stays pending until acked.
+    Jobs left unacknowledged for ``visibility_timeout`` seconds (a worker died
+    or hung) are taken over with XAUTOCLAIM; after ``max_deliveries`` attempts
+    a job is moved to ``<stream>:dead`` instead of being retried forever.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        consumer: str = None,
+        stream: str = None,
+        group: str = None,
+        visibility_timeout: float = None,
+        max_deliveries: int = None,
+        block_ms: int = 5000,
+    ):
+        self.redis = redis_client
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.stream = stream or _stream_name()
+        self.group = group or os.getenv("JOB_GROUP", "scrapers")
+        self.visibility_timeout = visibility_timeout or float(
+            os.getenv("JOB_VISIBILITY_TIMEOUT_SECONDS", "300")
+        )
+        self.max_deliveries = max_deliveries or int(os.getenv("JOB_MAX_DELIVERIES", "3"))
+        self.block_ms = block_ms
+        self._claim_cursor = "0-0"
+
+    async def ensure_group(self):
+        try:
+            await self.redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def _decode(self, message_id: str, fields: Optional[Dict]) -> Optional[Job]:
+        try:
+            return Job(
+                message_id=message_id,
+                target=json.loads(fields["target"]),
+                enqueued_at=float(fields.get("enqueued_at", 0)),
+            )
+        except (TypeError, KeyError, ValueError) as e:
+            logger.error(f"Dropping malformed job {message_id}: {e}")
+            return None
+
+    async def claim(self, count: int) -> List[Job]:
+        """
+        Up to ``count`` jobs: stuck ones reclaimed from other consumers first,
+        then new deliveries (blocking up to ``block_ms`` when there are none).
+        """
+        jobs = await self._reclaim(count)
+        if len(jobs) < count:
+            response = await self.redis.xreadgroup(
+                self.group,
+                self.consumer,
+                {self.stream: ">"},
+                count=count - len(jobs),
+                block=None if jobs else self.block_ms,
+            )
+            now = time.time()
+            for _stream, messages in response or []:
+                for message_id, fields in messages:
+                    job = self._decode(message_id, fields)
+                    if job is None:
+                        await self.redis.xack(self.stream, self.group, message_id)
+                        continue
+                    QUEUE_WAIT.observe(max(0.0, now - job.enqueued_at))
+                    jobs.append(job)
+        return jobs
+
+    async def _reclaim(self, count: int) -> List[Job]:
+        try:
+            cursor, messages, *_ = await self.redis.xautoclaim(
+                self.stream,
+                self.group,
+                self.consumer,
+                min_idle_time=int(self.visibility_timeout * 1000),
+                start_id=self._claim_cursor,
+                count=count,
+            )
+        except ResponseError as e:
+            logger.warning(f"XAUTOCLAIM failed on {self.stream}: {e}")
+            return []
+        self._claim_cursor = cursor
+
+        jobs = []
+        for message_id, fields in messages:
+            job = self._decode(message_id, fields) if fields else None
+            if job is None:
+                # Trimmed from the stream or unreadable; nothing left to retry
+                await self.redis.xack(self.stream, self.group, message_id)
+                continue
+            if await self._deliveries(message_id) > self.max_deliveries:
+                await self._dead_letter(job, fields)
+                continue
+            JOBS_RECLAIMED.inc()
+            logger.warning(f"Reclaimed stuck job {message_id} for target {job.target.get('id')}")
+            jobs.append(job)
+        return jobs
+
+    async def _deliveries(self, message_id: str) -> int:
+        pending = await self.redis.xpending_range(
+            self.stream, self.group, min=message_id, max=message_id, count=1
+        )
+        return pending[0]["times_delivered"] if pending else 0
+
+    async def _dead_letter(self, job: Job, fields: Dict):
+        logger.error(
+            f"Job {job.message_id} for target {job.target.get('id')} exceeded "
+            f"{self.max_deliveries} deliveries, moving to {self.stream}:dead"
+        )
+        await self.redis.xadd(f"{self.stream}:dead", fields, maxlen=10000, approximate=True)
+        await self.ack(job)
+        JOBS_DEAD.inc()
+
+    async def ack(self, job: Job):
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.xack(self.stream, self.group, job.message_id)
+            pipe.delete(_dedup_key(job.target.get("id")))
+            await pipe.execute()
+
+    async def update_metrics(self):
+        try:
+            groups = await self.redis.xinfo_groups(self.stream)
+        except ResponseError:
+            return
+        for info in groups:
+            if info.get("name") == self.group:
+                QUEUE_PENDING.set(info.get("pending") or 0)
+                # "lag" is reported by Redis 7+
+                if info.get("lag") is not None:
+                    QUEUE_LAG.set(info["lag"])
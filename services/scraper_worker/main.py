@@ -1,6 +1,7 @@
 import asyncio
 import logging
 import os
+import random
 import sys
 from datetime import datetime
 from dotenv import load_dotenv
@@ -8,23 +9,54 @@ from dotenv import load_dotenv
 # Support both "python services/scraper_worker/main.py" and imports via package
 try:  # package-relative imports (for tests, python -m)
     from .proxy_manager import ProxyManager
+    from .proxy_prober import ProxyProber
+    from .session_manager import SessionManager
     from .ua_manager import pick_ua, get_random_headers
     from .playwright_driver import PlaywrightDriver
+    from .http_fetcher import HttpFetcher
+    from .fetch_tiers import FetchTierPolicy, TIER_BROWSER, TIER_HTTP, looks_like_js_shell
+    from .scrape_executor import ScrapeExecutor
     from .parsers.amazon import AmazonParser
     from .parsers.flipkart import FlipkartParser
     from .parsers.generic import GenericParser
-    from .db_manager import DBManager
+    from .parsers.document import ParsedDocument
+    from .async_db_manager import AsyncDBManager
+    from .write_buffer import WriteBehindBuffer
+    from .change_detector import ChangeDetector, OBSERVATIONS
     from .alert_manager import AlertManager
+    from .redis_client import create_redis
+    from .job_queue import JobQueue, MODE_QUEUE
+    from .sharding import ShardMembership, MODE_SHARD
+    from .rate_limiter import RateLimiter
+    from .adaptive_control import AdaptiveController, SiteThrottled, THROTTLE_STATUSES, SUCCESS, ERROR, THROTTLE
+    from .resilience import Resilience, HttpError, classify, CAPTCHA, PARSE, PROXY, THROTTLED
+    from .retry_decorator import call_with_retries
+    from .hedging import Hedger, HedgeSkipped
 except ImportError:  # script-style fallback
     from proxy_manager import ProxyManager
+    from proxy_prober import ProxyProber
+    from session_manager import SessionManager
     from ua_manager import pick_ua, get_random_headers
     from playwright_driver import PlaywrightDriver
+    from http_fetcher import HttpFetcher
+    from fetch_tiers import FetchTierPolicy, TIER_BROWSER, TIER_HTTP, looks_like_js_shell
+    from scrape_executor import ScrapeExecutor
     from parsers.amazon import AmazonParser
     from parsers.flipkart import FlipkartParser
     from parsers.generic import GenericParser
-    from db_manager import DBManager
+    from parsers.document import ParsedDocument
+    from async_db_manager import AsyncDBManager
+    from write_buffer import WriteBehindBuffer
+    from change_detector import ChangeDetector, OBSERVATIONS
     from alert_manager import AlertManager
-import redis
+    from redis_client import create_redis
+    from job_queue import JobQueue, MODE_QUEUE
+    from sharding import ShardMembership, MODE_SHARD
+    from rate_limiter import RateLimiter
+    from adaptive_control import AdaptiveController, SiteThrottled, THROTTLE_STATUSES, SUCCESS, ERROR, THROTTLE
+    from resilience import Resilience, HttpError, classify, CAPTCHA, PARSE, PROXY, THROTTLED
+    from retry_decorator import call_with_retries
+    from hedging import Hedger, HedgeSkipped
 from prometheus_client import Counter, Gauge, start_http_server
 
 # Load environment variables
@@ -47,18 +79,67 @@ SCRAPE_CAPTCHA = Counter("scraper_captcha_total", "Number of captcha encounters"
 SCRAPE_DURATION = Gauge("scraper_last_duration_seconds", "Duration of last scrape per domain", ["domain"])
 
 
+def block_reason(result: dict, captcha: bool = False):
+    """Why the site refused a browser fetch, as a session retirement reason; None if it did not."""
+    if result['status'] in THROTTLE_STATUSES:
+        return f"http_{result['status']}"
+    return "captcha" if captcha else None
+
+
 class ScraperWorker:
     def __init__(self):
-        # Initialize components
+        # Redis for rate limiting and locks (async, pooled)
+        redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+        self.redis = create_redis(redis_url)
+
+        # Initialize components; proxy health is shared with other replicas through Redis
         proxy_list = os.getenv('PROXY_LIST', '').split(',')
-        self.proxy_manager = ProxyManager(proxy_list) if proxy_list[0] else None
+        self.proxy_manager = ProxyManager(proxy_list, redis_client=self.redis) if proxy_list[0] else None
+        # Probes every proxy in the background instead of waiting for scrapes to fail
+        self.prober = ProxyProber(self.proxy_manager) if self.proxy_manager else None
+        # Sticky browser sessions (proxy, UA, cookies) reused across fetches of a domain
+        self.sessions = SessionManager(self.redis)
         self.driver = PlaywrightDriver(self.proxy_manager, type('UA', (), {'pick_ua': pick_ua})())
-        self.db = DBManager()
+        self.db = AsyncDBManager()
+        self.writer = WriteBehindBuffer(self.db)
         self.alerts = AlertManager()
-        
-        # Redis for rate limiting and locks
-        redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
-        self.redis = redis.from_url(redis_url, decode_responses=True)
+
+        # Token buckets shared by all replicas; the executor asks before each
+        # dispatch and runs another domain instead of sleeping
+        self.limiter = RateLimiter(self.redis)
+        self.executor = ScrapeExecutor(gate=self._admit)
+        # AIMD: per-domain rate and concurrency follow what each site tolerates,
+        # starting from the configured values
+        self.control = AdaptiveController(
+            self.redis, self.limiter.rate, self.executor.domain_concurrency
+        )
+        self.limiter.controller = self.control
+        self.executor.controller = self.control
+        # Per-domain circuit breakers: a failing site stops being dispatched to
+        self.resilience = Resilience()
+        # Slow browser fetches get a backup attempt through another proxy
+        self.hedger = Hedger()
+        # Attempts per browser fetch, retries included
+        self.fetch_attempts = int(os.getenv("FETCH_MAX_ATTEMPTS", "3"))
+        # Proxy a target was admitted with, until its scrape picks it up
+        self._admitted = {}
+
+        # Cheap HTTP tier tried before the browser where it has worked before
+        self.http_fetcher = HttpFetcher(self.proxy_manager)
+        self.tiers = FetchTierPolicy(self.redis)
+
+        # Last stored price/hash per target: drives price-drop checks and
+        # lets unchanged scrapes skip inserting a new price_history row
+        self.changes = ChangeDetector(self.redis)
+
+        # "queue" consumes jobs published by the scheduler and "shard" polls but
+        # keeps only this replica's slice, instead of every replica scraping
+        # all active targets
+        self.mode = os.getenv('SCRAPER_MODE', 'poll')
+        self.round_interval = float(os.getenv('SCRAPER_ROUND_INTERVAL_SECONDS', '60'))
+        self.round_jitter = float(os.getenv('SCRAPER_ROUND_JITTER_RATIO', '0.2'))
+        self.jobs = JobQueue(self.redis) if self.mode == MODE_QUEUE else None
+        self.shard = ShardMembership(self.redis) if self.mode == MODE_SHARD else None
         
         # Parser registry
         generic = GenericParser()
@@ -73,6 +154,149 @@ class ScraperWorker:
         # Exact match, else fallback to generic parser if configured
         return self.parsers.get(domain) or self.parsers.get("*")
     
+    def _pick_proxy(self, domain: str = None, exclude: str = None):
+        return self.proxy_manager.get_proxy(domain, exclude=exclude) if self.proxy_manager else None
+
+    async def _admit(self, target: dict) -> float:
+        """Executor gate: check the domain's breaker, then take rate-limit tokens."""
+        domain = target['domain']
+        wait = self.resilience.allow(domain)
+        if wait > 0:
+            return wait
+        proxy = self._pick_proxy(domain)
+        if proxy is None and self.proxy_manager is not None:
+            # Every healthy proxy is blocked by the site. Wait for a block to
+            # end instead of letting the fetchers pick a blocked proxy.
+            self.resilience.release(domain)
+            return max(self.proxy_manager.unblocked_in(domain), 0.1)
+        wait = await self.limiter.acquire(domain, proxy)
+        if wait <= 0:
+            self._admitted[target['id']] = proxy
+        else:
+            # A half-open breaker's trial goes to whichever target gets tokens first
+            self.resilience.release(domain)
+        return wait
+
+    async def _reserve(self, target: dict):
+        """Proxy admitted by the executor, or wait for tokens when called directly."""
+        while target['id'] not in self._admitted:
+            wait = await self._admit(target)
+            if wait > 0:
+                logger.info(f"Rate limited for {target['domain']}, waiting {wait:.1f}s")
+                await asyncio.sleep(wait)
+        return self._admitted.pop(target['id'])
+
+    async def _fetch_http_tier(self, target: dict, parser, proxy=None):
+        """
+        Try the plain HTTP tier. Returns (result, price_data, doc) when the
+        page parsed cleanly, otherwise None so the caller falls back to Playwright.
+        """
+        domain = target['domain']
+        started = asyncio.get_event_loop().time()
+        try:
+            result = await self.http_fetcher.fetch_page(target['url'], proxy=proxy)
+        except Exception as e:
+            logger.info(f"HTTP tier failed for {domain}: {e}")
+            await self.tiers.record(domain, TIER_HTTP, False, asyncio.get_event_loop().time() - started)
+            return None
+
+        # Throttling is about our rate, not the tier: stop instead of retrying in a browser
+        if result['status'] in THROTTLE_STATUSES:
+            raise SiteThrottled(result['status'])
+
+        # Parsed once; the CAPTCHA check, price and fingerprint share it
+        doc = ParsedDocument(result['html'])
+        price_data = None
+        if (
+            result['status'] and result['status'] < 400
+            and not looks_like_js_shell(doc.html)
+            and not parser.detect_captcha(doc)
+        ):
+            price_data = parser.parse_price(doc)
+
+        await self.tiers.record(
+            domain, TIER_HTTP, price_data is not None, result['response_time_ms'] / 1000
+        )
+        if price_data is None:
+            logger.info(f"HTTP tier unusable for {domain}, falling back to browser")
+            return None
+        return result, price_data, doc
+
+    async def _fetch_browser(self, url: str, domain: str, proxy=None):
+        """Browser fetch on a sticky session for the domain and proxy."""
+        session = await self.sessions.checkout(domain, proxy)
+        try:
+            result = await self.driver.fetch_page(url, proxy=proxy, session=session)
+        except BaseException:
+            # Also when cancelled as the slower half of a hedged fetch
+            await self.sessions.checkin(session, error=True)
+            raise
+        return result, session
+
+    async def _fetch_backup(self, url: str, domain: str, proxy=None):
+        """Hedge attempt: another proxy, admitted by the rate limiter like any request."""
+        backup = self._pick_proxy(domain)
+        if proxy is not None and backup in (None, proxy):
+            raise HedgeSkipped("no other healthy proxy")
+        if await self.limiter.acquire(domain, backup) > 0:
+            raise HedgeSkipped("rate limited")
+        return await self._fetch_browser(url, domain, backup)
+
+    async def _fetch_browser_retrying(self, url: str, domain: str, proxy=None):
+        """
+        Hedged browser fetch, retried on transient errors. Each retry takes
+        rate-limit tokens like any request, and a proxy error moves it to
+        another proxy.
+        """
+
+        async def attempt():
+            return await self.hedger.run(
+                domain,
+                lambda: self._fetch_browser(url, domain, proxy),
+                lambda: self._fetch_backup(url, domain, proxy),
+                discard=self._discard_fetch,
+            )
+
+        async def before_retry(exc):
+            nonlocal proxy
+            if classify(exc) == PROXY:
+                proxy = self._pick_proxy(domain, exclude=proxy)
+                if proxy is None and self.proxy_manager is not None:
+                    raise exc
+            while (wait := await self.limiter.acquire(domain, proxy)) > 0:
+                await asyncio.sleep(wait)
+
+        return await call_with_retries(
+            attempt, max_attempts=self.fetch_attempts, before_retry=before_retry, name=f"fetch {domain}"
+        )
+
+    async def _discard_fetch(self, fetched):
+        """Return the session of a hedged fetch that finished second."""
+        result, session = fetched
+        await self.sessions.checkin(
+            session, blocked=block_reason(result), latency_ms=result['response_time_ms']
+        )
+
+    async def _previous_state(self, target_id):
+        state = await self.changes.get(target_id)
+        if state is None:
+            latest = await self.db.get_latest_price(target_id)
+            if latest:
+                self.changes.seed(target_id, latest['price'])
+                state = await self.changes.get(target_id)
+        return state
+
+    async def _warm_price_cache(self, targets):
+        # One DISTINCT ON query per round instead of a SELECT per scrape
+        missing = [t['id'] for t in targets if not self.changes.has_state(t['id'])]
+        if not missing:
+            return
+        latest = await self.db.get_latest_prices(missing)
+        for target_id in missing:
+            price = latest.get(str(target_id))
+            if price is not None:
+                self.changes.seed(target_id, price)
+
     async def scrape_target(self, target: dict):
         target_id = target['id']
         domain = target['domain']
@@ -80,19 +304,11 @@ class ScraperWorker:
         
         logger.info(f"Scraping target {target_id}: {domain}")
         
-        # Check rate limit
-        rate_limit_key = f"rate_limit:{domain}"
-        if self.redis.exists(rate_limit_key):
-            wait_time = self.redis.ttl(rate_limit_key)
-            logger.info(f"Rate limited for {domain}, waiting {wait_time}s")
-            await asyncio.sleep(wait_time)
+        # Tokens are normally taken by the executor gate before dispatch
+        proxy = await self._reserve(target)
         
         try:
             start_time = asyncio.get_event_loop().time()
-            # Fetch page
-            result = await self.driver.fetch_page(url)
-            html = result['html']
-            status = result['status']
             
             # Get appropriate parser
             parser = self.get_parser(domain)
@@ -100,28 +316,59 @@ class ScraperWorker:
                 logger.error(f"No parser for domain: {domain}")
                 return
             
-            # Check for CAPTCHA
-            if parser.detect_captcha(html):
-                logger.warning(f"CAPTCHA detected for target {target_id}")
-                self.alerts.alert_captcha_encounter(target, result.get('screenshot'))
-                self.db.update_scrape_job(target_id, 'captcha', 'CAPTCHA encountered')
-                # Set longer rate limit after CAPTCHA
-                self.redis.setex(rate_limit_key, 300, "1")
-                return
+            fetched = None
+            if await self.tiers.preferred_tier(domain) == TIER_HTTP:
+                fetched = await self._fetch_http_tier(target, parser, proxy)
             
-            # Parse price
-            price_data = parser.parse_price(html)
-            if not price_data:
-                logger.error(f"Could not parse price for target {target_id}")
-                self.db.update_scrape_job(target_id, 'failed', 'Price parsing failed')
-                return
+            if fetched:
+                result, price_data, doc = fetched
+            else:
+                # Fetch page on a sticky session, hedged through another proxy when slow
+                result, session = await self._fetch_browser_retrying(url, domain, proxy)
+                proxy = result.get('proxy', proxy)
+                doc = ParsedDocument(result['html'])
+                captcha = parser.detect_captcha(doc)
+                await self.sessions.checkin(
+                    session, blocked=block_reason(result, captcha), latency_ms=result['response_time_ms']
+                )
+                if result['status'] in THROTTLE_STATUSES:
+                    raise SiteThrottled(result['status'])
+                
+                # Check for CAPTCHA
+                if captcha:
+                    logger.warning(f"CAPTCHA detected for target {target_id}")
+                    SCRAPE_CAPTCHA.labels(domain=domain).inc()
+                    await self.tiers.record(domain, TIER_BROWSER, False, result['response_time_ms'] / 1000)
+                    self.alerts.alert_captcha_encounter(target, result.get('screenshot'))
+                    self.writer.add_job_update(target_id, 'captcha', 'CAPTCHA encountered')
+                    await self.control.record(domain, THROTTLE)
+                    self._record_outcome(target, CAPTCHA)
+                    if self.proxy_manager and proxy:
+                        self.proxy_manager.mark_blocked(proxy, domain)
+                    return
+                # Error pages are not parsed; 5xx were already retried by the driver
+                if result['status'] and result['status'] >= 400:
+                    raise HttpError(result['status'])
+                
+                # Parse price
+                price_data = parser.parse_price(doc)
+                await self.tiers.record(
+                    domain, TIER_BROWSER, price_data is not None, result['response_time_ms'] / 1000
+                )
+                if not price_data:
+                    logger.error(f"Could not parse price for target {target_id}")
+                    self.writer.add_job_update(target_id, 'failed', 'Price parsing failed')
+                    # Often a soft block page, so it counts against the domain's error ratio
+                    await self.control.record(domain, ERROR)
+                    self._record_outcome(target, PARSE)
+                    return
             
             # Check for price drop
-            latest_price = self.db.get_latest_price(target_id)
-            if latest_price and price_data['price'] < latest_price['price'] * 0.95:
+            previous = await self._previous_state(target_id)
+            if previous and price_data['price'] < previous.price * 0.95:
                 self.alerts.alert_price_drop(
                     target,
-                    latest_price['price'],
+                    previous.price,
                     price_data['price']
                 )
             
@@ -130,53 +377,101 @@ class ScraperWorker:
                 'target_id': target_id,
                 'price': price_data['price'],
                 'currency': price_data['currency'],
-                'raw_html': html[:5000],  # Store first 5000 chars
+                'raw_html': doc.html[:5000],  # Store first 5000 chars
                 'screenshot_url': result.get('screenshot'),
                 'proxy_used': result.get('proxy'),
                 'user_agent': result.get('user_agent'),
                 'response_time_ms': result.get('response_time_ms'),
-                'content_hash': parser.compute_content_hash(html)
+                # Region fingerprint from the parser; full-page hash as a last resort
+                'content_hash': price_data.get('content_hash') or parser.compute_content_hash(doc)
             }
             
-            self.db.save_price_history(save_data)
-            self.db.update_scrape_job(target_id, 'success')
+            # Buffered: flushed in bulk by the write-behind buffer. An unchanged
+            # price and product region only bumps last_seen_at on the existing row.
+            if self.changes.is_unchanged(previous, price_data['price'], save_data['content_hash']):
+                self.writer.add_observation(target_id)
+                OBSERVATIONS.labels(domain=domain, result="unchanged").inc()
+            else:
+                self.writer.add_price(save_data)
+                OBSERVATIONS.labels(domain=domain, result="changed").inc()
+            self.writer.add_job_update(target_id, 'success')
+            await self.changes.remember(target_id, price_data['price'], save_data['content_hash'])
             SCRAPE_SUCCESS.labels(domain=domain).inc()
+            await self.control.record(domain, SUCCESS)
+            self._record_outcome(target)
             SCRAPE_DURATION.labels(domain=domain).set(asyncio.get_event_loop().time() - start_time)
             
-            # Set normal rate limit
-            self.redis.setex(rate_limit_key, 5, "1")
-            
             logger.info(f"Successfully scraped {domain}: ₹{price_data['price']}")
             
+        except SiteThrottled as e:
+            logger.warning(f"{domain} throttled target {target_id}: {e}")
+            self.writer.add_job_update(target_id, 'failed', str(e))
+            SCRAPE_FAILURE.labels(domain=domain).inc()
+            await self.control.record(domain, THROTTLE)
+            self._record_outcome(target, THROTTLED)
         except Exception as e:
-            logger.error(f"Error scraping target {target_id}: {e}")
-            self.db.update_scrape_job(target_id, 'failed', str(e))
+            kind = classify(e)
+            logger.error(f"Error scraping target {target_id} ({kind}): {e}")
+            self.writer.add_job_update(target_id, 'failed', str(e))
             SCRAPE_FAILURE.labels(domain=domain).inc()
-            # Set rate limit on error
-            self.redis.setex(rate_limit_key, 30, "1")
+            await self.control.record(domain, ERROR)
+            self._record_outcome(target, kind)
+
+    def _record_outcome(self, target: dict, kind: str = None):
+        """Feed the domain's circuit breaker; alert when it opens."""
+        if self.resilience.record(target['domain'], kind):
+            logger.error(f"Circuit opened for {target['domain']} after repeated failures")
+            self.alerts.alert_repeated_errors(target, self.resilience.failure_threshold)
     
     async def run(self):
         logger.info("Scraper worker starting...")
-        
+        await self.driver.start()
+        await self.writer.start()
+        await self.alerts.start()
+        if self.shard is not None:
+            await self.shard.start()
+        if self.proxy_manager is not None:
+            await self.proxy_manager.start()
+            await self.prober.start()
+        try:
+            if self.jobs is not None:
+                await self._consume_loop()
+            else:
+                await self._run_loop()
+        finally:
+            if self.shard is not None:
+                await self.shard.close()
+            if self.proxy_manager is not None:
+                await self.prober.close()
+                await self.proxy_manager.close()
+            await self.writer.close()
+            await self.alerts.close()
+            await self.driver.close()
+            await self.http_fetcher.close()
+            await self.redis.aclose()
+            await self.db.close()
+
+    async def _run_loop(self):
         while True:
             try:
                 # Get active targets from database
-                targets = self.db.get_active_targets()
+                targets = await self.db.get_active_targets()
                 logger.info(f"Found {len(targets)} active targets")
+                if self.shard is not None:
+                    targets = self.shard.filter(targets)
+                    logger.info(
+                        f"Own {len(targets)} targets as 1 of {len(self.shard.ring.members)} replicas"
+                    )
+                await self._warm_price_cache(targets)
+                await self.control.refresh(t['domain'] for t in targets)
                 
-                # Scrape each target
-                for target in targets:
-                    try:
-                        await self.scrape_target(target)
-                        # Polite delay between targets
-                        await asyncio.sleep(2)
-                    except Exception as e:
-                        logger.error(f"Failed to scrape target {target['id']}: {e}")
-                        continue
+                # Scrape targets concurrently, bounded globally and per domain
+                await self.executor.run(targets, self.scrape_target)
                 
-                # Wait before next round
-                logger.info("Scrape round completed, waiting 60 seconds...")
-                await asyncio.sleep(60)
+                # Wait before next round; jittered so replicas drift apart
+                pause = self.round_interval * random.uniform(1 - self.round_jitter, 1 + self.round_jitter)
+                logger.info(f"Scrape round completed, waiting {pause:.0f} seconds...")
+                await asyncio.sleep(pause)
                 
             except KeyboardInterrupt:
                 logger.info("Shutting down...")
@@ -185,6 +480,47 @@ class ScraperWorker:
                 logger.error(f"Worker error: {e}")
                 await asyncio.sleep(10)
 
+    async def _consume_loop(self):
+        await self.jobs.ensure_group()
+        logger.info(f"Consuming scrape jobs from {self.jobs.stream} as {self.jobs.consumer}")
+        claimed = {}
+
+        async def claim(count):
+            # Called by the executor whenever slots free up, so one slow
+            # scrape never holds back the jobs claimed alongside it
+            try:
+                jobs = await self.jobs.claim(count)
+                await self.jobs.update_metrics()
+                if jobs:
+                    await self._warm_price_cache([job.target for job in jobs])
+                    await self.control.refresh(job.target['domain'] for job in jobs)
+            except Exception as e:
+                logger.error(f"Worker error: {e}")
+                await asyncio.sleep(10)
+                return []
+            for job in jobs:
+                claimed[id(job.target)] = job
+            return [job.target for job in jobs]
+
+        async def scrape_and_ack(target):
+            try:
+                await self.scrape_target(target)
+            finally:
+                # Outcome is recorded on the scrape job; retries come
+                # from the next schedule, not redelivery
+                await self.jobs.ack(claimed.pop(id(target)))
+
+        async def release(target):
+            # Domain is cooling down; the next schedule republishes it
+            await self.jobs.ack(claimed.pop(id(target)))
+
+        while True:
+            try:
+                await self.executor.run([], scrape_and_ack, on_skip=release, refill=claim)
+            except Exception as e:
+                logger.error(f"Worker error: {e}")
+                await asyncio.sleep(10)
+
 if __name__ == "__main__":
     worker = ScraperWorker()
     start_http_server(int(os.getenv("SCRAPER_METRICS_PORT", "8001")))
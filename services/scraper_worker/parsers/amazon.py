@@ -1,19 +1,30 @@
 import re
-import json
 import logging
-from bs4 import BeautifulSoup
 from typing import Optional, Dict
 from .base_parser import BaseParser
+from .document import ParsedDocument
+from .plans import PriceStrategy
 
 logger = logging.getLogger(__name__)
 
 class AmazonParser(BaseParser):
+    FINGERPRINT_REGIONS = {
+        "title": ["#productTitle"],
+        "price": [".a-price-whole", "#priceblock_ourprice", "#priceblock_dealprice"],
+        "availability": ["#availability"],
+        "seller": ["#sellerProfileTriggerId", "#merchant-info"],
+    }
+    PRICE_STRATEGIES = [
+        PriceStrategy("css_selector", ".a-price-whole"),
+        PriceStrategy("json_ld"),
+        PriceStrategy("meta_tag", 'meta[property="product:price:amount"]'),
+    ]
+
     def __init__(self):
         super().__init__("amazon.in")
         
-    def parse_price(self, html: str) -> Optional[Dict]:
-        soup = BeautifulSoup(html, 'lxml')
-        
+    def extract_price(self, doc: ParsedDocument) -> Optional[Dict]:
+        soup = doc.soup
         # Strategy 1: Standard price span
         price_whole = soup.select_one('.a-price-whole')
         if price_whole:
@@ -28,10 +39,8 @@ class AmazonParser(BaseParser):
                 pass
         
         # Strategy 2: JSON-LD structured data
-        scripts = soup.find_all('script', type='application/ld+json')
-        for script in scripts:
+        for data in doc.json_ld:
             try:
-                data = json.loads(script.string)
                 if isinstance(data, dict) and 'offers' in data:
                     price = data['offers'].get('price')
                     if price:
@@ -40,7 +49,7 @@ class AmazonParser(BaseParser):
                             "currency": "INR",
                             "method": "json_ld"
                         }
-            except:
+            except (AttributeError, TypeError, ValueError):
                 continue
         
         # Strategy 3: Meta tags
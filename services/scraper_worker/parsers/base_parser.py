@@ -1,30 +1,194 @@
 import hashlib
 import logging
-from bs4 import BeautifulSoup
-from typing import Optional, Dict
+import re
+import soupsieve
+from prometheus_client import Counter
+from typing import Optional, Dict, List, Tuple, Union
+from .document import ParsedDocument
+from .plans import PricePlan, PriceStrategy, RegionPlan, element_text
 
 logger = logging.getLogger(__name__)
 
+PARSE_PATH = Counter(
+    "scraper_parse_path_total",
+    "Price extractions by path: compiled lxml plan or BeautifulSoup fallback",
+    ["domain", "path"],
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+# Lowercase ASCII; "captcha" also covers recaptcha and g-recaptcha
+CAPTCHA_MARKERS = [
+    b"captcha",
+    b"cf-chl-manual-challenge",  # Cloudflare
+    b"verify you are human",
+    b"robot check",
+    b"security check",
+]
+
+
 class BaseParser:
+    # Elements that make up the product region used for the content fingerprint.
+    # First match per region wins; subclasses override with site-specific selectors.
+    FINGERPRINT_REGIONS: Dict[str, List[str]] = {
+        "title": ["[itemprop=name]", "h1"],
+        "price": ["[itemprop=price]", ".price", ".sale-price"],
+        "availability": ["[itemprop=availability]", "#availability", ".availability"],
+        "seller": ["[itemprop=seller]", ".seller"],
+    }
+    # The same strategies as extract_price, in the same order, for the fast
+    # path. Compiled to XPath once, when the class is defined; extract_price
+    # (BeautifulSoup) only runs when the plan finds nothing.
+    PRICE_STRATEGIES: List[PriceStrategy] = []
+
     def __init__(self, domain: str):
         self.domain = domain
-        
-    def detect_captcha(self, html: str) -> bool:
-        low = html.lower()
-        checks = [
-            "recaptcha", "g-recaptcha", "captcha",
-            "cf-chl-manual-challenge",  # Cloudflare
-            "verify you are human",
-            "robot check",
-            "security check"
-        ]
-        detected = any(k in low for k in checks)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._compile_plans()
+
+    @classmethod
+    def _compile_plans(cls):
+        cls._price_plan = PricePlan(cls.PRICE_STRATEGIES) if cls.PRICE_STRATEGIES else None
+        cls._region_plan = RegionPlan(cls.FINGERPRINT_REGIONS)
+
+    def detect_captcha(self, page: Union[str, ParsedDocument]) -> bool:
+        detected = ParsedDocument.of(page).contains_any(CAPTCHA_MARKERS)
         if detected:
             logger.warning(f"CAPTCHA detected on {self.domain}")
         return detected
-    
-    def parse_price(self, html: str) -> Optional[Dict]:
-        raise NotImplementedError("Subclass must implement parse_price")
-    
-    def compute_content_hash(self, html: str) -> str:
-        return hashlib.sha256(html.encode()).hexdigest()[:16]
+
+    def parse_price(self, page: Union[str, ParsedDocument]) -> Optional[Dict]:
+        """
+        Extract the price from the page's (shared) tree, through the compiled
+        plan first and BeautifulSoup only if that finds nothing. Successful
+        results carry a ``content_hash`` fingerprint of the product region.
+        """
+        doc = ParsedDocument.of(page)
+        result = self._extract_fast(doc)
+        if result is not None:
+            PARSE_PATH.labels(domain=self.domain, path="fast").inc()
+        else:
+            result = self.extract_price(doc)
+            PARSE_PATH.labels(domain=self.domain, path="fallback").inc()
+        if result is not None:
+            result["content_hash"] = self.compute_fingerprint(doc)
+        return result
+
+    def _extract_fast(self, doc: ParsedDocument) -> Optional[Dict]:
+        plan = self._price_plan
+        if plan is None or not plan.compiled or doc.tree is None:
+            return None
+        for strategy, selector in plan.strategies:
+            if selector is None:
+                price = self._jsonld_price(doc.json_ld)
+            else:
+                price = None
+                nodes = selector.select(doc.tree)
+                for node in nodes if strategy.every_match else nodes[:1]:
+                    price = self._to_price(node.get("content") or element_text(node))
+                    if price is not None:
+                        break
+            if price is not None:
+                return {"price": price, "currency": "INR", "method": strategy.method}
+        return None
+
+    def _to_price(self, text: str) -> Optional[float]:
+        try:
+            return float(text.replace(',', '').replace('₹', '').strip())
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _jsonld_price(blocks: List) -> Optional[float]:
+        for data in blocks:
+            try:
+                if isinstance(data, dict) and 'offers' in data:
+                    price = data['offers'].get('price')
+                    if price:
+                        return float(price)
+            except (AttributeError, TypeError, ValueError):
+                continue
+        return None
+
+    def extract_price(self, doc: ParsedDocument) -> Optional[Dict]:
+        raise NotImplementedError("Subclass must implement extract_price")
+
+    def compute_content_hash(self, page: Union[str, ParsedDocument]) -> str:
+        """Full-page hash; only used when no region fingerprint is available."""
+        return ParsedDocument.of(page).content_hash
+
+    def compute_fingerprint(self, doc: ParsedDocument) -> str:
+        """
+        Hash of the normalized product region (title, price, availability,
+        seller) plus the JSON-LD offer.
+
+        Only element text and ``content`` values are used, so CSRF tokens,
+        tracking ids, ad slots and timestamps elsewhere on the page (or in
+        attributes) do not change the fingerprint.
+        """
+        parts = []
+        if self._region_plan.compiled and doc.tree is not None:
+            for region, plans in self._region_plan.regions:
+                parts.append(f"{region}={self._first_text(doc.tree, plans)}")
+        else:
+            combined, regions = self._compiled_regions()
+            # One walk over the tree for every region selector, then pick the
+            # highest-priority match per region from the (few) matched elements
+            matches = combined.select(doc.soup)
+            for region, selectors in regions:
+                parts.append(f"{region}={self._region_text(matches, selectors)}")
+        parts.append(f"offer={self._jsonld_offer(doc.json_ld)}")
+        return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()[:16]
+
+    @classmethod
+    def _compiled_regions(cls) -> Tuple[soupsieve.SoupSieve, List[Tuple[str, List[soupsieve.SoupSieve]]]]:
+        cached = cls.__dict__.get("_fingerprint_selectors")
+        if cached is None:
+            all_selectors = [sel for sels in cls.FINGERPRINT_REGIONS.values() for sel in sels]
+            cached = (
+                soupsieve.compile(", ".join(all_selectors)),
+                [
+                    (region, [soupsieve.compile(sel) for sel in sels])
+                    for region, sels in cls.FINGERPRINT_REGIONS.items()
+                ],
+            )
+            cls._fingerprint_selectors = cached
+        return cached
+
+    @staticmethod
+    def _first_text(tree, plans) -> str:
+        for plan in plans:
+            nodes = plan.select(tree)
+            if nodes:
+                text = nodes[0].get("content") or element_text(nodes[0], " ")
+                return _WHITESPACE.sub(" ", text).strip()
+        return ""
+
+    @staticmethod
+    def _region_text(matches, selectors: List[soupsieve.SoupSieve]) -> str:
+        for sel in selectors:
+            for node in matches:
+                if sel.match(node):
+                    text = node.get("content") or node.get_text(" ")
+                    return _WHITESPACE.sub(" ", text).strip()
+        return ""
+
+    @staticmethod
+    def _jsonld_offer(blocks: List) -> str:
+        for data in blocks:
+            offers = data.get('offers') if isinstance(data, dict) else None
+            if isinstance(offers, list):
+                offers = offers[0] if offers else None
+            if isinstance(offers, dict):
+                seller = offers.get('seller')
+                if isinstance(seller, dict):
+                    seller = seller.get('name')
+                return "|".join(
+                    str(offers.get(k) or "") for k in ("price", "priceCurrency", "availability")
+                ) + f"|{seller or ''}"
+        return ""
+
+
+BaseParser._compile_plans()
@@ -0,0 +1,78 @@
+import hashlib
+import json
+from functools import cached_property
+from typing import List, Union
+
+import lxml.html
+from bs4 import BeautifulSoup
+from lxml import etree
+
+_JSON_LD = etree.XPath('//script[@type="application/ld+json"]')
+# The document's own UTF-8 bytes, so no charset sniffing is needed
+_UTF8_HTML = lxml.html.HTMLParser(encoding="utf-8")
+
+
+class ParsedDocument:
+    """
+    One fetched page, shared by every stage that looks at it.
+
+    Each representation is built on first use and then reused: the UTF-8
+    bytes (full-page hash), their ASCII-lowercased copy (marker scans such as
+    CAPTCHA detection), the lxml tree (compiled selector plans), the
+    BeautifulSoup tree (only when a plan cannot answer) and the decoded
+    JSON-LD blocks. Later stages (availability, seller) should take the
+    document too instead of the HTML.
+    """
+
+    def __init__(self, html: str):
+        self.html = html or ""
+
+    @classmethod
+    def of(cls, page: Union[str, "ParsedDocument"]) -> "ParsedDocument":
+        return page if isinstance(page, ParsedDocument) else cls(page)
+
+    @cached_property
+    def raw(self) -> bytes:
+        return self.html.encode()
+
+    @cached_property
+    def lowered(self) -> bytes:
+        # bytes.lower() only folds ASCII, which is all the markers need, and
+        # is several times cheaper than str.lower() on non-ASCII pages
+        return self.raw.lower()
+
+    def contains_any(self, markers: List[bytes]) -> bool:
+        """Case-insensitive check for lowercase ASCII markers."""
+        lowered = self.lowered
+        return any(marker in lowered for marker in markers)
+
+    @cached_property
+    def tree(self):
+        """lxml tree for the fast path; None if lxml cannot parse the page."""
+        try:
+            return lxml.html.document_fromstring(self.raw, parser=_UTF8_HTML)
+        except (etree.ParserError, ValueError):
+            return None
+
+    @cached_property
+    def soup(self) -> BeautifulSoup:
+        return BeautifulSoup(self.html, 'lxml')
+
+    @cached_property
+    def json_ld(self) -> List:
+        """Decoded ``application/ld+json`` blocks; malformed ones are skipped."""
+        if self.tree is not None:
+            sources = [script.text for script in _JSON_LD(self.tree)]
+        else:
+            sources = [script.string for script in self.soup.find_all('script', type='application/ld+json')]
+        blocks = []
+        for source in sources:
+            try:
+                blocks.append(json.loads(source))
+            except (TypeError, ValueError):
+                continue
+        return blocks
+
+    @cached_property
+    def content_hash(self) -> str:
+        return hashlib.sha256(self.raw).hexdigest()[:16]
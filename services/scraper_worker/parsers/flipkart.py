@@ -1,19 +1,30 @@
 import re
-import json
 import logging
-from bs4 import BeautifulSoup
 from typing import Optional, Dict
 from .base_parser import BaseParser
+from .document import ParsedDocument
+from .plans import PriceStrategy
 
 logger = logging.getLogger(__name__)
 
 class FlipkartParser(BaseParser):
+    FINGERPRINT_REGIONS = {
+        "title": ["span.B_NuCI", "h1"],
+        "price": ["div._30jeq3"],
+        "availability": ["div._16FRp0", "button._2KpZ6l"],
+        "seller": ["#sellerName"],
+    }
+    PRICE_STRATEGIES = [
+        PriceStrategy("css_selector", "div._30jeq3._16Jk6d"),
+        PriceStrategy("alt_selector", "._30jeq3"),
+        PriceStrategy("json_ld"),
+    ]
+
     def __init__(self):
         super().__init__("flipkart.com")
         
-    def parse_price(self, html: str) -> Optional[Dict]:
-        soup = BeautifulSoup(html, 'lxml')
-        
+    def extract_price(self, doc: ParsedDocument) -> Optional[Dict]:
+        soup = doc.soup
         # Strategy 1: Price div
         price_div = soup.select_one('div._30jeq3._16Jk6d')
         if price_div:
@@ -41,10 +52,8 @@ class FlipkartParser(BaseParser):
                 pass
         
         # Strategy 3: JSON-LD
-        scripts = soup.find_all('script', type='application/ld+json')
-        for script in scripts:
+        for data in doc.json_ld:
             try:
-                data = json.loads(script.string)
                 if isinstance(data, dict) and 'offers' in data:
                     price = data['offers'].get('price')
                     if price:
@@ -53,7 +62,7 @@ class FlipkartParser(BaseParser):
                             "currency": "INR",
                             "method": "json_ld"
                         }
-            except:
+            except (AttributeError, TypeError, ValueError):
                 continue
         
         logger.warning(f"Could not extract price from {self.domain}")
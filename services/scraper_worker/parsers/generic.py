@@ -1,5 +1,6 @@
 from .base_parser import BaseParser
-from bs4 import BeautifulSoup
+from .document import ParsedDocument
+from .plans import PriceStrategy
 from typing import Optional, Dict
 import re
 
@@ -12,12 +13,22 @@ class GenericParser(BaseParser):
     - elements with common price classes/ids
     """
 
+    PRICE_SELECTORS = [
+        "[itemprop=price]",
+        ".price",
+        ".Price",
+        ".sale-price",
+        ".a-price-whole",
+        "#priceblock_ourprice",
+        "#priceblock_dealprice",
+    ]
+    PRICE_STRATEGIES = [PriceStrategy("css_selector", sel, every_match=True) for sel in PRICE_SELECTORS]
+
     def __init__(self):
         super().__init__("generic")
 
-    def parse_price(self, html: str) -> Optional[Dict]:
-        soup = BeautifulSoup(html, "lxml")
-
+    def extract_price(self, doc: ParsedDocument) -> Optional[Dict]:
+        soup = doc.soup
         # 1) JSON-LD offers (only if BaseParser or subclass provides a helper)
         helper = getattr(self, "_parse_jsonld_price", None)
         if callable(helper):
@@ -27,26 +38,20 @@ class GenericParser(BaseParser):
 
         # 2) Common price selectors
         candidates = []
-        selectors = [
-            "[itemprop=price]",
-            ".price",
-            ".Price",
-            ".sale-price",
-            ".a-price-whole",
-            "#priceblock_ourprice",
-            "#priceblock_dealprice",
-        ]
-        for sel in selectors:
+        for sel in self.PRICE_SELECTORS:
             candidates.extend(soup.select(sel))
 
         for node in candidates:
             text = (node.get("content") or node.get_text() or "").strip()
             value = self._extract_price_from_text(text)
             if value is not None:
-                return {"price": value, "currency": "INR"}
+                return {"price": value, "currency": "INR", "method": "css_selector"}
 
         return None
 
+    def _to_price(self, text: str) -> Optional[float]:
+        return self._extract_price_from_text(text)
+
     def _extract_price_from_text(self, text: str) -> Optional[float]:
         # Remove currency symbols and non-numeric chars except dot/comma
         cleaned = re.sub(r"[^\d.,]", "", text)
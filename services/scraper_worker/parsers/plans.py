@@ -0,0 +1,138 @@
+import logging
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+# One compound selector: optional tag, then any #id, .class, [attr] or
+# [attr=value] parts. That covers every selector the parsers use; anything
+# else (pseudo-classes, other attribute operators) is left to soupsieve.
+_COMPOUND = re.compile(
+    r"""(?P<tag>[a-zA-Z][\w-]*|\*)?(?P<parts>(?:\#[\w-]+|\.[\w-]+|\[[\w:-]+(?:=(?:"[^"]*"|'[^']*'|[^\]'"]+))?\])*)$"""
+)
+_PART = re.compile(r"""\#(?P<id>[\w-]+)|\.(?P<cls>[\w-]+)|\[(?P<attr>[\w:-]+)(?:=(?P<value>"[^"]*"|'[^']*'|[^\]'"]+))?\]""")
+
+# BeautifulSoup's get_text() leaves these out
+_NO_TEXT = frozenset({"script", "style", "template"})
+
+
+def _literal(value: str) -> Optional[str]:
+    if '"' not in value:
+        return f'"{value}"'
+    if "'" not in value:
+        return f"'{value}'"
+    return None
+
+
+def css_to_xpath(selector: str) -> Optional[str]:
+    """
+    XPath equivalent of a simple CSS selector (compound selectors joined by
+    descendant or child combinators), or None when it uses anything else.
+    """
+    xpath = ""
+    axis = "//"
+    for token in selector.replace(">", " > ").split():
+        if token == ">":
+            if not xpath or axis != "//":
+                return None
+            axis = "/"
+            continue
+        match = _COMPOUND.match(token)
+        if not match or not token:
+            return None
+        step = (match.group("tag") or "*").lower()
+        for part in _PART.finditer(match.group("parts")):
+            if part.group("id"):
+                step += f'[@id="{part.group("id")}"]'
+            elif part.group("cls"):
+                step += f"""[contains(concat(" ", normalize-space(@class), " "), " {part.group("cls")} ")]"""
+            elif part.group("value") is not None:
+                value = part.group("value")
+                if value[0] in "'\"":
+                    value = value[1:-1]
+                literal = _literal(value)
+                if literal is None:
+                    return None
+                step += f'[@{part.group("attr")}={literal}]'
+            else:
+                step += f'[@{part.group("attr")}]'
+        xpath += axis + step
+        axis = "//"
+    if not xpath or axis != "//":
+        return None
+    return xpath
+
+
+def element_text(node, separator: str = "") -> str:
+    """Text under ``node`` the way BeautifulSoup's ``get_text`` joins it."""
+    texts: List[str] = []
+
+    def collect(element):
+        if element.text and element.tag not in _NO_TEXT:
+            texts.append(element.text)
+        for child in element:
+            # Comments and processing instructions have a non-string tag
+            if isinstance(child.tag, str):
+                collect(child)
+            if child.tail:
+                texts.append(child.tail)
+
+    collect(node)
+    return separator.join(texts)
+
+
+class SelectorPlan:
+    """A CSS selector compiled once to an lxml XPath for the fast tree."""
+
+    def __init__(self, css: str):
+        self.css = css
+        source = css_to_xpath(css)
+        self.xpath = etree.XPath(source) if source else None
+
+    @property
+    def compiled(self) -> bool:
+        return self.xpath is not None
+
+    def select(self, tree) -> list:
+        return self.xpath(tree)
+
+
+@dataclass(frozen=True)
+class PriceStrategy:
+    """
+    One way to find the price. With a selector, the price is read from the
+    element's ``content`` attribute or else its text; without one, from the
+    JSON-LD ``offers``. ``every_match`` tries all matches in document order
+    instead of only the first.
+    """
+
+    method: str
+    selector: Optional[str] = None
+    every_match: bool = False
+
+
+class PricePlan:
+    """A parser's price strategies with their selectors compiled up front."""
+
+    def __init__(self, strategies: List[PriceStrategy]):
+        self.strategies = [
+            (strategy, SelectorPlan(strategy.selector) if strategy.selector else None)
+            for strategy in strategies
+        ]
+        missing = [plan.css for _, plan in self.strategies if plan is not None and not plan.compiled]
+        # A partial plan could pick a later strategy than the full parser
+        # would, so one unsupported selector sends every page to soupsieve
+        self.compiled = not missing
+        if missing:
+            logger.warning(f"Selectors not supported by the fast path, using BeautifulSoup: {missing}")
+
+
+class RegionPlan:
+    """Fingerprint regions with each region's selectors compiled in priority order."""
+
+    def __init__(self, regions):
+        self.regions = [(region, [SelectorPlan(sel) for sel in sels]) for region, sels in regions.items()]
+        self.compiled = all(plan.compiled for _, plans in self.regions for plan in plans)
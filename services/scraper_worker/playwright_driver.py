@@ -1,53 +1,78 @@
 import asyncio
 import random
 import logging
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
+from playwright.async_api import TimeoutError as PlaywrightTimeout
 from typing import Optional, Dict
+from urllib.parse import urlparse
 
 # Support both package and script-style imports for tests / runtime
 try:
-    from .retry_decorator import retry_backoff
+    from .resilience import HttpError
+    from .adaptive_control import THROTTLE_STATUSES
+    from .browser_pool import BrowserPool
+    from .interception import InterceptionPolicy, TransferMeter, FETCH_BYTES
 except ImportError:
-    from retry_decorator import retry_backoff
+    from resilience import HttpError
+    from adaptive_control import THROTTLE_STATUSES
+    from browser_pool import BrowserPool
+    from interception import InterceptionPolicy, TransferMeter, FETCH_BYTES
 
 logger = logging.getLogger(__name__)
 
 class PlaywrightDriver:
-    def __init__(self, proxy_manager, ua_manager):
+    def __init__(
+        self,
+        proxy_manager,
+        ua_manager,
+        pool: Optional[BrowserPool] = None,
+        interception: Optional[InterceptionPolicy] = None,
+    ):
         self.proxy_manager = proxy_manager
         self.ua_manager = ua_manager
-        
-    @retry_backoff(max_attempts=3, base=2.0)
+        self.pool = pool or BrowserPool()
+        self.interception = interception or InterceptionPolicy()
+
+    async def start(self):
+        await self.pool.start()
+
+    async def close(self):
+        await self.pool.close()
+
     async def fetch_page(
         self, 
         url: str, 
         timeout: int = 30000,
-        wait_for_selector: Optional[str] = None
+        wait_for_selector: Optional[str] = None,
+        proxy: Optional[str] = None,
+        session=None,
     ) -> Dict:
-        proxy = self.proxy_manager.get_proxy()
-        user_agent = self.ua_manager.pick_ua()
-        
-        start_time = asyncio.get_event_loop().time()
+        # Callers that rate-limit per proxy pass the proxy they were admitted with
+        if proxy is None and self.proxy_manager:
+            proxy = self.proxy_manager.get_proxy()
+        # A sticky session brings its own identity and cookies
+        user_agent = session.user_agent if session else self.ua_manager.pick_ua()
+        domain = urlparse(url).hostname or ""
         
-        async with async_playwright() as p:
+        async with self.pool.acquire() as browser:
+            # Timed after checkout so pool wait is not attributed to the proxy
+            start_time = asyncio.get_event_loop().time()
             try:
-                browser = await p.chromium.launch(
-                    headless=True,
-                    args=['--disable-blink-features=AutomationControlled']
-                )
-                
                 context_args = {
                     "user_agent": user_agent,
-                    "viewport": {
+                    "viewport": session.viewport if session else {
                         "width": random.randint(1200, 1920),
                         "height": random.randint(800, 1080)
                     },
                     "locale": "en-IN",
                     "timezone_id": "Asia/Kolkata",
+                    # Service workers would bypass the route handler below
+                    "service_workers": "block",
                 }
                 
                 if proxy:
                     context_args["proxy"] = {"server": proxy}
+                if session and session.storage_state:
+                    context_args["storage_state"] = session.storage_state
                 
                 context = await browser.new_context(**context_args)
                 
@@ -59,6 +84,8 @@ class PlaywrightDriver:
                 """)
                 
                 page = await context.new_page()
+                await self.interception.attach(page, domain)
+                meter = TransferMeter(page)
                 
                 try:
                     response = await page.goto(url, timeout=timeout, wait_until='domcontentloaded')
@@ -81,7 +108,19 @@ class PlaywrightDriver:
                         screenshot_path = f"screenshots/error_{int(start_time)}.png"
                         await page.screenshot(path=screenshot_path)
                     
-                    self.proxy_manager.mark_success(proxy)
+                    bytes_transferred = await meter.total()
+                    FETCH_BYTES.labels(domain=domain).observe(bytes_transferred)
+
+                    if session:
+                        # Cookies set on this visit go back into the session
+                        session.storage_state = await context.storage_state()
+                    
+                    if self.proxy_manager:
+                        self.proxy_manager.record_response(proxy, domain, status, response_time)
+
+                    # Server errors are retried by the caller; 429/503 go back to it to back off
+                    if status and status >= 500 and status not in THROTTLE_STATUSES:
+                        raise HttpError(status)
                     
                     return {
                         "status": status,
@@ -89,13 +128,17 @@ class PlaywrightDriver:
                         "screenshot": screenshot_path,
                         "proxy": proxy,
                         "user_agent": user_agent,
-                        "response_time_ms": response_time
+                        "response_time_ms": response_time,
+                        "bytes_transferred": bytes_transferred,
+                        "tier": "browser",
                     }
                     
                 finally:
                     await context.close()
-                    await browser.close()
                     
             except Exception as e:
-                self.proxy_manager.mark_failure(proxy, str(e))
+                # The proxy already got credit for the response an HttpError came from
+                if self.proxy_manager and not isinstance(e, HttpError):
+                    elapsed_ms = (asyncio.get_event_loop().time() - start_time) * 1000
+                    self.proxy_manager.mark_failure(proxy, str(e), domain, elapsed_ms)
                 raise
@@ -1,61 +1,534 @@
+import asyncio
+import heapq
+import os
 import random
 import time
 import logging
-from typing import List, Optional
+from collections import deque
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
+from prometheus_client import Gauge
+
 logger = logging.getLogger(__name__)
 
+# Responses that mean the site refused this proxy, not that the proxy is down
+BLOCK_STATUSES = (403, 429, 503)
+
+# Health events: OK and FAIL move the failure count, MISS only the averages.
+# PROBE_FAIL is a FAIL from a health probe. RESTORE (a passed probe) lifts a
+# quarantine that failed probes caused and changes nothing else.
+OK = "ok"
+FAIL = "fail"
+MISS = "miss"
+PROBE_FAIL = "probe_fail"
+RESTORE = "restore"
+# Scope of the proxy-wide record, next to one scope per domain
+GLOBAL = "*"
+
+CHANGES_KEY = "proxy:health:changed"
+
+PROXY_POOL = Gauge("proxy_pool_size", "Proxies by health state (all replicas)", ["state"])
+PROXY_BLOCKED = Gauge("proxy_domain_blocked", "Proxies currently blocked per domain (all replicas)", ["domain"])
+
+
+def health_key(proxy: str) -> str:
+    return f"proxy:health:{proxy}"
+
+
+# Applies a batch of health events to the shared state, mirroring
+# ProxyManager._apply. Each proxy is one hash with "<scope>:<field>" fields
+# (scope is "*" or a domain); times are Redis server milliseconds.
+#
+# KEYS[1]    changelog sorted set (member proxy, score last change)
+# KEYS[2..n] proxy hash for each event
+# ARGV       alpha, failure threshold, recovery (ms), ttl (ms), then
+#            proxy, scope, kind, latency ('' when unknown) for each event
+HEALTH_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local alpha = tonumber(ARGV[1])
+local threshold = tonumber(ARGV[2])
+local recovery = tonumber(ARGV[3])
+local ttl = tonumber(ARGV[4])
+
+for i = 2, #KEYS do
+    local base = 4 + (i - 2) * 4
+    local proxy = ARGV[base + 1]
+    local scope = ARGV[base + 2]
+    local kind = ARGV[base + 3]
+    local latency = tonumber(ARGV[base + 4])
+    local s = redis.call('HMGET', KEYS[i], scope .. ':f', scope .. ':lf', scope .. ':ls',
+                         scope .. ':lat', scope .. ':sr', scope .. ':q', scope .. ':pq')
+    local f = tonumber(s[1]) or 0
+    local lf = tonumber(s[2]) or 0
+    local ls = tonumber(s[3]) or 0
+    local lat = tonumber(s[4])
+    local sr = tonumber(s[5]) or 1
+    local q = tonumber(s[6]) or 0
+    local pq = tonumber(s[7]) or 0
+
+    if kind == 'restore' then
+        if q > now and pq == 1 then
+            q = now
+        end
+        latency = nil
+    end
+    if q > 0 and q <= now then
+        q = 0
+        pq = 0
+        sr = 1
+        f = threshold - 1
+    end
+    if kind ~= 'restore' then
+        local failed = kind == 'fail' or kind == 'probe_fail'
+        local hit = 0
+        if kind == 'ok' then
+            f = math.max(0, f - 1)
+            ls = now
+            hit = 1
+        elseif failed then
+            f = f + 1
+            lf = now
+        end
+        sr = sr + alpha * (hit - sr)
+        if latency then
+            if lat then
+                lat = lat + alpha * (latency - lat)
+            else
+                lat = latency
+            end
+        end
+        if failed and f >= threshold then
+            q = now + recovery
+            pq = (kind == 'probe_fail') and 1 or 0
+        end
+    end
+
+    redis.call('HSET', KEYS[i], scope .. ':f', f, scope .. ':lf', lf, scope .. ':ls', ls,
+               scope .. ':sr', tostring(sr), scope .. ':q', q, scope .. ':pq', pq)
+    if lat then
+        redis.call('HSET', KEYS[i], scope .. ':lat', tostring(lat))
+    end
+    redis.call('PEXPIRE', KEYS[i], ttl)
+    redis.call('ZADD', KEYS[1], now, proxy)
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - ttl)
+return now
+"""
+
+
 @dataclass
 class ProxyHealth:
     proxy: str
     failures: int = 0
     last_failure: float = 0.0
     last_success: float = 0.0
+    # Exponentially weighted averages; latency is None until first measured
+    latency_ms: Optional[float] = None
+    success_rate: float = 1.0
+    quarantined_until: float = 0.0
+    # The current quarantine was caused by failed health probes
+    probe_quarantine: bool = False
+
 
 class ProxyManager:
-    def __init__(self, proxies: List[str], health_check_interval: int = 60):
+    """
+    Health-scored proxy selection.
+
+    Health is tracked per proxy (transport failures, which quarantine it for
+    every domain) and per (proxy, domain) pair (latency and blocks, since a
+    proxy banned by one site may still be fine elsewhere). Both keep an EWMA
+    of latency and success rate, and a proxy's score for a domain is its
+    success rate divided by its latency.
+
+    ``get_proxy`` uses power-of-two-choices: it samples two available proxies
+    and returns the better scored one. That costs O(1) per call regardless of
+    pool size while still steering most traffic away from slow or blocked
+    proxies. Quarantined proxies leave the available list and come back
+    through a heap ordered by release time. Proxies blocked by one domain stay
+    available for others; if both samples are blocked for the requested
+    domain, it picks from the unblocked ones, or returns None if there are none.
+
+    With a Redis client, health is shared between replicas. Events are applied
+    locally at once and queued; ``sync`` (run every ``sync_interval`` seconds
+    by ``start``) applies the queue to Redis in one script call and reads back
+    only the proxies any replica changed since the last sync, so a ban seen by
+    one replica reaches the others within a sync interval.
+    """
+
+    def __init__(
+        self,
+        proxies: List[str],
+        health_check_interval: int = 60,
+        alpha: float = None,
+        default_latency_ms: float = None,
+        redis_client=None,
+        sync_interval: float = None,
+    ):
         self.proxies = proxies[:]
         self._health = {p: ProxyHealth(proxy=p) for p in proxies}
+        self._domain_health: Dict[Tuple[str, str], ProxyHealth] = {}
         self.health_check_interval = health_check_interval
         self._bad_threshold = 3
         self._recovery_time = 300
-        
-    def get_proxy(self) -> Optional[str]:
-        # Filter out proxies with recent failures
+        self.alpha = alpha or float(os.getenv("PROXY_EWMA_ALPHA", "0.2"))
+        # Latency assumed for unmeasured proxies; optimistic so they get tried
+        self.default_latency_ms = default_latency_ms or float(os.getenv("PROXY_DEFAULT_LATENCY_MS", "1000"))
+        # Available proxies with their positions, for O(1) sampling and removal
+        self._available: List[str] = list(self.proxies)
+        self._position: Dict[str, int] = {p: i for i, p in enumerate(self._available)}
+        self._quarantine: List[Tuple[float, str]] = []
+
+        self.redis = redis_client
+        self.sync_interval = sync_interval or float(os.getenv("PROXY_SYNC_INTERVAL_SECONDS", "2"))
+        self.state_ttl = 7 * 24 * 3600
+        # Events not yet written to Redis; oldest are dropped if Redis is down
+        self._pending: deque = deque(maxlen=10000)
+        self._synced_ms = 0
+        self._task: Optional[asyncio.Task] = None
+        self._script = redis_client.register_script(HEALTH_LUA) if redis_client is not None else None
+
+    def _release_expired(self, now: float):
+        while self._quarantine and self._quarantine[0][0] <= now:
+            until, proxy = heapq.heappop(self._quarantine)
+            health = self._health[proxy]
+            # Stale entry: the quarantine was extended or lifted after this was pushed
+            if health.quarantined_until != until:
+                continue
+            self._expire(health, now)
+            self._make_available(proxy)
+            logger.info(f"Proxy back in rotation: {proxy[:20]}...")
+
+    def _make_available(self, proxy: str):
+        if proxy not in self._position:
+            self._position[proxy] = len(self._available)
+            self._available.append(proxy)
+
+    def _make_unavailable(self, proxy: str):
+        index = self._position.pop(proxy, None)
+        if index is None:
+            return
+        last = self._available.pop()
+        if last != proxy:
+            self._available[index] = last
+            self._position[last] = index
+
+    def _update_availability(self, proxy: str, now: float):
+        until = self._health[proxy].quarantined_until
+        if until > now:
+            heapq.heappush(self._quarantine, (until, proxy))
+            self._make_unavailable(proxy)
+        else:
+            self._make_available(proxy)
+
+    def _stats(self, proxy: str, domain: Optional[str]) -> Optional[ProxyHealth]:
+        if domain:
+            stats = self._domain_health.get((proxy, domain))
+            if stats is not None:
+                return stats
+        return self._health.get(proxy)
+
+    def score(self, proxy: str, domain: Optional[str] = None, now: float = None) -> float:
+        """Expected successes per millisecond; 0 while blocked for the domain."""
+        now = now or time.time()
+        stats = self._stats(proxy, domain)
+        if stats is None:
+            return 0.0
+        if stats.quarantined_until > now:
+            return 0.0
+        self._expire(stats, now)
+        latency = stats.latency_ms
+        if latency is None:
+            # New (proxy, domain) pair: the proxy's overall latency is the best guess
+            latency = self._health[proxy].latency_ms or self.default_latency_ms
+        return stats.success_rate / max(latency, 1.0)
+
+    def get_proxy(self, domain: Optional[str] = None, exclude: Optional[str] = None) -> Optional[str]:
+        if not self.proxies:
+            return None
         now = time.time()
-        candidates = [
-            p for p, health in self._health.items()
-            if health.failures < self._bad_threshold or 
-               (now - health.last_failure > self._recovery_time)
-        ]
-        
-        if not candidates:
+        self._release_expired(now)
+
+        if not self._available:
             logger.warning("No healthy proxies available, using any proxy")
-            candidates = list(self.proxies)
-            
-        proxy = random.choice(candidates)
+            return random.choice(self.proxies)
+
+        proxy = self._best_of_two(self._available, domain, now)
+        if domain and self.score(proxy, domain, now) <= 0 and self._blocked(proxy, domain, now):
+            # Both samples are blocked by the site. Blocks stay in the
+            # available list, so look past them; O(n), but only in this case.
+            unblocked = [p for p in self._available if not self._blocked(p, domain, now)]
+            if not unblocked:
+                logger.warning(f"Every healthy proxy is blocked by {domain}")
+                return None
+            proxy = self._best_of_two(unblocked, domain, now)
+        if exclude is not None and proxy == exclude:
+            # Retrying after this proxy failed: any other usable one will do
+            others = [
+                p for p in self._available
+                if p != exclude and not (domain and self._blocked(p, domain, now))
+            ]
+            if others:
+                proxy = self._best_of_two(others, domain, now)
         logger.debug(f"Selected proxy: {proxy[:20]}...")
         return proxy
 
-    def mark_failure(self, proxy: str, error: str = None):
-        if proxy in self._health:
-            self._health[proxy].failures += 1
-            self._health[proxy].last_failure = time.time()
-            logger.warning(f"Proxy failure marked: {proxy[:20]}... (total failures: {self._health[proxy].failures})")
-            if error:
-                logger.error(f"Failure reason: {error}")
-    
-    def mark_success(self, proxy: str):
-        if proxy in self._health:
-            self._health[proxy].failures = max(0, self._health[proxy].failures - 1)
-            self._health[proxy].last_success = time.time()
-            logger.debug(f"Poxy success: {proxy[:20]}...")
-    
+    def _best_of_two(self, candidates: List[str], domain: Optional[str], now: float) -> str:
+        if len(candidates) == 1:
+            return candidates[0]
+        first, second = random.sample(range(len(candidates)), 2)
+        a, b = candidates[first], candidates[second]
+        return a if self.score(a, domain, now) >= self.score(b, domain, now) else b
+
+    def _blocked(self, proxy: str, domain: str, now: float) -> bool:
+        stats = self._domain_health.get((proxy, domain))
+        return stats is not None and stats.quarantined_until > now
+
+    def unblocked_in(self, domain: str) -> float:
+        """Seconds until the first available proxy blocked by ``domain`` may be used for it again."""
+        now = time.time()
+        ends = [
+            stats.quarantined_until
+            for (proxy, blocked_by), stats in self._domain_health.items()
+            if blocked_by == domain and proxy in self._position and stats.quarantined_until > now
+        ]
+        return min(ends) - now if ends else 0.0
+
+    def _expire(self, stats: ProxyHealth, now: float):
+        """
+        An ended quarantine puts the proxy on probation: scored like a fresh
+        proxy so it gets traffic again, but one more failure quarantines it.
+        """
+        if stats.quarantined_until and stats.quarantined_until <= now:
+            stats.quarantined_until = 0.0
+            stats.probe_quarantine = False
+            stats.success_rate = 1.0
+            stats.failures = self._bad_threshold - 1
+
+    def _apply(self, stats: ProxyHealth, kind: str, latency_ms: Optional[float], now: float):
+        # Keep in step with HEALTH_LUA, which applies the same events in Redis
+        if kind == RESTORE:
+            # A probe to a generic URL only vouches for what failed probes
+            # reported; quarantines from real traffic run their full
+            # recovery, and a healthy proxy's failure count is left alone
+            if stats.quarantined_until > now and stats.probe_quarantine:
+                stats.quarantined_until = now
+            self._expire(stats, now)
+            return
+        self._expire(stats, now)
+        success = kind == OK
+        failed = kind in (FAIL, PROBE_FAIL)
+        if success:
+            stats.failures = max(0, stats.failures - 1)
+            stats.last_success = now
+        elif failed:
+            stats.failures += 1
+            stats.last_failure = now
+        stats.success_rate += self.alpha * ((1.0 if success else 0.0) - stats.success_rate)
+        if latency_ms is not None:
+            if stats.latency_ms is None:
+                stats.latency_ms = float(latency_ms)
+            else:
+                stats.latency_ms += self.alpha * (latency_ms - stats.latency_ms)
+        if failed and stats.failures >= self._bad_threshold:
+            stats.quarantined_until = now + self._recovery_time
+            stats.probe_quarantine = kind == PROBE_FAIL
+
+    def _domain_stats(self, proxy: str, domain: str) -> ProxyHealth:
+        key = (proxy, domain)
+        stats = self._domain_health.get(key)
+        if stats is None:
+            stats = self._domain_health[key] = ProxyHealth(proxy=proxy)
+        return stats
+
+    def _record(self, proxy: str, scope: str, kind: str, latency_ms: Optional[float] = None):
+        now = time.time()
+        if scope == GLOBAL:
+            self._apply(self._health[proxy], kind, latency_ms, now)
+            self._update_availability(proxy, now)
+        else:
+            self._apply(self._domain_stats(proxy, scope), kind, latency_ms, now)
+        if self.redis is not None:
+            self._pending.append((proxy, scope, kind, latency_ms))
+
+    def mark_failure(
+        self,
+        proxy: str,
+        error: str = None,
+        domain: Optional[str] = None,
+        latency_ms: Optional[float] = None,
+    ):
+        """A request through the proxy failed at the transport level."""
+        if proxy not in self._health:
+            return
+        self._record(proxy, GLOBAL, FAIL, latency_ms)
+        if domain:
+            self._record(proxy, domain, MISS, latency_ms)
+        logger.warning(
+            f"Proxy failure marked: {proxy[:20]}... (total failures: {self._health[proxy].failures})"
+        )
+        if error:
+            logger.error(f"Failure reason: {error}")
+
+    def mark_blocked(self, proxy: str, domain: str):
+        """The site refused this proxy (block status, CAPTCHA); other domains are unaffected."""
+        if proxy not in self._health or not domain:
+            return
+        self._record(proxy, domain, FAIL)
+        blocks = self._domain_health[(proxy, domain)].failures
+        logger.warning(f"Proxy blocked by {domain}: {proxy[:20]}... (blocks: {blocks})")
+
+    def mark_success(self, proxy: str, domain: Optional[str] = None, latency_ms: Optional[float] = None):
+        if proxy not in self._health:
+            return
+        self._record(proxy, GLOBAL, OK, latency_ms)
+        if domain:
+            self._record(proxy, domain, OK, latency_ms)
+        logger.debug(f"Proxy success: {proxy[:20]}...")
+
+    def mark_probe_failure(self, proxy: str, error: str = None):
+        """A health probe failed; counts like a transport failure."""
+        if proxy not in self._health:
+            return
+        self._record(proxy, GLOBAL, PROBE_FAIL)
+        logger.warning(f"Proxy probe failed: {proxy[:20]}... ({error})")
+
+    def mark_probe_success(self, proxy: str):
+        """
+        A health probe got through: lift a quarantine caused by failed probes
+        and put the proxy on probation.
+        """
+        if proxy not in self._health:
+            return
+        stats = self._health[proxy]
+        if stats.probe_quarantine and stats.quarantined_until > time.time():
+            logger.info(f"Probe restored proxy: {proxy[:20]}...")
+        self._record(proxy, GLOBAL, RESTORE)
+
+    def record_response(self, proxy: str, domain: str, status: Optional[int], latency_ms: float):
+        """Feed a completed fetch: block statuses count against the domain only."""
+        if status in BLOCK_STATUSES:
+            self.mark_blocked(proxy, domain)
+        else:
+            self.mark_success(proxy, domain, latency_ms)
+
+    async def start(self):
+        if self.redis is None:
+            return
+        await self.sync()
+        if self._task is None:
+            self._task = asyncio.create_task(self._sync_loop())
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            await self.sync()
+
+    async def sync(self):
+        """Write queued events to Redis, then load what any replica changed."""
+        if self.redis is None:
+            return
+        try:
+            await self._flush()
+            await self._pull()
+        except Exception as e:
+            logger.warning(f"Proxy health sync failed: {e}")
+        self.export_metrics()
+
+    async def _flush(self, batch_size: int = 500):
+        while self._pending:
+            batch = [self._pending.popleft() for _ in range(min(batch_size, len(self._pending)))]
+            args = [self.alpha, self._bad_threshold, self._recovery_time * 1000, self.state_ttl * 1000]
+            for proxy, scope, kind, latency_ms in batch:
+                args += [proxy, scope, kind, "" if latency_ms is None else latency_ms]
+            try:
+                await self._script(
+                    keys=[CHANGES_KEY] + [health_key(proxy) for proxy, *_ in batch], args=args
+                )
+            except Exception:
+                # Retry next sync; local state already reflects these events.
+                # The batch goes back in front of events queued meanwhile;
+                # extendleft on a full deque would drop the newest, so only
+                # the newest of the batch that still fit are put back.
+                room = self._pending.maxlen - len(self._pending)
+                self._pending.extendleft(reversed(batch[max(0, len(batch) - room):]))
+                raise
+
+    async def _pull(self):
+        # Overlap by a second so changes committed in the same millisecond as
+        # the last sync are not missed; re-reading a few proxies is harmless
+        since = self._synced_ms - 1000 if self._synced_ms else "-inf"
+        changed = await self.redis.zrangebyscore(CHANGES_KEY, since, "+inf", withscores=True)
+        changed = [(proxy, score) for proxy, score in changed if proxy in self._health]
+        if not changed:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for proxy, _ in changed:
+                pipe.hgetall(health_key(proxy))
+            states = await pipe.execute()
+        now = time.time()
+        for (proxy, _), fields in zip(changed, states):
+            if fields:
+                self._load(proxy, fields, now)
+        self._synced_ms = int(max(score for _, score in changed))
+
+    def _load(self, proxy: str, fields: Dict[str, str], now: float):
+        """Replace local health for a proxy with the shared state."""
+        scopes: Dict[str, Dict[str, str]] = {}
+        for name, value in fields.items():
+            scope, _, field = name.rpartition(":")
+            scopes.setdefault(scope, {})[field] = value
+
+        for scope, values in scopes.items():
+            if scope == GLOBAL:
+                stats = self._health[proxy]
+            else:
+                stats = self._domain_stats(proxy, scope)
+            stats.failures = int(values.get("f", 0))
+            stats.last_failure = float(values.get("lf", 0)) / 1000
+            stats.last_success = float(values.get("ls", 0)) / 1000
+            stats.success_rate = float(values.get("sr", 1))
+            stats.quarantined_until = float(values.get("q", 0)) / 1000
+            stats.probe_quarantine = values.get("pq") == "1"
+            if "lat" in values:
+                stats.latency_ms = float(values["lat"])
+            if scope == GLOBAL:
+                self._update_availability(proxy, now)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.redis is not None:
+            try:
+                await self._flush()
+            except Exception as e:
+                logger.warning(f"Could not flush proxy health: {e}")
+
     def get_health_stats(self) -> dict:
-        healthy = sum(1 for h in self._health.values() if h.failures < self._bad_threshold)
+        """Pool health as of the last sync, i.e. as every replica sees it."""
+        now = time.time()
+        self._release_expired(now)
+        healthy = len(self._available)
+        blocked: Dict[str, int] = {}
+        for (_, domain), stats in self._domain_health.items():
+            if stats.quarantined_until > now:
+                blocked[domain] = blocked.get(domain, 0) + 1
         return {
             "total": len(self.proxies),
             "healthy": healthy,
-            "degraded": len(self.proxies) - healthy
-        }
\ No newline at end of file
+            "degraded": len(self.proxies) - healthy,
+            "blocked": blocked,
+        }
+
+    def export_metrics(self):
+        stats = self.get_health_stats()
+        PROXY_POOL.labels(state="healthy").set(stats["healthy"])
+        PROXY_POOL.labels(state="quarantined").set(stats["degraded"])
+        for domain in {domain for _, domain in self._domain_health}:
+            PROXY_BLOCKED.labels(domain=domain).set(stats["blocked"].get(domain, 0))
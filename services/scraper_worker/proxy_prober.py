@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Callable, Dict, Optional
+
+import httpx
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+PROBE_LATENCY = Histogram(
+    "proxy_probe_latency_seconds",
+    "Proxy probe latency: TCP connect to the proxy and time to first byte",
+    ["phase"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10),
+)
+PROBES = Counter("proxy_probes_total", "Proxy health probes", ["result"])
+
+
+class ProxyProber:
+    """
+    Background health checks for every proxy, so production scrapes are not
+    the only way a dead proxy is found (or a recovered one let back in).
+
+    Every ``interval`` seconds (the ProxyManager's ``health_check_interval``)
+    each proxy fetches ``url``, at most ``concurrency`` at a time. A probe
+    counts as a failure when it errors, times out or gets a status >= 400;
+    enough failures quarantine the proxy through the usual failure threshold.
+    A successful probe of a quarantined proxy puts it back on probation.
+    Results go through the ProxyManager, so they are shared with other
+    replicas like any other health event.
+    """
+
+    def __init__(
+        self,
+        proxy_manager,
+        url: str = None,
+        interval: float = None,
+        concurrency: int = None,
+        timeout: float = None,
+        client_factory: Callable[[str], httpx.AsyncClient] = None,
+    ):
+        self.proxy_manager = proxy_manager
+        self.url = url or os.getenv("PROXY_PROBE_URL", "https://www.gstatic.com/generate_204")
+        self.interval = interval or proxy_manager.health_check_interval
+        self.concurrency = concurrency or int(os.getenv("PROXY_PROBE_CONCURRENCY", "20"))
+        self.timeout = timeout or float(os.getenv("PROXY_PROBE_TIMEOUT_SECONDS", "5"))
+        self._client_factory = client_factory or self._default_client
+        self._task: Optional[asyncio.Task] = None
+
+    def _default_client(self, proxy: str) -> httpx.AsyncClient:
+        # A fresh client per probe so the connect time is measured every round
+        return httpx.AsyncClient(proxies=proxy, timeout=self.timeout, follow_redirects=False)
+
+    async def probe(self, proxy: str) -> Dict:
+        """Fetch the probe URL through one proxy and time connect and first byte."""
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+
+        async def trace(event: str, info: dict):
+            if event == "connection.connect_tcp.complete":
+                timings["connect"] = time.perf_counter() - start
+
+        try:
+            async with self._client_factory(proxy) as client:
+                async with client.stream("GET", self.url, extensions={"trace": trace}) as response:
+                    timings["ttfb"] = time.perf_counter() - start
+                    status = response.status_code
+        except Exception as e:
+            return {"proxy": proxy, "ok": False, "error": str(e) or type(e).__name__, **timings}
+        ok = status < 400
+        return {"proxy": proxy, "ok": ok, "status": status, "error": None if ok else f"HTTP {status}", **timings}
+
+    async def probe_all(self) -> Dict[str, bool]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(proxy: str) -> Dict:
+            async with semaphore:
+                return await self.probe(proxy)
+
+        results = await asyncio.gather(*(bounded(p) for p in self.proxy_manager.proxies))
+        for result in results:
+            proxy = result["proxy"]
+            for phase in ("connect", "ttfb"):
+                if phase in result:
+                    PROBE_LATENCY.labels(phase=phase).observe(result[phase])
+            PROBES.labels(result="ok" if result["ok"] else "failed").inc()
+            if result["ok"]:
+                self.proxy_manager.mark_probe_success(proxy)
+            else:
+                self.proxy_manager.mark_probe_failure(proxy, result["error"])
+        healthy = sum(1 for r in results if r["ok"])
+        logger.info(f"Probed {len(results)} proxies: {healthy} healthy")
+        return {r["proxy"]: r["ok"] for r in results}
+
+    async def start(self):
+        if self._task is None and self.proxy_manager.proxies:
+            self._task = asyncio.create_task(self._probe_loop())
+
+    async def _probe_loop(self):
+        while True:
+            try:
+                await self.probe_all()
+            except Exception as e:
+                logger.warning(f"Proxy probe round failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
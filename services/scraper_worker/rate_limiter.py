@@ -0,0 +1,150 @@
+import logging
+import os
+from typing import List, Optional, Tuple
+
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_WAIT = Histogram(
+    "scraper_rate_limit_wait_seconds",
+    "Wait returned by the shared rate limiter when a request was not admitted",
+    ["domain"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+RATE_LIMIT_DECISIONS = Counter(
+    "scraper_rate_limit_decisions_total",
+    "Shared rate limiter decisions",
+    ["domain", "result"],
+)
+
+# Token buckets are hashes of {tokens, ts}; refill and take happen in one
+# script so concurrent workers can never both spend the last token. Time comes
+# from the Redis server, so worker clock skew does not matter.
+#
+# KEYS[1]    cooldown key (PTTL > 0 blocks everything behind it)
+# KEYS[2..n] bucket keys, all of which must have a token to be admitted
+# ARGV       rate (tokens/s) and burst for each bucket key, in order
+#
+# Returns 0 when admitted (a token is taken from every bucket), otherwise the
+# milliseconds until all buckets would have a token (nothing is taken).
+TOKEN_BUCKET_LUA = """
+local cooldown = redis.call('PTTL', KEYS[1])
+if cooldown > 0 then
+    return cooldown
+end
+
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local wait = 0
+local levels = {}
+
+for i = 2, #KEYS do
+    local rate = tonumber(ARGV[(i - 2) * 2 + 1]) / 1000
+    local burst = tonumber(ARGV[(i - 2) * 2 + 2])
+    local state = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+    levels[i] = tokens
+    if tokens < 1 then
+        wait = math.max(wait, math.ceil((1 - tokens) / rate))
+    end
+end
+
+if wait > 0 then
+    return wait
+end
+
+for i = 2, #KEYS do
+    local rate = tonumber(ARGV[(i - 2) * 2 + 1]) / 1000
+    local burst = tonumber(ARGV[(i - 2) * 2 + 2])
+    redis.call('HSET', KEYS[i], 'tokens', tostring(levels[i] - 1), 'ts', now)
+    redis.call('PEXPIRE', KEYS[i], math.ceil(burst / rate) + 1000)
+end
+return 0
+"""
+
+
+def bucket_key(domain: str, proxy: Optional[str] = None) -> str:
+    if proxy:
+        return f"rate_limit:bucket:{domain}:{proxy}"
+    return f"rate_limit:bucket:{domain}"
+
+
+class RateLimiter:
+    """
+    Token-bucket rate limiter shared by every worker through Redis.
+
+    Each request needs a token from its domain bucket and, when a proxy is
+    used, from that proxy's bucket for the domain. ``acquire`` never sleeps:
+    it returns how long the caller should wait so the executor can move on to
+    a domain that is ready. ``cooldown`` pauses a domain outright (e.g. while
+    an operator investigates a block).
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        rate: float = None,
+        burst: float = None,
+        proxy_rate: float = None,
+        proxy_burst: float = None,
+        controller=None,
+    ):
+        self.redis = redis_client
+        self.rate = rate or float(os.getenv("RATE_LIMIT_DOMAIN_RPS", "0.2"))
+        self.burst = burst or float(os.getenv("RATE_LIMIT_DOMAIN_BURST", "1"))
+        self.proxy_rate = proxy_rate or float(os.getenv("RATE_LIMIT_PROXY_RPS", "0.1"))
+        self.proxy_burst = proxy_burst or float(os.getenv("RATE_LIMIT_PROXY_BURST", "1"))
+        # Optional AdaptiveController that owns the per-domain rate
+        self.controller = controller
+        self._script = redis_client.register_script(TOKEN_BUCKET_LUA)
+
+    def domain_rate(self, domain: str) -> Tuple[float, float]:
+        """(tokens per second, burst) for a domain's shared bucket."""
+        if self.controller is not None:
+            return self.controller.rate(domain), self.burst
+        return self.rate, self.burst
+
+    @staticmethod
+    def _cooldown_key(domain: str) -> str:
+        return f"rate_limit:{domain}"
+
+    def _buckets(self, domain: str, proxy: Optional[str]) -> Tuple[List[str], List[float]]:
+        rate, burst = self.domain_rate(domain)
+        keys = [self._cooldown_key(domain), bucket_key(domain)]
+        args = [rate, burst]
+        if proxy:
+            keys.append(bucket_key(domain, proxy))
+            args += [self.proxy_rate, self.proxy_burst]
+        return keys, args
+
+    async def acquire(self, domain: str, proxy: Optional[str] = None) -> float:
+        """Take a token, returning 0, or the seconds to wait before retrying."""
+        keys, args = self._buckets(domain, proxy)
+        try:
+            wait_ms = int(await self._script(keys=keys, args=args))
+        except Exception as e:
+            # Fail open: the executor's local per-domain delay still applies
+            logger.warning(f"Rate limiter unavailable for {domain}: {e}")
+            RATE_LIMIT_DECISIONS.labels(domain=domain, result="error").inc()
+            return 0.0
+
+        if wait_ms <= 0:
+            RATE_LIMIT_DECISIONS.labels(domain=domain, result="admitted").inc()
+            return 0.0
+        RATE_LIMIT_DECISIONS.labels(domain=domain, result="throttled").inc()
+        RATE_LIMIT_WAIT.labels(domain=domain).observe(wait_ms / 1000)
+        return wait_ms / 1000
+
+    async def cooldown(self, domain: str, seconds: float):
+        """Block a domain for every worker, without shortening a longer cooldown."""
+        key = self._cooldown_key(domain)
+        try:
+            remaining = await self.redis.pttl(key)
+            if remaining and remaining >= seconds * 1000:
+                return
+            await self.redis.set(key, "1", px=int(seconds * 1000))
+        except Exception as e:
+            logger.warning(f"Could not set cooldown for {domain}: {e}")
@@ -0,0 +1,19 @@
+import os
+
+from redis import asyncio as aioredis
+
+
+def create_redis(url: str = None) -> aioredis.Redis:
+    """
+    Async Redis client backed by a bounded, blocking connection pool.
+
+    Callers wait up to REDIS_POOL_TIMEOUT_SECONDS for a free connection instead
+    of failing outright when many scrapes hit Redis at once.
+    """
+    pool = aioredis.BlockingConnectionPool.from_url(
+        url or os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+        max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", "20")),
+        timeout=float(os.getenv("REDIS_POOL_TIMEOUT_SECONDS", "5")),
+        decode_responses=True,
+    )
+    return aioredis.Redis(connection_pool=pool)
@@ -0,0 +1,269 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+import httpx
+from prometheus_client import Counter, Gauge
+
+try:
+    from .adaptive_control import SiteThrottled
+except ImportError:
+    from adaptive_control import SiteThrottled
+
+logger = logging.getLogger(__name__)
+
+# Error classes
+TIMEOUT = "timeout"
+PROXY = "proxy"
+HTTP_4XX = "http_4xx"
+HTTP_5XX = "http_5xx"
+THROTTLED = "throttled"
+CAPTCHA = "captcha"
+PARSE = "parse"
+OTHER = "other"
+
+# Worth another attempt straight away: transient transport trouble or a
+# server error. 4xx, CAPTCHAs and parse failures come back the same, and
+# throttling is handled by the AIMD limiter, not by hammering the site.
+RETRYABLE = frozenset({TIMEOUT, PROXY, HTTP_5XX})
+# Failures that say the site is unwell. Proxy errors are the proxy's fault
+# and a 4xx is specific to one target, so neither opens a domain's breaker.
+SITE_FAILURES = frozenset({TIMEOUT, HTTP_5XX, THROTTLED, CAPTCHA, PARSE})
+
+# Chromium network errors that come from the proxy or the connection to it
+_PROXY_ERRORS = ("ERR_PROXY", "ERR_TUNNEL", "ERR_SOCKS", "ERR_CONNECTION_")
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+BREAKER_STATE = Gauge(
+    "scraper_circuit_state", "Circuit breaker state per domain (0 closed, 1 half-open, 2 open)", ["domain"]
+)
+BREAKER_TRANSITIONS = Counter(
+    "scraper_circuit_transitions_total", "Circuit breaker state changes", ["domain", "state"]
+)
+ERRORS = Counter("scraper_errors_total", "Scrape failures by error class", ["domain", "kind"])
+RETRIES = Counter(
+    "scraper_retries_total",
+    "What happened after a failed attempt: retried, not_retryable, exhausted or over_budget",
+    ["kind", "decision"],
+)
+
+
+class HttpError(Exception):
+    """The site answered with an error status instead of the page."""
+
+    def __init__(self, status: int):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+def classify(exc: BaseException) -> str:
+    """Error class of an exception raised while fetching a page."""
+    if isinstance(exc, SiteThrottled):
+        return THROTTLED
+    if isinstance(exc, HttpError):
+        return HTTP_5XX if exc.status >= 500 else HTTP_4XX
+    # Playwright's TimeoutError does not derive from the builtin one
+    if isinstance(exc, (asyncio.TimeoutError, httpx.TimeoutException)) or type(exc).__name__ == "TimeoutError":
+        return TIMEOUT
+    if isinstance(exc, (httpx.ProxyError, httpx.NetworkError, httpx.RemoteProtocolError)):
+        return PROXY
+    message = str(exc)
+    if "ERR_TIMED_OUT" in message:
+        return TIMEOUT
+    if any(marker in message for marker in _PROXY_ERRORS):
+        return PROXY
+    return OTHER
+
+
+def is_retryable(exc: BaseException) -> bool:
+    return classify(exc) in RETRYABLE
+
+
+class RetryBudget:
+    """
+    Process-wide cap on retries as a share of recent requests.
+
+    Retries are allowed while those made in the last ``window`` seconds stay
+    under ``ratio`` of the requests made in it (or ``min_retries``, so a quiet
+    worker can still retry). When a site or the proxy pool falls over, failed
+    requests stop multiplying into retries and the extra load stays bounded.
+    """
+
+    def __init__(self, ratio: float = None, min_retries: int = None, window: float = None, clock=time.monotonic):
+        self.ratio = ratio if ratio is not None else float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+        self.min_retries = (
+            min_retries if min_retries is not None else int(os.getenv("RETRY_BUDGET_MIN_RETRIES", "10"))
+        )
+        self.window = window or float(os.getenv("RETRY_BUDGET_WINDOW_SECONDS", "60"))
+        self._clock = clock
+        self._requests: deque = deque()
+        self._retries: deque = deque()
+
+    def _prune(self, now: float):
+        for events in (self._requests, self._retries):
+            while events and events[0] <= now - self.window:
+                events.popleft()
+
+    def record_request(self):
+        now = self._clock()
+        self._prune(now)
+        self._requests.append(now)
+
+    def try_retry(self) -> bool:
+        """Spend a retry if the budget allows it."""
+        now = self._clock()
+        self._prune(now)
+        if len(self._retries) >= max(self.min_retries, self.ratio * len(self._requests)):
+            return False
+        self._retries.append(now)
+        return True
+
+    def refund(self):
+        """Give back the last retry taken, when it was never actually made."""
+        if self._retries:
+            self._retries.pop()
+
+
+_budget: Optional[RetryBudget] = None
+
+
+def retry_budget() -> RetryBudget:
+    """The budget shared by every retrying call in the process."""
+    global _budget
+    if _budget is None:
+        _budget = RetryBudget()
+    return _budget
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker for one domain.
+
+    ``failure_threshold`` site failures in a row open it, and nothing is sent
+    to the domain for ``open_seconds``. Then it goes half-open and admits a
+    single trial scrape: success closes it, failure opens it again for twice
+    as long (up to ``max_open_seconds``). A trial that never reports back is
+    given up on after ``open_seconds`` and another one is admitted.
+    """
+
+    def __init__(self, failure_threshold: int, open_seconds: float, max_open_seconds: float, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self._clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self._open_for = open_seconds
+        self._opened_at = 0.0
+        self._trial_at: Optional[float] = None
+
+    def allow(self) -> float:
+        """0 to go ahead, else the seconds until the domain may be tried."""
+        if self.state == CLOSED:
+            return 0.0
+        now = self._clock()
+        if self.state == OPEN:
+            remaining = self._opened_at + self._open_for - now
+            if remaining > 0:
+                return remaining
+            self.state = HALF_OPEN
+            self._trial_at = None
+        if self._trial_at is not None and now - self._trial_at < self.open_seconds:
+            return self._trial_at + self.open_seconds - now
+        self._trial_at = now
+        return 0.0
+
+    def release(self):
+        """An admitted trial was not dispatched after all."""
+        self._trial_at = None
+
+    def record(self, success: bool):
+        if self.state == OPEN:
+            # Stragglers dispatched before the breaker opened
+            return
+        if success:
+            self.state = CLOSED
+            self.failures = 0
+            self._open_for = self.open_seconds
+            self._trial_at = None
+            return
+        self.failures += 1
+        if self.state == HALF_OPEN:
+            self._open_for = min(self._open_for * 2, self.max_open_seconds)
+        elif self.failures < self.failure_threshold:
+            return
+        self.state = OPEN
+        self._opened_at = self._clock()
+        self._trial_at = None
+
+
+class Resilience:
+    """
+    Per-domain circuit breakers and error accounting for the worker.
+
+    The executor gate asks ``allow(domain)`` before dispatching, so a domain
+    with an open breaker is put aside (or skipped for the round) like a
+    throttled one. Every scrape reports its outcome through ``record``.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = None,
+        open_seconds: float = None,
+        max_open_seconds: float = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold or int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+        self.open_seconds = open_seconds or float(os.getenv("CIRCUIT_OPEN_SECONDS", "60"))
+        self.max_open_seconds = max_open_seconds or float(os.getenv("CIRCUIT_MAX_OPEN_SECONDS", "900"))
+        self._clock = clock
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def breaker(self, domain: str) -> CircuitBreaker:
+        breaker = self._breakers.get(domain)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                self.failure_threshold, self.open_seconds, self.max_open_seconds, self._clock
+            )
+            self._breakers[domain] = breaker
+        return breaker
+
+    def state(self, domain: str) -> str:
+        return self.breaker(domain).state
+
+    def _observe(self, domain: str, before: str, breaker: CircuitBreaker):
+        if breaker.state != before:
+            logger.warning(f"Circuit for {domain} is now {breaker.state}")
+            BREAKER_TRANSITIONS.labels(domain=domain, state=breaker.state).inc()
+            BREAKER_STATE.labels(domain=domain).set(_STATE_VALUES[breaker.state])
+
+    def allow(self, domain: str) -> float:
+        breaker = self.breaker(domain)
+        before = breaker.state
+        wait = breaker.allow()
+        self._observe(domain, before, breaker)
+        return wait
+
+    def release(self, domain: str):
+        self.breaker(domain).release()
+
+    def record(self, domain: str, kind: Optional[str] = None) -> bool:
+        """
+        Outcome of a scrape: None for success, else its error class.
+        Returns True when this failure opened a closed breaker.
+        """
+        if kind is not None:
+            ERRORS.labels(domain=domain, kind=kind).inc()
+        breaker = self.breaker(domain)
+        before = breaker.state
+        if kind is None or kind in SITE_FAILURES:
+            breaker.record(kind is None)
+        self._observe(domain, before, breaker)
+        return before == CLOSED and breaker.state == OPEN
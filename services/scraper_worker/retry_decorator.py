@@ -2,19 +2,83 @@ import asyncio
 import logging
 import random
 from functools import wraps
-from typing import Callable, Any, Coroutine
+from typing import Any, Awaitable, Callable, Coroutine, Optional
+
+try:
+    from .resilience import RETRIES, RetryBudget, classify, is_retryable, retry_budget
+except ImportError:
+    from resilience import RETRIES, RetryBudget, classify, is_retryable, retry_budget
 
 logger = logging.getLogger(__name__)
 
 
+async def call_with_retries(
+    func: Callable[[], Awaitable[Any]],
+    max_attempts: int = 3,
+    base: float = 2.0,
+    cap: float = 30.0,
+    jitter: float = 0.3,
+    retry_if: Callable[[BaseException], bool] = is_retryable,
+    budget: Optional[RetryBudget] = None,
+    before_retry: Optional[Callable[[BaseException], Awaitable[None]]] = None,
+    name: str = None,
+) -> Any:
+    """
+    Await ``func()`` with exponential backoff and jitter between attempts.
+
+    Only failures ``retry_if`` accepts are retried (by default timeouts,
+    proxy/connection errors and 5xx, see ``resilience.classify``), and each
+    retry is taken from the process-wide retry budget. ``before_retry(exc)``
+    runs after the backoff, before the next attempt; callers use it to take
+    rate-limit tokens or switch proxies. If it raises, that error is raised.
+    """
+    name = name or getattr(func, "__name__", "call")
+    limit = budget or retry_budget()
+    limit.record_request()
+    attempt = 0
+
+    while True:
+        try:
+            return await func()
+        except Exception as exc:
+            attempt += 1
+            kind = classify(exc)
+            if not retry_if(exc):
+                RETRIES.labels(kind=kind, decision="not_retryable").inc()
+                raise
+            if attempt >= max_attempts:
+                RETRIES.labels(kind=kind, decision="exhausted").inc()
+                logger.error(f"{name} failed after {attempt} attempts: {exc}")
+                raise
+            if not limit.try_retry():
+                RETRIES.labels(kind=kind, decision="over_budget").inc()
+                logger.warning(f"{name} failed ({kind}), retry budget exhausted: {exc}")
+                raise
+            RETRIES.labels(kind=kind, decision="retried").inc()
+
+            sleep_for = min(cap, base ** attempt)
+            # apply jitter
+            sleep_for *= random.uniform(1 - jitter, 1 + jitter)
+            logger.warning(
+                f"{name} attempt {attempt} failed ({kind}): {exc}. "
+                f"Retrying in {sleep_for:.2f}s..."
+            )
+            await asyncio.sleep(sleep_for)
+            if before_retry is not None:
+                await before_retry(exc)
+
+
 def retry_backoff(
     max_attempts: int = 3,
     base: float = 2.0,
+    cap: float = 30.0,
     jitter: float = 0.3,
-    retry_exceptions: tuple[type[BaseException], ...] = (Exception,),
+    retry_if: Callable[[BaseException], bool] = is_retryable,
+    budget: Optional[RetryBudget] = None,
 ) -> Callable[[Callable[..., Coroutine[Any, Any, Any]]], Callable[..., Coroutine[Any, Any, Any]]]:
     """
-    Simple async retry decorator with exponential backoff and jitter.
+    Decorator form of ``call_with_retries`` for calls whose retries need no
+    new tokens or proxy.
 
     Usage:
         @retry_backoff(max_attempts=3, base=2.0)
@@ -25,34 +89,17 @@ def retry_backoff(
     def decorator(func: Callable[..., Coroutine[Any, Any, Any]]):
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            attempt = 0
-            last_exc: BaseException | None = None
-
-            while attempt < max_attempts:
-                try:
-                    return await func(*args, **kwargs)
-                except retry_exceptions as exc:
-                    attempt += 1
-                    last_exc = exc
-                    if attempt >= max_attempts:
-                        logger.error(f"{func.__name__} failed after {attempt} attempts: {exc}")
-                        raise
-
-                    sleep_for = base ** attempt
-                    # apply jitter
-                    sleep_for *= random.uniform(1 - jitter, 1 + jitter)
-                    logger.warning(
-                        f"{func.__name__} attempt {attempt} failed: {exc}. "
-                        f"Retrying in {sleep_for:.2f}s..."
-                    )
-                    await asyncio.sleep(sleep_for)
-
-            # Should not reach here
-            if last_exc:
-                raise last_exc
+            return await call_with_retries(
+                lambda: func(*args, **kwargs),
+                max_attempts=max_attempts,
+                base=base,
+                cap=cap,
+                jitter=jitter,
+                retry_if=retry_if,
+                budget=budget,
+                name=func.__name__,
+            )
 
         return wrapper
 
     return decorator
-
-
@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import os
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+INFLIGHT = Gauge("scraper_inflight_scrapes", "Scrapes currently running", ["domain"])
+QUEUED = Gauge("scraper_queued_scrapes", "Scrapes waiting for a free slot", ["domain"])
+DEFERRED = Counter("scraper_deferred_dispatch_total", "Dispatches postponed by the admission gate", ["domain"])
+SKIPPED = Counter("scraper_skipped_scrapes_total", "Scrapes dropped from a round by a long gate wait", ["domain"])
+
+# How often to re-check domain limits when every pending domain is at its
+# limit and nothing is running to free a slot
+IDLE_POLL_SECONDS = 0.5
+
+
+class ScrapeExecutor:
+    """
+    Bounded task pool for one scrape round.
+
+    Targets are bucketed per domain and dispatched round-robin across domains,
+    so slow or throttled sites never hold up the others. Two limits apply:
+    a global concurrency cap for the process and a per-domain cap, with a
+    polite delay enforced between requests to the same domain.
+
+    An optional async ``gate(target)`` is asked before each dispatch and
+    returns 0 to proceed or the seconds to wait; the domain is then put aside
+    while other domains run. Domains asked to wait longer than ``max_defer``
+    are dropped for the rest of the round.
+
+    With ``refill(count)`` the round never ends: whenever fewer than
+    ``backlog`` targets are queued or running, more are fetched in the
+    background and scheduled as they arrive, so a freed slot is reused at
+    once instead of waiting for the slowest scrape of a batch.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = None,
+        domain_concurrency: int = None,
+        domain_delay: float = None,
+        gate: Optional[Callable[[dict], Awaitable[float]]] = None,
+        max_defer: float = None,
+        controller=None,
+    ):
+        self.max_concurrency = max_concurrency or int(os.getenv("SCRAPER_MAX_CONCURRENCY", "4"))
+        self.domain_concurrency = domain_concurrency or int(
+            os.getenv("SCRAPER_DOMAIN_CONCURRENCY", "1")
+        )
+        self.domain_delay = (
+            domain_delay
+            if domain_delay is not None
+            else float(os.getenv("SCRAPER_DOMAIN_DELAY_SECONDS", "2.0"))
+        )
+        self.gate = gate
+        # Optional AdaptiveController that owns the per-domain concurrency
+        self.controller = controller
+        self.max_defer = (
+            max_defer
+            if max_defer is not None
+            else float(os.getenv("SCRAPER_MAX_DEFER_SECONDS", "60"))
+        )
+        # Targets queued or running before refill asks for more
+        self.backlog = self.max_concurrency * 2
+        self._inflight: Dict[str, int] = {}
+        self._ready_at: Dict[str, float] = {}
+
+    def domain_limit(self, domain: str) -> int:
+        if self.controller is not None:
+            return self.controller.concurrency(domain)
+        return self.domain_concurrency
+
+    def _is_ready(self, domain: str, now: float) -> bool:
+        return (
+            self._inflight.get(domain, 0) < self.domain_limit(domain)
+            and self._ready_at.get(domain, 0.0) <= now
+        )
+
+    async def run(
+        self,
+        targets: Iterable[dict],
+        scrape_fn: Callable[[dict], Awaitable[None]],
+        on_skip: Optional[Callable[[dict], Awaitable[None]]] = None,
+        refill: Optional[Callable[[int], Awaitable[List[dict]]]] = None,
+    ) -> int:
+        """
+        Scrape every target, returning the number of scrapes dispatched.
+        Targets dropped because of a long gate wait are passed to ``on_skip``.
+        With ``refill``, runs until cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        pending: "OrderedDict[str, deque]" = OrderedDict()
+
+        def enqueue(new_targets: Iterable[dict]):
+            touched = set()
+            for target in new_targets:
+                pending.setdefault(target["domain"], deque()).append(target)
+                touched.add(target["domain"])
+            for domain in touched:
+                QUEUED.labels(domain=domain).set(len(pending[domain]))
+
+        enqueue(targets)
+        tasks: Set[asyncio.Task] = set()
+        feeding: Optional[asyncio.Task] = None
+        dispatched = 0
+
+        async def _run_one(domain: str, target: dict):
+            try:
+                await scrape_fn(target)
+            except Exception as e:
+                logger.error(f"Failed to scrape target {target.get('id')}: {e}")
+            finally:
+                self._inflight[domain] -= 1
+                INFLIGHT.labels(domain=domain).set(self._inflight[domain])
+                self._ready_at[domain] = max(
+                    self._ready_at.get(domain, 0.0), loop.time() + self.domain_delay
+                )
+
+        try:
+            while pending or tasks or refill is not None:
+                if feeding is not None and feeding.done():
+                    enqueue(feeding.result())
+                    feeding = None
+                if refill is not None and feeding is None:
+                    room = self.backlog - len(tasks) - sum(len(queue) for queue in pending.values())
+                    if room > 0:
+                        feeding = asyncio.create_task(refill(room))
+
+                now = loop.time()
+                launched = False
+                for domain in list(pending):
+                    if len(tasks) >= self.max_concurrency:
+                        break
+                    if not self._is_ready(domain, now):
+                        continue
+                    queue = pending[domain]
+                    if self.gate is not None:
+                        wait = await self.gate(queue[0])
+                        if wait > self.max_defer:
+                            logger.info(f"{domain} blocked for {wait:.0f}s, skipping {len(queue)} targets this round")
+                            del pending[domain]
+                            QUEUED.labels(domain=domain).set(0)
+                            SKIPPED.labels(domain=domain).inc(len(queue))
+                            if on_skip is not None:
+                                for skipped in queue:
+                                    await on_skip(skipped)
+                            continue
+                        if wait > 0:
+                            DEFERRED.labels(domain=domain).inc()
+                            self._ready_at[domain] = now + wait
+                            continue
+                    target = queue.popleft()
+                    if not queue:
+                        del pending[domain]
+                    else:
+                        # Rotate so the next pass starts with a different domain
+                        pending.move_to_end(domain)
+                    QUEUED.labels(domain=domain).set(len(queue))
+
+                    self._inflight[domain] = self._inflight.get(domain, 0) + 1
+                    INFLIGHT.labels(domain=domain).set(self._inflight[domain])
+                    # Space out concurrent starts against the same domain
+                    self._ready_at[domain] = now + self.domain_delay / self.domain_limit(domain)
+                    tasks.add(asyncio.create_task(_run_one(domain, target)))
+                    dispatched += 1
+                    launched = True
+
+                if launched:
+                    continue
+
+                # Sleep until a slot frees up, the next domain delay expires
+                # or more targets arrive
+                timeout = None
+                waiting = [
+                    self._ready_at.get(d, 0.0)
+                    for d in pending
+                    if self._inflight.get(d, 0) < self.domain_limit(d)
+                ]
+                if waiting and len(tasks) < self.max_concurrency:
+                    timeout = max(0.0, min(waiting) - now)
+                waiters = tasks if feeding is None else tasks | {feeding}
+                if waiters:
+                    done, _ = await asyncio.wait(
+                        waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    tasks -= done
+                else:
+                    # Nothing running and no domain under its limit (e.g. the
+                    # controller cut it to zero): wait for limits to change
+                    await asyncio.sleep(timeout if timeout is not None else IDLE_POLL_SECONDS)
+        finally:
+            if feeding is not None:
+                feeding.cancel()
+
+        return dispatched
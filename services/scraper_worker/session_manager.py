@@ -0,0 +1,184 @@
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Optional
+
+from prometheus_client import Counter, Histogram
+
+try:
+    from .ua_manager import pick_ua
+except ImportError:
+    from ua_manager import pick_ua
+
+logger = logging.getLogger(__name__)
+
+SESSION_FETCHES = Counter(
+    "scraper_session_fetches_total",
+    "Browser fetches by session age (requests made on the session) and outcome",
+    ["domain", "age", "result"],
+)
+SESSION_FETCH_SECONDS = Histogram(
+    "scraper_session_fetch_seconds",
+    "Browser fetch latency by session age (requests made on the session)",
+    ["age"],
+    buckets=(0.5, 1, 2, 3, 5, 8, 13, 20, 30),
+)
+SESSIONS_RETIRED = Counter(
+    "scraper_sessions_retired_total",
+    "Browser sessions retired",
+    ["domain", "reason"],
+)
+
+
+def age_bucket(uses: int) -> str:
+    """Coarse label for how many requests a session has made, including this one."""
+    if uses <= 1:
+        return "1"
+    if uses <= 5:
+        return "2-5"
+    if uses <= 20:
+        return "6-20"
+    return "21+"
+
+
+@dataclass
+class Session:
+    """A browser identity reused across visits: proxy, UA, viewport and cookies."""
+
+    id: str
+    domain: str
+    proxy: Optional[str]
+    user_agent: str
+    viewport: Dict[str, int]
+    created_at: float
+    uses: int = 0
+    # Playwright storage_state (cookies + localStorage); None until first visit
+    storage_state: Optional[dict] = field(default=None, repr=False)
+
+
+class SessionManager:
+    """
+    Sticky browser sessions per (domain, proxy), shared by all replicas.
+
+    A fresh context per fetch looks like a first-time visitor every time:
+    consent pages, redirect hops and more CAPTCHAs. Instead each fetch checks
+    out an idle session for its domain and proxy, runs with that session's
+    user agent, viewport and storage_state, and checks it back in with the
+    updated cookies. Idle sessions live in Redis (a list of ids per domain and
+    proxy, one JSON key per session), so a session is only ever used by one
+    fetch at a time across every worker.
+
+    Sessions are retired after ``max_uses`` fetches, ``max_age`` seconds or
+    as soon as they hit a CAPTCHA or block page.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        enabled: bool = None,
+        max_uses: int = None,
+        max_age: float = None,
+    ):
+        self.redis = redis_client
+        if enabled is None:
+            enabled = os.getenv("SESSIONS_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.enabled = enabled
+        self.max_uses = max_uses or int(os.getenv("SESSION_MAX_USES", "50"))
+        self.max_age = max_age or float(os.getenv("SESSION_MAX_AGE_SECONDS", "1800"))
+
+    @staticmethod
+    def _key(session_id: str) -> str:
+        return f"session:{session_id}"
+
+    @staticmethod
+    def _idle_key(domain: str, proxy: Optional[str]) -> str:
+        return f"session:idle:{domain}:{proxy or 'direct'}"
+
+    def _new(self, domain: str, proxy: Optional[str]) -> Session:
+        return Session(
+            id=uuid.uuid4().hex,
+            domain=domain,
+            proxy=proxy,
+            user_agent=pick_ua(),
+            viewport={"width": random.randint(1200, 1920), "height": random.randint(800, 1080)},
+            created_at=time.time(),
+        )
+
+    def _expired(self, session: Session, now: float) -> Optional[str]:
+        if session.uses >= self.max_uses:
+            return "uses"
+        if now - session.created_at >= self.max_age:
+            return "age"
+        return None
+
+    async def checkout(self, domain: str, proxy: Optional[str] = None) -> Optional[Session]:
+        """An idle session for the domain and proxy, or a new one."""
+        if not self.enabled:
+            return None
+        idle_key = self._idle_key(domain, proxy)
+        try:
+            # A few attempts: ids in the list may point at expired sessions
+            for _ in range(5):
+                session_id = await self.redis.lpop(idle_key)
+                if not session_id:
+                    break
+                raw = await self.redis.get(self._key(session_id))
+                if not raw:
+                    continue
+                session = Session(**json.loads(raw))
+                reason = self._expired(session, time.time())
+                if reason:
+                    await self._retire(session, reason)
+                    continue
+                return session
+        except Exception as e:
+            logger.warning(f"Could not load a session for {domain}: {e}")
+        return self._new(domain, proxy)
+
+    async def checkin(
+        self,
+        session: Optional[Session],
+        blocked: Optional[str] = None,
+        latency_ms: float = None,
+        error: bool = False,
+    ):
+        """
+        Return a session after a fetch. ``blocked`` names why the site refused
+        it ("captcha", "http_429", ...) and retires it; ``error`` marks a fetch
+        that raised or was cancelled, which is counted without a latency.
+        """
+        if session is None:
+            return
+        session.uses += 1
+        age = age_bucket(session.uses)
+        result = "error" if error else "blocked" if blocked else "ok"
+        SESSION_FETCHES.labels(domain=session.domain, age=age, result=result).inc()
+        if latency_ms is not None and not error:
+            SESSION_FETCH_SECONDS.labels(age=age).observe(latency_ms / 1000)
+
+        reason = blocked or self._expired(session, time.time())
+        if reason:
+            await self._retire(session, reason)
+            return
+        ttl_ms = max(int((session.created_at + self.max_age - time.time()) * 1000), 1)
+        idle_key = self._idle_key(session.domain, session.proxy)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.set(self._key(session.id), json.dumps(asdict(session)), px=ttl_ms)
+                pipe.rpush(idle_key, session.id)
+                pipe.pexpire(idle_key, int(self.max_age * 1000))
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Could not save session for {session.domain}: {e}")
+
+    async def _retire(self, session: Session, reason: str):
+        SESSIONS_RETIRED.labels(domain=session.domain, reason=reason).inc()
+        logger.info(f"Retiring {session.domain} session after {session.uses} uses ({reason})")
+        try:
+            await self.redis.delete(self._key(session.id))
+        except Exception as e:
+            logger.debug(f"Could not delete session {session.id}: {e}")
@@ -0,0 +1,130 @@
+import asyncio
+import bisect
+import hashlib
+import logging
+import os
+import socket
+import time
+from typing import Dict, Iterable, List, Optional
+
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+# SCRAPER_MODE value: poll active targets, but only scrape this replica's slice
+MODE_SHARD = "shard"
+
+SHARD_MEMBERS = Gauge("scraper_shard_members", "Live scraper replicas in the shard ring")
+SHARD_OWNED = Gauge("scraper_shard_owned_targets", "Targets owned by this replica in the last round")
+SHARD_REBALANCES = Counter("scraper_shard_rebalances_total", "Shard ring membership changes seen")
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Consistent hash ring with virtual nodes.
+
+    Adding or removing a member only moves the keys that land on its virtual
+    nodes (about 1/N of them); every other key keeps its owner.
+    """
+
+    def __init__(self, members: Iterable[str] = (), vnodes: int = 128):
+        self.vnodes = vnodes
+        self.members = tuple(sorted(set(members)))
+        points = sorted(
+            (_hash(f"{member}#{i}"), member)
+            for member in self.members
+            for i in range(vnodes)
+        )
+        self._hashes = [h for h, _ in points]
+        self._owners = [m for _, m in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._hashes:
+            return None
+        idx = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._owners[idx]
+
+
+class ShardMembership:
+    """
+    Heartbeat-based replica membership kept in a Redis sorted set.
+
+    Each replica refreshes its score (last heartbeat time) every ``interval``
+    seconds; members not seen for ``ttl`` seconds are pruned and their slice
+    of the ring moves to the survivors on the next heartbeat.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        member_id: str = None,
+        key: str = None,
+        interval: float = None,
+        ttl: float = None,
+        vnodes: int = None,
+    ):
+        self.redis = redis_client
+        self.member_id = member_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.key = key or os.getenv("SHARD_MEMBERS_KEY", "scraper:members")
+        self.interval = interval or float(os.getenv("SHARD_HEARTBEAT_SECONDS", "10"))
+        self.ttl = ttl or float(os.getenv("SHARD_MEMBER_TTL_SECONDS", "30"))
+        self.vnodes = vnodes or int(os.getenv("SHARD_VNODES", "128"))
+        # Until the first heartbeat we only know about ourselves
+        self.ring = HashRing([self.member_id], self.vnodes)
+        self._task: Optional[asyncio.Task] = None
+
+    async def heartbeat(self):
+        now = time.time()
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.zadd(self.key, {self.member_id: now})
+                pipe.zremrangebyscore(self.key, "-inf", now - self.ttl)
+                pipe.zrange(self.key, 0, -1)
+                *_, members = await pipe.execute()
+        except Exception as e:
+            # Keep the last known ring rather than grabbing every target
+            logger.warning(f"Shard heartbeat failed, keeping {len(self.ring.members)} members: {e}")
+            return
+
+        members = set(members) | {self.member_id}
+        if tuple(sorted(members)) != self.ring.members:
+            logger.info(f"Shard ring changed: {len(self.ring.members)} -> {len(members)} members")
+            SHARD_REBALANCES.inc()
+            self.ring = HashRing(members, self.vnodes)
+        SHARD_MEMBERS.set(len(self.ring.members))
+
+    async def start(self):
+        await self.heartbeat()
+        if self._task is None:
+            self._task = asyncio.create_task(self._heartbeat_loop())
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.heartbeat()
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            # Leave promptly so peers pick up our slice on their next heartbeat
+            await self.redis.zrem(self.key, self.member_id)
+        except Exception as e:
+            logger.warning(f"Could not leave shard ring: {e}")
+
+    def owns(self, target: Dict) -> bool:
+        return self.ring.owner(str(target["id"])) == self.member_id
+
+    def filter(self, targets: List[Dict]) -> List[Dict]:
+        owned = [t for t in targets if t.get("id") and self.owns(t)]
+        SHARD_OWNED.set(len(owned))
+        return owned
@@ -0,0 +1,86 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from services.scraper_worker.adaptive_control import AdaptiveController, SUCCESS, THROTTLE
+from services.scraper_worker.rate_limiter import RateLimiter
+from services.scraper_worker.scrape_executor import ScrapeExecutor
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class FakePipeline:
+    def __init__(self, results):
+        self.results = results
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def hmget(self, *args):
+        pass
+
+    async def execute(self):
+        return self.results
+
+
+def _controller(script_result, **kwargs):
+    client = MagicMock()
+    script = AsyncMock(return_value=script_result)
+    client.register_script.return_value = script
+    return client, script, AdaptiveController(client, initial_rate=0.2, initial_concurrency=1, **kwargs)
+
+
+def test_unknown_domain_uses_initial_values():
+    _, _, control = _controller(None, enabled=True)
+
+    assert control.rate("shop.example") == 0.2
+    assert control.concurrency("shop.example") == 1
+
+
+def test_record_sends_event_and_caches_new_state():
+    _, script, control = _controller(["0.1", "1", 1], enabled=True, hold=30)
+
+    run(control.record("shop.example", THROTTLE))
+
+    kwargs = script.await_args.kwargs
+    assert kwargs["keys"] == ["aimd:shop.example", "rate_limit:bucket:shop.example"]
+    assert kwargs["args"][0] == "throttle"
+    assert kwargs["args"][11] == 30000
+    assert kwargs["args"][-1] == 1
+    assert control.rate("shop.example") == 0.1
+
+
+def test_disabled_controller_still_reports_throttles_but_keeps_rates():
+    _, script, control = _controller(["0.2", "1", 1], enabled=False)
+
+    run(control.record("shop.example", THROTTLE))
+
+    assert script.await_args.kwargs["args"][-1] == 0
+    assert control.rate("shop.example") == 0.2
+
+
+def test_refresh_adopts_state_written_by_other_replicas():
+    client, _, control = _controller(None, enabled=True)
+    client.pipeline.return_value = FakePipeline([["1.5", "3"], [None, None]])
+
+    run(control.refresh(["fast.example", "new.example", "fast.example"]))
+
+    assert control.rate("fast.example") == 1.5
+    assert control.concurrency("fast.example") == 3
+    assert control.rate("new.example") == 0.2
+
+
+def test_limiter_and_executor_follow_controller():
+    client, _, control = _controller(["0.8", "2", 0], enabled=True)
+    run(control.record("shop.example", SUCCESS))
+
+    limiter = RateLimiter(client, rate=0.2, burst=1, controller=control)
+    executor = ScrapeExecutor(domain_concurrency=1, controller=control)
+
+    assert limiter.domain_rate("shop.example") == (0.8, 1)
+    assert executor.domain_limit("shop.example") == 2
+    assert executor.domain_limit("other.example") == 1
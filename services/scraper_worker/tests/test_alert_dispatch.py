@@ -0,0 +1,106 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import httpx
+
+from services.scraper_worker.alert_manager import AlertManager
+
+RealAsyncClient = httpx.AsyncClient
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def _client_factory(handler):
+    def factory(*args, **kwargs):
+        return RealAsyncClient(transport=httpx.MockTransport(handler), **kwargs)
+
+    return factory
+
+
+def test_queued_discord_alert_honours_retry_after(monkeypatch):
+    monkeypatch.setenv("DISCORD_WEBHOOK_URL", "https://discord.test/webhook")
+    monkeypatch.delenv("TELEGRAM_BOT_TOKEN", raising=False)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0.01"}, json={"retry_after": 0.01})
+        return httpx.Response(204)
+
+    async def scenario():
+        with patch("services.scraper_worker.alert_manager.httpx.AsyncClient", _client_factory(handler)):
+            mgr = AlertManager(max_attempts=3)
+            await mgr.start()
+            mgr.alert_price_drop({"title": "Phone", "domain": "amazon.in"}, 100.0, 80.0)
+            # Enqueue returns immediately; delivery happens in the background
+            assert calls == []
+            await mgr.close(drain_timeout=5)
+
+    run(scenario())
+
+    assert len(calls) == 2
+    assert calls[0].url == "https://discord.test/webhook"
+
+
+def test_permanent_client_error_is_not_retried(monkeypatch):
+    monkeypatch.setenv("DISCORD_WEBHOOK_URL", "https://discord.test/webhook")
+    monkeypatch.delenv("TELEGRAM_BOT_TOKEN", raising=False)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(404)
+
+    async def scenario():
+        with patch("services.scraper_worker.alert_manager.httpx.AsyncClient", _client_factory(handler)):
+            mgr = AlertManager(max_attempts=5)
+            await mgr.start()
+            mgr.alert_repeated_errors({"title": "Phone", "domain": "amazon.in"}, 5)
+            await mgr.close(drain_timeout=5)
+
+    run(scenario())
+
+    assert len(calls) == 1
+
+
+def test_full_queue_drops_instead_of_blocking(monkeypatch):
+    monkeypatch.setenv("DISCORD_WEBHOOK_URL", "https://discord.test/webhook")
+    monkeypatch.delenv("TELEGRAM_BOT_TOKEN", raising=False)
+
+    async def scenario():
+        mgr = AlertManager(queue_size=1)
+        mgr._queues["discord"] = asyncio.Queue(maxsize=1)
+        first = mgr._enqueue("discord", "https://discord.test/webhook", {})
+        second = mgr._enqueue("discord", "https://discord.test/webhook", {})
+        return first, second
+
+    assert run(scenario()) == (True, False)
+
+
+def test_retry_after_is_capped(monkeypatch):
+    calls = []
+    slept = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "86400"})
+        return httpx.Response(204)
+
+    async def fake_sleep(seconds):
+        slept.append(seconds)
+
+    async def scenario():
+        mgr = AlertManager(max_attempts=2, max_retry_after=30)
+        mgr._clients["discord"] = RealAsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr("services.scraper_worker.alert_manager.asyncio.sleep", fake_sleep)
+        delivered = await mgr._deliver("discord", time.monotonic(), "https://discord.test/webhook", {})
+        monkeypatch.undo()
+        return delivered
+
+    assert run(scenario()) is True
+    assert slept == [30]
@@ -0,0 +1,40 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+from services.scraper_worker.async_db_manager import AsyncDBManager
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@patch("services.scraper_worker.db_pool.psycopg2.connect")
+def test_save_price_history_uses_prepared_insert(mock_connect):
+    mock_conn = MagicMock()
+    mock_conn.closed = 0
+    mock_cursor = MagicMock()
+    mock_cursor.connection = mock_conn
+    mock_connect.return_value = mock_conn
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+
+    db = AsyncDBManager(connection_string="postgres://test")
+    ok = run(db.save_price_history({"target_id": "t1", "price": 10.0}))
+    ok_again = run(db.save_price_history({"target_id": "t1", "price": 11.0}))
+    run(db.close())
+
+    assert ok is True and ok_again is True
+    statements = [c.args[0] for c in mock_cursor.execute.call_args_list]
+    assert statements[0].startswith("PREPARE insert_price_history AS")
+    assert statements[1:] == ["EXECUTE insert_price_history (%s, %s, %s, %s, %s, %s, %s, %s, %s)"] * 2
+    mock_connect.assert_called_once()
+
+
+@patch("services.scraper_worker.db_pool.psycopg2.connect")
+def test_get_latest_price_returns_none_on_failure(mock_connect):
+    mock_connect.side_effect = RuntimeError("db down")
+
+    db = AsyncDBManager(connection_string="postgres://test")
+    row = run(db.get_latest_price("t1"))
+    run(db.close())
+
+    assert row is None
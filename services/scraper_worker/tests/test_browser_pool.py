@@ -0,0 +1,85 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from services.scraper_worker.browser_pool import BrowserPool
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def _fake_playwright():
+    launched = []
+
+    async def launch(**kwargs):
+        browser = MagicMock()
+        browser.is_connected.return_value = True
+        browser.close = AsyncMock()
+        launched.append(browser)
+        return browser
+
+    pw = MagicMock()
+    pw.chromium.launch = AsyncMock(side_effect=launch)
+    pw.stop = AsyncMock()
+    starter = MagicMock()
+    starter.start = AsyncMock(return_value=pw)
+    return starter, launched
+
+
+@patch("services.scraper_worker.browser_pool.async_playwright")
+def test_pool_reuses_browsers_across_fetches(mock_async_playwright):
+    starter, launched = _fake_playwright()
+    mock_async_playwright.return_value = starter
+
+    async def scenario():
+        pool = BrowserPool(size=2, contexts_per_browser=2, max_uses=100)
+        for _ in range(5):
+            async with pool.acquire() as browser:
+                assert browser in launched
+        stats = pool.get_stats()
+        await pool.close()
+        return stats
+
+    stats = run(scenario())
+
+    # Playwright is started once and only the pool's browsers are launched
+    starter.start.assert_awaited_once()
+    assert len(launched) == 2
+    assert stats["in_use"] == 0
+    assert stats["capacity"] == 4
+
+
+@patch("services.scraper_worker.browser_pool.async_playwright")
+def test_pool_relaunches_disconnected_browser(mock_async_playwright):
+    starter, launched = _fake_playwright()
+    mock_async_playwright.return_value = starter
+
+    async def scenario():
+        pool = BrowserPool(size=1, contexts_per_browser=1, max_uses=100)
+        await pool.start()
+        launched[0].is_connected.return_value = False
+        async with pool.acquire() as browser:
+            return browser
+
+    browser = run(scenario())
+
+    assert len(launched) == 2
+    assert browser is launched[1]
+    launched[0].close.assert_awaited()
+
+
+@patch("services.scraper_worker.browser_pool.async_playwright")
+def test_pool_recycles_browser_after_max_uses(mock_async_playwright):
+    starter, launched = _fake_playwright()
+    mock_async_playwright.return_value = starter
+
+    async def scenario():
+        pool = BrowserPool(size=1, contexts_per_browser=1, max_uses=2)
+        for _ in range(3):
+            async with pool.acquire():
+                pass
+
+    run(scenario())
+
+    # Second checkin hits max_uses and recycles the browser
+    assert len(launched) == 2
@@ -0,0 +1,91 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock
+
+from services.scraper_worker.change_detector import ChangeDetector
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+
+
+def test_state_is_read_from_redis_with_local_fallback():
+    redis_client = AsyncMock()
+    redis_client.get.return_value = json.dumps({"price": 499.0, "hash": "abc"})
+    detector = ChangeDetector(redis_client, enabled=True)
+
+    state = run(detector.get("t1"))
+    assert state.price == 499.0 and state.content_hash == "abc"
+
+    redis_client.get.side_effect = ConnectionError("redis down")
+    assert run(detector.get("t1")) == state
+    assert redis_client.get.await_count == 2
+
+
+def test_replicas_see_each_others_changes():
+    redis_client = FakeRedis()
+    first = ChangeDetector(redis_client, enabled=True)
+    second = ChangeDetector(redis_client, enabled=True)
+    first.seed("t1", 100.0)
+    second.seed("t1", 100.0)
+
+    run(second.remember("t1", 90.0, "h"))
+    state = run(first.get("t1"))
+
+    assert state.price == 90.0
+    assert first.is_unchanged(state, 100.0, "h") is False
+    assert first.is_unchanged(state, 90.0, "h") is True
+    # A seed from the database does not hide newer state in Redis
+    first.seed("t1", 100.0)
+    assert run(first.get("t1")).price == 90.0
+
+
+def test_is_unchanged_compares_prices_to_the_paisa():
+    detector = ChangeDetector(FakeRedis(), enabled=True)
+    detector.seed("t1", 1999.0)
+    state = run(detector.get("t1"))
+
+    assert detector.is_unchanged(state, 1999.001) is True
+    assert detector.is_unchanged(state, 1998.0) is False
+    assert detector.is_unchanged(None, 1999.0) is False
+
+
+def test_remember_persists_state_with_ttl():
+    redis_client = AsyncMock()
+    detector = ChangeDetector(redis_client, enabled=True, ttl=60)
+
+    run(detector.remember("t1", 10.0, "h1"))
+
+    redis_client.set.assert_awaited_once_with(
+        "target_state:t1", json.dumps({"price": 10.0, "hash": "h1"}), ex=60
+    )
+
+
+def test_disabled_detector_never_reports_unchanged():
+    detector = ChangeDetector(FakeRedis(), enabled=False)
+    detector.seed("t1", 10.0)
+
+    assert detector.is_unchanged(run(detector.get("t1")), 10.0) is False
+
+
+def test_same_price_with_different_fingerprint_is_a_change():
+    detector = ChangeDetector(FakeRedis(), enabled=True)
+    run(detector.remember("t1", 10.0, "in-stock"))
+    state = run(detector.get("t1"))
+
+    assert detector.is_unchanged(state, 10.0, "in-stock") is True
+    assert detector.is_unchanged(state, 10.0, "sold-out") is False
+    # Seeded state from the database has no fingerprint to compare
+    detector.seed("t2", 10.0)
+    assert detector.is_unchanged(run(detector.get("t2")), 10.0, "anything") is True
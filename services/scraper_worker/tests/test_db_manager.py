@@ -100,3 +100,33 @@ def test_get_latest_price_returns_row(mock_connect):
     mock_cursor.execute.assert_called_once()
 
 
+
+
+@patch("services.scraper_worker.db_manager.execute_values")
+@patch("services.scraper_worker.db_manager.psycopg2.connect")
+def test_save_price_history_batch_uses_single_multirow_insert(mock_connect, mock_execute_values):
+    mock_conn = MagicMock()
+    mock_connect.return_value = mock_conn
+
+    db = DBManager(connection_string="postgres://test")
+    ok = db.save_price_history_batch(
+        [{"target_id": "t1", "price": 1.0}, {"target_id": "t2", "price": 2.0}]
+    )
+
+    assert ok is True
+    mock_execute_values.assert_called_once()
+    assert len(mock_execute_values.call_args[0][2]) == 2
+    mock_conn.commit.assert_called_once()
+
+
+@patch("services.scraper_worker.db_manager.execute_values")
+@patch("services.scraper_worker.db_manager.psycopg2.connect")
+def test_update_scrape_jobs_batch_updates_from_values(mock_connect, mock_execute_values):
+    mock_connect.return_value = MagicMock()
+
+    db = DBManager(connection_string="postgres://test")
+    ok = db.update_scrape_jobs_batch([("t1", "success", None), ("t2", "failed", "boom")])
+
+    assert ok is True
+    sql = mock_execute_values.call_args[0][1]
+    assert "FROM (VALUES %s)" in sql
@@ -0,0 +1,86 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from psycopg2 import extensions
+
+from services.scraper_worker.db_pool import ConnectionPool
+
+
+@patch("services.scraper_worker.db_pool.ThreadedConnectionPool")
+def test_connection_reuses_pool_and_commits(mock_pool_cls):
+    mock_conn = MagicMock()
+    mock_conn.closed = 0
+    mock_pool_cls.return_value.getconn.return_value = mock_conn
+
+    pool = ConnectionPool("postgres://test", min_size=1, max_size=2)
+    for _ in range(3):
+        with pool.connection() as conn:
+            assert conn is mock_conn
+
+    mock_pool_cls.assert_called_once_with(1, 2, "postgres://test")
+    assert mock_conn.commit.call_count == 3
+    mock_pool_cls.return_value.putconn.assert_called_with(mock_conn, close=False)
+
+
+@patch("services.scraper_worker.db_pool.ThreadedConnectionPool")
+def test_connection_rolls_back_and_releases_slot_on_error(mock_pool_cls):
+    mock_conn = MagicMock()
+    mock_conn.closed = 0
+    mock_pool_cls.return_value.getconn.return_value = mock_conn
+
+    pool = ConnectionPool("postgres://test", min_size=1, max_size=1)
+    with pytest.raises(RuntimeError):
+        with pool.connection():
+            raise RuntimeError("bad query")
+
+    mock_conn.rollback.assert_called_once()
+    # The single slot was released, so the pool is usable again
+    with pool.connection():
+        pass
+
+
+def test_execute_prepared_prepares_once_per_connection():
+    pool = ConnectionPool("postgres://test", min_size=1, max_size=1)
+    cur = MagicMock()
+
+    pool.execute_prepared(cur, "q", "SELECT $1", ("a",))
+    pool.execute_prepared(cur, "q", "SELECT $1", ("b",))
+
+    statements = [c.args[0] for c in cur.execute.call_args_list]
+    assert statements == ["PREPARE q AS SELECT $1", "EXECUTE q (%s)", "EXECUTE q (%s)"]
+
+
+@patch("psycopg2.pool.psycopg2.connect")
+def test_connections_are_kept_and_reused_under_concurrent_load(mock_connect):
+    opened = []
+
+    def connect(*args, **kwargs):
+        conn = MagicMock()
+        conn.closed = 0
+        conn.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+        opened.append(conn)
+        return conn
+
+    mock_connect.side_effect = connect
+    pool = ConnectionPool("postgres://test", min_size=1, max_size=4)
+    seen = set()
+
+    def worker():
+        for _ in range(20):
+            with pool.connection() as conn:
+                seen.add(id(conn))
+                time.sleep(0.001)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 160 checkouts served by at most max_size connections, none closed
+    assert len(opened) <= 4
+    assert len(seen) == len(opened)
+    assert len(pool._get_pool()._pool) == len(opened)
+    assert not any(conn.close.called for conn in opened)
@@ -0,0 +1,44 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+from services.scraper_worker.fetch_tiers import (
+    FetchTierPolicy,
+    TIER_BROWSER,
+    TIER_HTTP,
+    looks_like_js_shell,
+)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_looks_like_js_shell_detects_empty_app_root():
+    shell = "<html><body><div id=\"__next\"></div>" + "<script></script>" * 50 + "</body></html>"
+    static = "<html><body>" + "<p>Product details</p>" * 50 + "<span class='price'>99</span></body></html>"
+
+    assert looks_like_js_shell(shell) is True
+    assert looks_like_js_shell(static) is False
+
+
+def test_policy_pins_domain_to_browser_after_repeated_http_failures():
+    redis_client = AsyncMock()
+    redis_client.get.return_value = None
+    policy = FetchTierPolicy(redis_client, http_enabled=True, failure_threshold=2, retry_after=600)
+
+    assert run(policy.preferred_tier("shop.example")) == TIER_HTTP
+
+    run(policy.record("shop.example", TIER_HTTP, False))
+    assert run(policy.preferred_tier("shop.example")) == TIER_HTTP
+    run(policy.record("shop.example", TIER_HTTP, False))
+
+    assert run(policy.preferred_tier("shop.example")) == TIER_BROWSER
+    redis_client.setex.assert_awaited_once_with("fetch_tier:shop.example", 600, TIER_BROWSER)
+
+
+def test_policy_reads_tier_learned_by_other_workers():
+    redis_client = AsyncMock()
+    redis_client.get.return_value = TIER_BROWSER
+    policy = FetchTierPolicy(redis_client, http_enabled=True)
+
+    assert run(policy.preferred_tier("amazon.in")) == TIER_BROWSER
@@ -0,0 +1,197 @@
+import asyncio
+import time
+
+import pytest
+
+from services.scraper_worker.hedging import HedgeSkipped, Hedger, LatencyWindow
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def make_hedger(samples=20, latency=0.01, **kwargs):
+    kwargs.setdefault("max_ratio", 1.0)
+    hedger = Hedger(enabled=True, min_samples=20, **kwargs)
+    for _ in range(samples):
+        hedger._record_attempt("amazon.in", latency)
+    return hedger
+
+
+def fetch(name, seconds, log=None):
+    async def attempt():
+        try:
+            await asyncio.sleep(seconds)
+        except asyncio.CancelledError:
+            if log is not None:
+                log.append(f"{name} cancelled")
+            raise
+        return {"name": name, "response_time_ms": seconds * 1000}
+
+    return attempt
+
+
+def test_latency_window_percentile():
+    window = LatencyWindow(size=100)
+    assert window.percentile(0.95) is None
+    for ms in range(1, 101):
+        window.add(ms / 1000)
+
+    assert window.percentile(0.95) == 0.095
+    assert window.percentile(0.5) == 0.05
+
+
+def test_no_hedge_until_enough_samples():
+    hedger = make_hedger(samples=5)
+    launched = []
+
+    async def backup():
+        launched.append(1)
+        return {"name": "backup", "response_time_ms": 1}
+
+    result = run(hedger.run("amazon.in", fetch("primary", 0.05), backup))
+
+    assert result["name"] == "primary"
+    assert launched == []
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    hedger = make_hedger()
+    log = []
+
+    result = run(hedger.run("amazon.in", fetch("primary", 1.0, log), fetch("backup", 0.01)))
+
+    assert result["name"] == "backup"
+    assert log == ["primary cancelled"]
+
+
+def test_fast_primary_does_not_start_backup():
+    hedger = make_hedger(latency=0.5)
+    launched = []
+
+    async def backup():
+        launched.append(1)
+
+    result = run(hedger.run("amazon.in", fetch("primary", 0.01), backup))
+
+    assert result["name"] == "primary"
+    assert launched == []
+
+
+def test_skipped_backup_waits_for_primary():
+    hedger = make_hedger()
+
+    async def backup():
+        raise HedgeSkipped("no other proxy")
+
+    assert run(hedger.run("amazon.in", fetch("primary", 0.05), backup))["name"] == "primary"
+
+
+def test_hedges_are_capped_by_budget():
+    hedger = make_hedger(max_ratio=0.0)
+    launched = []
+
+    async def backup():
+        launched.append(1)
+
+    assert run(hedger.run("amazon.in", fetch("primary", 0.05), backup))["name"] == "primary"
+    assert launched == []
+
+
+def test_backup_rescues_failed_primary_and_primary_error_wins_when_both_fail():
+    hedger = make_hedger()
+
+    async def failing():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("primary down")
+
+    async def also_failing():
+        raise RuntimeError("backup down")
+
+    assert run(hedger.run("amazon.in", failing, fetch("backup", 0.1)))["name"] == "backup"
+    with pytest.raises(RuntimeError, match="primary down"):
+        run(hedger.run("amazon.in", failing, also_failing))
+
+
+def test_disabled_hedger_still_tracks_latency():
+    hedger = Hedger(enabled=False, min_samples=1)
+
+    run(hedger.run("amazon.in", fetch("primary", 0.01), fetch("backup", 0.01)))
+
+    assert hedger.delay("amazon.in") is None
+    assert len(hedger._attempts["amazon.in"]) == 1
+
+
+def test_result_finishing_second_is_discarded():
+    hedger = make_hedger()
+    go = asyncio.Event()
+    discarded = []
+
+    async def primary():
+        await go.wait()
+        return {"name": "primary", "response_time_ms": 50}
+
+    async def backup():
+        # Wakes the primary, so both finish before the hedger looks again
+        go.set()
+        return {"name": "backup", "response_time_ms": 1}
+
+    async def discard(result):
+        discarded.append(result["name"])
+
+    result = run(hedger.run("amazon.in", primary, backup, discard=discard))
+
+    assert discarded == [{"primary": "backup", "backup": "primary"}[result["name"]]]
+
+
+def test_skipped_backup_does_not_spend_budget():
+    hedger = make_hedger(max_ratio=0.5)
+
+    async def skipped():
+        raise HedgeSkipped("no other proxy")
+
+    run(hedger.run("amazon.in", fetch("primary", 0.05), skipped))
+
+    assert len(hedger.budget._retries) == 0
+    assert run(hedger.run("amazon.in", fetch("primary", 1.0), fetch("backup", 0.01)))["name"] == "backup"
+
+
+def test_cancelled_backup_is_timed_from_its_own_start():
+    hedger = make_hedger(latency=0.02)
+
+    start = time.perf_counter()
+    run(hedger.run("amazon.in", fetch("primary", 0.1), fetch("backup", 1.0)))
+    elapsed = time.perf_counter() - start
+
+    censored = hedger._attempts["amazon.in"]._samples[-2]
+    assert censored <= elapsed - 0.02
+
+
+def test_hedge_delay_is_the_wall_time_callers_wait():
+    hedger = Hedger(enabled=True, min_samples=1)
+
+    async def queued_then_fast():
+        # Waits for a browser before the fetch itself is timed
+        await asyncio.sleep(0.05)
+        return {"name": "primary", "response_time_ms": 1}
+
+    run(hedger.run("amazon.in", queued_then_fast, fetch("backup", 0.01)))
+
+    assert hedger.delay("amazon.in") >= 0.05
+
+
+def test_cancelled_loser_cleans_up_before_run_returns():
+    hedger = make_hedger()
+    cleaned = []
+
+    async def primary():
+        try:
+            await asyncio.sleep(1.0)
+        except asyncio.CancelledError:
+            # Like closing the context and checking the session back in
+            await asyncio.sleep(0.01)
+            cleaned.append("primary")
+            raise
+
+    assert run(hedger.run("amazon.in", primary, fetch("backup", 0.01)))["name"] == "backup"
+    assert cleaned == ["primary"]
@@ -0,0 +1,63 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from services.scraper_worker.interception import InterceptionPolicy, TransferMeter
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_block_reason_blocks_heavy_types_and_trackers():
+    policy = InterceptionPolicy(enabled=True, allowlist_domains=[])
+
+    assert policy.block_reason("www.amazon.in", "image", "https://m.media-amazon.com/a.jpg") == "image"
+    assert policy.block_reason("www.amazon.in", "script", "https://www.googletagmanager.com/gtm.js") == "pattern"
+    assert policy.block_reason("www.amazon.in", "document", "https://www.amazon.in/dp/X") is None
+    assert policy.block_reason("www.amazon.in", "script", "https://www.amazon.in/app.js") is None
+
+
+def test_allowlisted_domain_keeps_stylesheets_but_not_trackers():
+    policy = InterceptionPolicy(enabled=True, allowlist_domains=["flipkart.com"])
+
+    assert policy.block_reason("www.flipkart.com", "stylesheet", "https://static.flipkart.com/a.css") is None
+    assert policy.block_reason("www.flipkart.com", "script", "https://connect.facebook.net/sdk.js") == "pattern"
+
+
+def test_attach_routes_requests_through_policy():
+    policy = InterceptionPolicy(enabled=True, allowlist_domains=[])
+    page = MagicMock()
+    page.route = AsyncMock()
+
+    run(policy.attach(page, "www.amazon.in"))
+    handler = page.route.call_args[0][1]
+
+    image_route = MagicMock()
+    image_route.request.resource_type = "image"
+    image_route.request.url = "https://example.com/a.png"
+    image_route.abort = AsyncMock()
+    doc_route = MagicMock()
+    doc_route.request.resource_type = "document"
+    doc_route.request.url = "https://www.amazon.in/dp/X"
+    doc_route.continue_ = AsyncMock()
+
+    run(handler(image_route))
+    run(handler(doc_route))
+
+    image_route.abort.assert_awaited_once()
+    doc_route.continue_.assert_awaited_once()
+
+
+def test_transfer_meter_sums_finished_request_sizes():
+    page = MagicMock()
+
+    async def scenario():
+        meter = TransferMeter(page)
+        on_finished = page.on.call_args[0][1]
+        for body in (1000, 2500):
+            request = MagicMock()
+            request.sizes = AsyncMock(return_value={"responseBodySize": body, "responseHeadersSize": 100})
+            on_finished(request)
+        return await meter.total()
+
+    assert run(scenario()) == 3700
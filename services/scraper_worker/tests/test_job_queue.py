@@ -0,0 +1,135 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from prometheus_client import REGISTRY
+from redis.exceptions import ResponseError
+
+from services.scraper_worker.job_queue import Job, JobPublisher, JobQueue
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class FakePipeline:
+    """Records queued commands; execute() returns canned results."""
+
+    def __init__(self, results=None):
+        self.calls = []
+        self.results = results
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def _results(self):
+        return self.results if self.results is not None else [1] * len(self.calls)
+
+
+class AsyncPipeline(FakePipeline):
+    async def execute(self):
+        return self._results()
+
+
+def test_publisher_skips_targets_already_queued():
+    client = MagicMock()
+    script = client.register_script.return_value
+    script.return_value = [1, 0]
+    publisher = JobPublisher(client, stream="jobs", dedup_ttl=60, maxlen=1000)
+
+    published = publisher.publish([{"id": "t1", "domain": "a.com"}, {"id": "t2"}, {"title": "no id"}])
+
+    assert published == 1
+    kwargs = script.call_args.kwargs
+    assert kwargs["keys"] == ["jobs", "scrape:queued:t1", "scrape:queued:t2"]
+    assert kwargs["args"][:2] == [60, 1000]
+    assert [json.loads(target) for target in kwargs["args"][3:]] == [{"id": "t1", "domain": "a.com"}, {"id": "t2"}]
+
+
+def test_failed_publish_counts_nothing_and_can_be_retried():
+    client = MagicMock()
+    script = client.register_script.return_value
+    script.side_effect = [ConnectionError("redis down"), [1]]
+    publisher = JobPublisher(client, stream="jobs")
+    published = REGISTRY.get_sample_value("scrape_queue_published_total", {"result": "published"})
+
+    with pytest.raises(ConnectionError):
+        publisher.publish([{"id": "t1"}])
+    assert REGISTRY.get_sample_value("scrape_queue_published_total", {"result": "published"}) == published
+
+    # Keys and jobs are written by one script, so the retry is not a duplicate
+    assert publisher.publish([{"id": "t1"}]) == 1
+
+
+def test_claim_reads_new_jobs_when_nothing_is_stuck():
+    client = AsyncMock()
+    client.xautoclaim.return_value = ["0-0", [], []]
+    client.xreadgroup.return_value = [
+        ["jobs", [("1-0", {"target": json.dumps({"id": "t1"}), "enqueued_at": "0"})]]
+    ]
+    queue = JobQueue(client, consumer="w1", stream="jobs", group="g", block_ms=100)
+
+    jobs = run(queue.claim(4))
+
+    assert [job.target for job in jobs] == [{"id": "t1"}]
+    client.xreadgroup.assert_awaited_once_with("g", "w1", {"jobs": ">"}, count=4, block=100)
+
+
+def test_claim_reclaims_stuck_jobs_and_dead_letters_repeat_offenders():
+    client = AsyncMock()
+    client.pipeline = MagicMock(return_value=AsyncPipeline())
+    client.xautoclaim.return_value = [
+        "5-0",
+        [
+            ("2-0", {"target": json.dumps({"id": "t2"}), "enqueued_at": "0"}),
+            ("3-0", {"target": json.dumps({"id": "t3"}), "enqueued_at": "0"}),
+        ],
+        [],
+    ]
+    client.xpending_range.side_effect = [[{"times_delivered": 2}], [{"times_delivered": 9}]]
+    client.xreadgroup.return_value = []
+    queue = JobQueue(client, consumer="w1", stream="jobs", group="g", visibility_timeout=30, max_deliveries=3)
+    reclaimed = REGISTRY.get_sample_value("scrape_queue_reclaimed_total")
+
+    jobs = run(queue.claim(2))
+
+    assert [job.message_id for job in jobs] == ["2-0"]
+    # The dead-lettered job is not counted as reclaimed
+    assert REGISTRY.get_sample_value("scrape_queue_reclaimed_total") == reclaimed + 1
+    assert client.xautoclaim.await_args.kwargs["min_idle_time"] == 30000
+    assert queue._claim_cursor == "5-0"
+    client.xadd.assert_awaited_once()
+    assert client.xadd.await_args.args[0] == "jobs:dead"
+    # Tops up with new deliveries without blocking on an empty stream
+    client.xreadgroup.assert_awaited_once_with("g", "w1", {"jobs": ">"}, count=1, block=None)
+
+
+def test_ack_releases_job_and_dedup_key():
+    pipe = AsyncPipeline()
+    client = AsyncMock()
+    client.pipeline = MagicMock(return_value=pipe)
+    queue = JobQueue(client, consumer="w1", stream="jobs", group="g")
+
+    run(queue.ack(Job(message_id="1-0", target={"id": "t1"}, enqueued_at=0)))
+
+    assert pipe.calls == [
+        ("xack", ("jobs", "g", "1-0"), {}),
+        ("delete", ("scrape:queued:t1",), {}),
+    ]
+
+
+def test_ensure_group_tolerates_existing_group():
+    client = AsyncMock()
+    client.xgroup_create.side_effect = ResponseError("BUSYGROUP Consumer Group name already exists")
+    queue = JobQueue(client, consumer="w1", stream="jobs", group="g")
+
+    run(queue.ensure_group())
+
+    client.xgroup_create.assert_awaited_once_with("jobs", "g", id="0", mkstream=True)
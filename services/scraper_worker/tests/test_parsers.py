@@ -1,6 +1,11 @@
+import hashlib
+from pathlib import Path
+
 from services.scraper_worker.parsers.amazon import AmazonParser
+from services.scraper_worker.parsers.document import ParsedDocument
 from services.scraper_worker.parsers.flipkart import FlipkartParser
 from services.scraper_worker.parsers.generic import GenericParser
+from services.scraper_worker.parsers.plans import PricePlan, PriceStrategy, css_to_xpath
 
 
 def test_amazon_parser_css_selector():
@@ -34,3 +39,139 @@ def test_generic_parser_fallback_selector():
     assert result["price"] == 3499.0
 
 
+
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def load_fixture(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+def test_fingerprint_ignores_page_noise():
+    parser = AmazonParser()
+    first = parser.parse_price(load_fixture("amazon_run1.html"))
+    second = parser.parse_price(load_fixture("amazon_run2.html"))
+
+    assert first["price"] == second["price"] == 1499.0
+    assert first["content_hash"] == second["content_hash"]
+    # The full-page hash differs on every load
+    assert parser.compute_content_hash(load_fixture("amazon_run1.html")) != parser.compute_content_hash(
+        load_fixture("amazon_run2.html")
+    )
+
+
+def test_fingerprint_changes_with_price():
+    parser = AmazonParser()
+    before = parser.parse_price(load_fixture("amazon_run1.html"))
+    after = parser.parse_price(load_fixture("amazon_price_drop.html"))
+
+    assert after["price"] == 1299.0
+    assert before["content_hash"] != after["content_hash"]
+
+
+def test_fingerprint_changes_with_availability_at_same_price():
+    parser = FlipkartParser()
+    in_stock = parser.parse_price(load_fixture("flipkart_run1.html"))
+    repeat = parser.parse_price(load_fixture("flipkart_run2.html"))
+    sold_out = parser.parse_price(load_fixture("flipkart_out_of_stock.html"))
+
+    assert in_stock["price"] == sold_out["price"] == 17999.0
+    assert in_stock["content_hash"] == repeat["content_hash"]
+    assert in_stock["content_hash"] != sold_out["content_hash"]
+
+
+def test_parsed_document_is_shared_across_stages():
+    parser = AmazonParser()
+    html = load_fixture("amazon_run1.html")
+    doc = ParsedDocument(html)
+
+    assert not parser.detect_captcha(doc)
+    result = parser.parse_price(doc)
+    soup = doc.soup
+
+    # Same results as parsing the raw HTML, from one tree
+    assert result == parser.parse_price(html)
+    assert parser.parse_price(doc)["content_hash"] == result["content_hash"]
+    assert doc.soup is soup
+    assert parser.compute_content_hash(doc) == hashlib.sha256(html.encode()).hexdigest()[:16]
+
+
+def test_detect_captcha_is_case_insensitive():
+    parser = GenericParser()
+
+    assert parser.detect_captcha("<div class='g-recaptcha'></div>")
+    assert parser.detect_captcha(ParsedDocument("<h1>Verify You Are Human – ₹</h1>"))
+    assert not parser.detect_captcha(ParsedDocument("<span class='price'>₹499</span>"))
+
+
+def test_json_ld_skips_malformed_blocks():
+    doc = ParsedDocument(
+        '<script type="application/ld+json">{not json</script>'
+        '<script type="application/ld+json">{"offers": {"price": "799"}}</script>'
+    )
+
+    assert doc.json_ld == [{"offers": {"price": "799"}}]
+    assert AmazonParser().parse_price(doc)["price"] == 799.0
+
+
+def soup_only(html: str) -> ParsedDocument:
+    doc = ParsedDocument(html)
+    doc.__dict__["tree"] = None
+    return doc
+
+
+def test_css_selectors_compile_to_xpath():
+    assert css_to_xpath("#productTitle") == '//*[@id="productTitle"]'
+    assert css_to_xpath("[itemprop=price]") == '//*[@itemprop="price"]'
+    assert css_to_xpath('meta[property="product:price:amount"]') == '//meta[@property="product:price:amount"]'
+    assert css_to_xpath("div > span.a") == (
+        '//div/span[contains(concat(" ", normalize-space(@class), " "), " a ")]'
+    )
+    # Left to soupsieve
+    assert css_to_xpath("a:hover") is None
+    assert css_to_xpath("a ~ b") is None
+
+
+def test_compiled_plans_match_beautifulsoup_on_fixtures():
+    pages = [
+        (AmazonParser(), "amazon_run1.html"),
+        (AmazonParser(), "amazon_price_drop.html"),
+        (FlipkartParser(), "flipkart_run1.html"),
+        (FlipkartParser(), "flipkart_out_of_stock.html"),
+        (GenericParser(), "amazon_run1.html"),
+    ]
+    for parser, name in pages:
+        html = load_fixture(name)
+        fast = parser.parse_price(ParsedDocument(html))
+        slow = parser.parse_price(soup_only(html))
+        # Same price, strategy and fingerprint, so stored hashes stay comparable
+        assert fast == slow, name
+
+
+def test_plan_strategies_keep_their_order():
+    html = """
+    <meta property="product:price:amount" content="450">
+    <script type="application/ld+json">{"offers": {"price": "399"}}</script>
+    <span class="a-price-whole">not a price</span>
+    """
+    parser = AmazonParser()
+
+    result = parser.parse_price(ParsedDocument(html))
+
+    assert result["price"] == 399.0
+    assert result["method"] == "json_ld"
+    assert result == parser.parse_price(soup_only(html))
+
+
+def test_unparseable_page_falls_back_to_beautifulsoup():
+    doc = ParsedDocument("")
+
+    assert doc.tree is None
+    assert AmazonParser().parse_price(doc) is None
+
+
+def test_unsupported_selector_disables_plan():
+    plan = PricePlan([PriceStrategy("css_selector", ".price"), PriceStrategy("odd", "span:first-child")])
+
+    assert not plan.compiled
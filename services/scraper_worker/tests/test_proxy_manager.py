@@ -1,6 +1,40 @@
+import asyncio
+from collections import deque
+from unittest.mock import AsyncMock, MagicMock
+
 import pytest
 
-from services.scraper_worker.proxy_manager import ProxyManager
+from services.scraper_worker.proxy_manager import CHANGES_KEY, ProxyManager, health_key
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class FakePipeline:
+    def __init__(self, results):
+        self.calls = []
+        self.results = results
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args))
+
+    async def execute(self):
+        return self.results
+
+
+def make_redis(changed=(), states=()):
+    client = MagicMock()
+    client.register_script.return_value = AsyncMock(return_value=0)
+    client.zrangebyscore = AsyncMock(return_value=list(changed))
+    client.pipeline.return_value = FakePipeline(list(states))
+    return client
 
 
 def test_proxy_manager_health_stats():
@@ -16,4 +50,187 @@ def test_proxy_manager_health_stats():
     assert stats2["total"] == 2
 
 
+def test_get_proxy_prefers_fast_reliable_proxies():
+    proxies = [f"http://proxy{i}" for i in range(10)]
+    mgr = ProxyManager(proxies)
+    for proxy in proxies:
+        mgr.mark_success(proxy, "amazon.in", latency_ms=5000)
+    mgr.mark_success("http://proxy0", "amazon.in", latency_ms=200)
+
+    picks = [mgr.get_proxy("amazon.in") for _ in range(2000)]
+
+    # Power of two choices: the best proxy wins whenever it is sampled (~20%)
+    share = picks.count("http://proxy0") / len(picks)
+    assert 0.15 < share < 0.25
+    # The other nine split the rest (~9% each)
+    assert share > 1.5 * max(picks.count(p) for p in proxies[1:]) / len(picks)
+
+
+def test_latency_and_success_are_exponentially_weighted():
+    mgr = ProxyManager(["http://proxy1"], alpha=0.5)
+
+    mgr.mark_success("http://proxy1", "amazon.in", latency_ms=1000)
+    mgr.mark_success("http://proxy1", "amazon.in", latency_ms=2000)
+    mgr.mark_failure("http://proxy1", "timeout", "amazon.in", latency_ms=3000)
+
+    stats = mgr._domain_health[("http://proxy1", "amazon.in")]
+    assert stats.latency_ms == 2250
+    assert stats.success_rate == 0.5
+
+
+def test_block_only_affects_that_domain():
+    mgr = ProxyManager(["http://proxy1", "http://proxy2"])
+    for _ in range(3):
+        mgr.record_response("http://proxy1", "amazon.in", 429, 100)
+
+    assert mgr.score("http://proxy1", "amazon.in") == 0
+    assert mgr.score("http://proxy1", "flipkart.com") > 0
+    assert all(mgr.get_proxy("amazon.in") == "http://proxy2" for _ in range(50))
+    assert mgr.get_health_stats()["healthy"] == 2
+
+
+def test_proxies_blocked_for_a_domain_are_never_returned_for_it():
+    mgr = ProxyManager(["http://proxy1", "http://proxy2", "http://proxy3"])
+    for proxy in ("http://proxy1", "http://proxy2"):
+        for _ in range(3):
+            mgr.record_response(proxy, "amazon.in", 429, 100)
+
+    assert {mgr.get_proxy("amazon.in") for _ in range(100)} == {"http://proxy3"}
+
+    for _ in range(3):
+        mgr.record_response("http://proxy3", "amazon.in", 429, 100)
+    assert mgr.get_proxy("amazon.in") is None
+    assert mgr.get_proxy("flipkart.com") is not None
+
+
+def test_excluded_proxy_is_only_returned_when_nothing_else_is_left():
+    mgr = ProxyManager(["http://proxy1", "http://proxy2"])
+
+    assert {mgr.get_proxy("amazon.in", exclude="http://proxy1") for _ in range(50)} == {"http://proxy2"}
+    assert ProxyManager(["http://proxy1"]).get_proxy("amazon.in", exclude="http://proxy1") == "http://proxy1"
+
+
+def test_transport_failures_quarantine_proxy_until_recovery(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("services.scraper_worker.proxy_manager.time.time", lambda: now[0])
+    proxies = ["http://proxy1", "http://proxy2", "http://proxy3"]
+    mgr = ProxyManager(proxies)
+
+    for _ in range(3):
+        mgr.mark_failure("http://proxy2", "connect timeout")
+
+    assert mgr.get_health_stats() == {"total": 3, "healthy": 2, "degraded": 1, "blocked": {}}
+    assert "http://proxy2" not in {mgr.get_proxy() for _ in range(100)}
+    assert sorted(mgr._available) == ["http://proxy1", "http://proxy3"]
+
+    now[0] += mgr._recovery_time + 1
+    assert mgr.get_health_stats()["healthy"] == 3
+    assert "http://proxy2" in {mgr.get_proxy() for _ in range(100)}
+    # Probation: a single failure sends it straight back
+    mgr.mark_failure("http://proxy2", "connect timeout")
+    assert mgr.get_health_stats()["healthy"] == 2
+
+
+def test_passing_probe_only_lifts_quarantines_from_failed_probes():
+    mgr = ProxyManager(["http://proxy1", "http://proxy2", "http://proxy3"])
+    for _ in range(3):
+        mgr.mark_failure("http://proxy1", "connect timeout")
+        mgr.mark_probe_failure("http://proxy2", "connection refused")
+    mgr.mark_failure("http://proxy3", "connect timeout")
+
+    for proxy in ("http://proxy1", "http://proxy2", "http://proxy3"):
+        mgr.mark_probe_success(proxy)
+
+    assert sorted(mgr._available) == ["http://proxy2", "http://proxy3"]
+    assert mgr._health["http://proxy1"].quarantined_until > 0
+    assert mgr._health["http://proxy2"].failures == mgr._bad_threshold - 1
+    # Probes never work off failures from real traffic
+    assert mgr._health["http://proxy3"].failures == 1
+
+
+def test_all_quarantined_falls_back_to_any_proxy():
+    mgr = ProxyManager(["http://proxy1"])
+    for _ in range(3):
+        mgr.mark_failure("http://proxy1")
+
+    assert mgr.get_proxy("amazon.in") == "http://proxy1"
+
+
+def test_sync_writes_queued_events_in_one_script_call():
+    client = make_redis()
+    mgr = ProxyManager(["http://proxy1", "http://proxy2"], redis_client=client)
+
+    mgr.mark_success("http://proxy1", "amazon.in", latency_ms=250)
+    mgr.mark_blocked("http://proxy2", "amazon.in")
+    run(mgr.sync())
+
+    script = client.register_script.return_value
+    script.assert_awaited_once()
+    kwargs = script.await_args.kwargs
+    assert kwargs["keys"] == [
+        CHANGES_KEY,
+        health_key("http://proxy1"),
+        health_key("http://proxy1"),
+        health_key("http://proxy2"),
+    ]
+    assert kwargs["args"][4:] == [
+        "http://proxy1", "*", "ok", 250,
+        "http://proxy1", "amazon.in", "ok", 250,
+        "http://proxy2", "amazon.in", "fail", "",
+    ]
+    assert not mgr._pending
+
+
+def test_sync_loads_bans_from_other_replicas(monkeypatch):
+    monkeypatch.setattr("services.scraper_worker.proxy_manager.time.time", lambda: 1000.0)
+    client = make_redis(
+        changed=[("http://proxy2", 999_000.0), ("http://unknown", 999_000.0)],
+        states=[{
+            "*:f": "3", "*:lf": "999000", "*:ls": "0", "*:sr": "0.4", "*:q": "1300000", "*:lat": "800",
+            "amazon.in:f": "3", "amazon.in:sr": "0.2", "amazon.in:q": "1300000",
+        }],
+    )
+    mgr = ProxyManager(["http://proxy1", "http://proxy2"], redis_client=client)
+
+    run(mgr.sync())
+
+    assert mgr.get_health_stats() == {
+        "total": 2, "healthy": 1, "degraded": 1, "blocked": {"amazon.in": 1},
+    }
+    assert mgr._health["http://proxy2"].latency_ms == 800
+    assert all(mgr.get_proxy() == "http://proxy1" for _ in range(20))
+    # Only changed proxies we know are read, and the next sync starts from there
+    assert len(client.pipeline.return_value.calls) == 1
+    assert mgr._synced_ms == 999_000
+
+
+def test_failed_sync_keeps_events_for_next_time():
+    client = make_redis()
+    client.register_script.return_value = AsyncMock(side_effect=ConnectionError("down"))
+    mgr = ProxyManager(["http://proxy1"], redis_client=client)
+
+    mgr.mark_failure("http://proxy1", "timeout")
+    run(mgr.sync())
+
+    assert len(mgr._pending) == 1
+    # Local view is unaffected by Redis being down
+    assert mgr._health["http://proxy1"].failures == 1
+
+
+def test_failed_sync_drops_the_oldest_events_when_the_queue_is_full():
+    client = make_redis()
+    mgr = ProxyManager(["http://proxy1"], redis_client=client)
+    mgr._pending = deque(maxlen=3)
+
+    async def down(**kwargs):
+        # Events recorded while the write is in flight
+        mgr.mark_success("http://proxy1", latency_ms=100)
+        mgr.mark_success("http://proxy1", latency_ms=200)
+        raise ConnectionError("down")
+
+    client.register_script.return_value.side_effect = down
+    mgr.mark_failure("http://proxy1", "timeout")
+    mgr.mark_failure("http://proxy1", "refused")
+    run(mgr.sync())
 
+    assert [(kind, latency) for _, _, kind, latency in mgr._pending] == [("fail", None), ("ok", 100), ("ok", 200)]
@@ -0,0 +1,79 @@
+import asyncio
+
+import httpx
+
+from services.scraper_worker.proxy_manager import ProxyManager
+from services.scraper_worker.proxy_prober import ProxyProber
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def stand_in(handler):
+    """Client factory routing every proxy's probe to a local handler."""
+    def factory(proxy):
+        async def routed(request):
+            return await handler(proxy, request)
+        return httpx.AsyncClient(transport=httpx.MockTransport(routed))
+    return factory
+
+
+def test_probe_all_is_bounded_in_concurrency():
+    proxies = [f"http://proxy{i}" for i in range(12)]
+    mgr = ProxyManager(proxies)
+    in_flight = {"now": 0, "max": 0}
+
+    async def handler(proxy, request):
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+        return httpx.Response(204)
+
+    prober = ProxyProber(mgr, url="http://probe.local/204", concurrency=3, client_factory=stand_in(handler))
+    results = run(prober.probe_all())
+
+    assert all(results.values()) and len(results) == 12
+    assert in_flight["max"] == 3
+
+
+def test_failed_probes_quarantine_and_a_passing_probe_restores():
+    mgr = ProxyManager(["http://good", "http://dead"])
+    state = {"dead_up": False}
+
+    async def handler(proxy, request):
+        if proxy == "http://dead" and not state["dead_up"]:
+            raise httpx.ConnectError("connection refused")
+        return httpx.Response(204)
+
+    prober = ProxyProber(mgr, url="http://probe.local/204", client_factory=stand_in(handler))
+    for _ in range(3):
+        run(prober.probe_all())
+
+    assert mgr.get_health_stats()["healthy"] == 1
+    assert all(mgr.get_proxy() == "http://good" for _ in range(20))
+
+    state["dead_up"] = True
+    run(prober.probe_all())
+
+    assert mgr.get_health_stats()["healthy"] == 2
+    # On probation: one more failure sends it back
+    assert mgr._health["http://dead"].failures == mgr._bad_threshold - 1
+    state["dead_up"] = False
+    run(prober.probe_all())
+    assert mgr.get_health_stats()["healthy"] == 1
+
+
+def test_error_status_counts_as_failed_probe():
+    mgr = ProxyManager(["http://proxy1"])
+
+    async def handler(proxy, request):
+        return httpx.Response(407)
+
+    prober = ProxyProber(mgr, url="http://probe.local/204", client_factory=stand_in(handler))
+    result = run(prober.probe("http://proxy1"))
+
+    assert result["ok"] is False
+    assert result["error"] == "HTTP 407"
+    assert "ttfb" in result
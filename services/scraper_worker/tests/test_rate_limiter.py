@@ -0,0 +1,55 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from services.scraper_worker.rate_limiter import RateLimiter
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def _limiter(script_result=0, **kwargs):
+    client = AsyncMock()
+    client.register_script = MagicMock(return_value=AsyncMock(return_value=script_result))
+    return client, RateLimiter(client, **kwargs)
+
+
+def test_acquire_checks_domain_and_proxy_buckets_in_one_call():
+    client, limiter = _limiter(rate=0.5, burst=2, proxy_rate=0.1, proxy_burst=1)
+
+    wait = run(limiter.acquire("amazon.in", "http://p1"))
+
+    assert wait == 0.0
+    client.register_script.return_value.assert_awaited_once_with(
+        keys=[
+            "rate_limit:amazon.in",
+            "rate_limit:bucket:amazon.in",
+            "rate_limit:bucket:amazon.in:http://p1",
+        ],
+        args=[0.5, 2, 0.1, 1],
+    )
+
+
+def test_acquire_returns_wait_in_seconds():
+    _, limiter = _limiter(script_result=1500)
+
+    assert run(limiter.acquire("amazon.in")) == 1.5
+
+
+def test_acquire_fails_open_when_redis_errors():
+    client, limiter = _limiter()
+    client.register_script.return_value.side_effect = ConnectionError("down")
+
+    assert run(limiter.acquire("amazon.in")) == 0.0
+
+
+def test_cooldown_never_shortens_a_longer_one():
+    client, limiter = _limiter()
+    client.pttl.return_value = 200_000
+
+    run(limiter.cooldown("amazon.in", 30))
+    client.set.assert_not_awaited()
+
+    client.pttl.return_value = -2
+    run(limiter.cooldown("amazon.in", 30))
+    client.set.assert_awaited_once_with("rate_limit:amazon.in", "1", px=30000)
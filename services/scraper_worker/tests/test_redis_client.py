@@ -0,0 +1,14 @@
+from redis.asyncio import BlockingConnectionPool
+
+from services.scraper_worker.redis_client import create_redis
+
+
+def test_create_redis_uses_bounded_blocking_pool(monkeypatch):
+    monkeypatch.setenv("REDIS_MAX_CONNECTIONS", "7")
+    client = create_redis("redis://localhost:6379/3")
+
+    pool = client.connection_pool
+    assert isinstance(pool, BlockingConnectionPool)
+    assert pool.max_connections == 7
+    assert pool.connection_kwargs["db"] == 3
+    assert pool.connection_kwargs["decode_responses"] is True
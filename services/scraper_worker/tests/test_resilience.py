@@ -0,0 +1,180 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from services.scraper_worker.adaptive_control import SiteThrottled
+from services.scraper_worker.resilience import (
+    CAPTCHA,
+    CLOSED,
+    HALF_OPEN,
+    HTTP_4XX,
+    HTTP_5XX,
+    OPEN,
+    OTHER,
+    PROXY,
+    THROTTLED,
+    TIMEOUT,
+    HttpError,
+    Resilience,
+    RetryBudget,
+    classify,
+)
+from services.scraper_worker.retry_decorator import retry_backoff
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TimeoutError(Exception):
+    """Stands in for playwright's TimeoutError, matched by name."""
+
+
+def test_classify_errors():
+    assert classify(HttpError(404)) == HTTP_4XX
+    assert classify(HttpError(502)) == HTTP_5XX
+    assert classify(SiteThrottled(429)) == THROTTLED
+    assert classify(asyncio.TimeoutError()) == TIMEOUT
+    assert classify(TimeoutError("Timeout 30000ms exceeded")) == TIMEOUT
+    assert classify(httpx.ReadTimeout("read")) == TIMEOUT
+    assert classify(httpx.ConnectError("refused")) == PROXY
+    assert classify(Exception("page.goto: net::ERR_TUNNEL_CONNECTION_FAILED")) == PROXY
+    assert classify(Exception("page.goto: net::ERR_TIMED_OUT")) == TIMEOUT
+    assert classify(ValueError("boom")) == OTHER
+
+
+def test_retry_budget_caps_retries_to_share_of_requests():
+    clock = Clock()
+    budget = RetryBudget(ratio=0.1, min_retries=2, window=60, clock=clock)
+    for _ in range(50):
+        budget.record_request()
+
+    assert sum(budget.try_retry() for _ in range(10)) == 5
+
+    # Spent retries age out of the window with the requests
+    clock.now += 61
+    assert sum(budget.try_retry() for _ in range(10)) == 2
+
+
+def test_retry_backoff_retries_only_retryable_errors():
+    budget = RetryBudget(ratio=1.0, min_retries=10, window=60)
+    calls = []
+
+    @retry_backoff(max_attempts=3, budget=budget)
+    async def fetch(exc):
+        calls.append(exc)
+        raise exc
+
+    with patch("services.scraper_worker.retry_decorator.asyncio.sleep", new=AsyncMock()):
+        with pytest.raises(HttpError):
+            run(fetch(HttpError(404)))
+        assert len(calls) == 1
+
+        calls.clear()
+        with pytest.raises(HttpError):
+            run(fetch(HttpError(502)))
+        assert len(calls) == 3
+
+
+def test_retry_backoff_stops_when_budget_is_spent():
+    budget = RetryBudget(ratio=0, min_retries=1, window=60)
+    attempts = []
+
+    @retry_backoff(max_attempts=5, budget=budget)
+    async def fetch():
+        attempts.append(1)
+        raise asyncio.TimeoutError()
+
+    with patch("services.scraper_worker.retry_decorator.asyncio.sleep", new=AsyncMock()):
+        with pytest.raises(asyncio.TimeoutError):
+            run(fetch())
+
+    assert len(attempts) == 2
+
+
+def test_retry_backoff_returns_after_transient_failure():
+    attempts = []
+
+    @retry_backoff(max_attempts=3, budget=RetryBudget(min_retries=5))
+    async def fetch():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise httpx.ConnectError("reset")
+        return "ok"
+
+    with patch("services.scraper_worker.retry_decorator.asyncio.sleep", new=AsyncMock()):
+        assert run(fetch()) == "ok"
+
+
+def test_breaker_opens_after_consecutive_site_failures():
+    clock = Clock()
+    res = Resilience(failure_threshold=3, open_seconds=60, max_open_seconds=600, clock=clock)
+
+    assert res.record("amazon.in", TIMEOUT) is False
+    res.record("amazon.in")  # success resets the streak
+    res.record("amazon.in", TIMEOUT)
+    res.record("amazon.in", CAPTCHA)
+    assert res.state("amazon.in") == CLOSED
+    assert res.record("amazon.in", HTTP_5XX) is True
+
+    assert res.state("amazon.in") == OPEN
+    assert res.allow("amazon.in") == 60
+    assert res.allow("flipkart.com") == 0
+
+
+def test_proxy_and_4xx_errors_do_not_open_breaker():
+    res = Resilience(failure_threshold=2, open_seconds=60, max_open_seconds=600, clock=Clock())
+
+    for _ in range(5):
+        res.record("amazon.in", PROXY)
+        res.record("amazon.in", HTTP_4XX)
+
+    assert res.state("amazon.in") == CLOSED
+
+
+def test_half_open_admits_one_trial_then_closes_or_reopens():
+    clock = Clock()
+    res = Resilience(failure_threshold=1, open_seconds=60, max_open_seconds=100, clock=clock)
+    res.record("amazon.in", TIMEOUT)
+
+    clock.now += 60
+    assert res.allow("amazon.in") == 0
+    assert res.state("amazon.in") == HALF_OPEN
+    # Only one trial at a time
+    assert res.allow("amazon.in") > 0
+
+    # Failed trial: open again for twice as long, capped
+    res.record("amazon.in", TIMEOUT)
+    assert res.state("amazon.in") == OPEN
+    assert res.allow("amazon.in") == 100
+
+    clock.now += 100
+    assert res.allow("amazon.in") == 0
+    res.record("amazon.in")
+    assert res.state("amazon.in") == CLOSED
+    assert res.allow("amazon.in") == 0
+
+
+def test_released_or_lost_trial_lets_another_through():
+    clock = Clock()
+    res = Resilience(failure_threshold=1, open_seconds=60, max_open_seconds=600, clock=clock)
+    res.record("amazon.in", TIMEOUT)
+    clock.now += 60
+
+    assert res.allow("amazon.in") == 0
+    res.release("amazon.in")
+    assert res.allow("amazon.in") == 0
+
+    # A trial that never reports back is given up on
+    clock.now += 60
+    assert res.allow("amazon.in") == 0
@@ -0,0 +1,165 @@
+import asyncio
+
+from services.scraper_worker.scrape_executor import ScrapeExecutor
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def _targets(domain_counts):
+    targets = []
+    for domain, count in domain_counts.items():
+        for i in range(count):
+            targets.append({"id": f"{domain}-{i}", "domain": domain})
+    return targets
+
+
+def test_executor_runs_domains_in_parallel_within_limits():
+    executor = ScrapeExecutor(max_concurrency=3, domain_concurrency=1, domain_delay=0.0)
+    active = {}
+    peak = {"global": 0}
+    per_domain_peak = {}
+
+    async def scrape(target):
+        domain = target["domain"]
+        active[domain] = active.get(domain, 0) + 1
+        per_domain_peak[domain] = max(per_domain_peak.get(domain, 0), active[domain])
+        peak["global"] = max(peak["global"], sum(active.values()))
+        await asyncio.sleep(0.01)
+        active[domain] -= 1
+
+    targets = _targets({"amazon.in": 3, "flipkart.com": 3, "example.com": 3})
+    dispatched = run(executor.run(targets, scrape))
+
+    assert dispatched == 9
+    assert peak["global"] == 3
+    assert all(v == 1 for v in per_domain_peak.values())
+
+
+def test_executor_spaces_requests_to_same_domain():
+    executor = ScrapeExecutor(max_concurrency=4, domain_concurrency=1, domain_delay=0.05)
+    starts = []
+
+    async def scrape(target):
+        starts.append(asyncio.get_running_loop().time())
+
+    run(executor.run(_targets({"amazon.in": 3}), scrape))
+
+    gaps = [b - a for a, b in zip(starts, starts[1:])]
+    assert len(starts) == 3
+    assert all(gap >= 0.045 for gap in gaps)
+
+
+def test_executor_survives_failing_scrapes():
+    executor = ScrapeExecutor(max_concurrency=2, domain_concurrency=1, domain_delay=0.0)
+    seen = []
+
+    async def scrape(target):
+        seen.append(target["id"])
+        if target["id"].endswith("0"):
+            raise RuntimeError("boom")
+
+    dispatched = run(executor.run(_targets({"a.com": 2, "b.com": 2}), scrape))
+
+    assert dispatched == 4
+    assert len(seen) == 4
+
+
+def test_gate_defers_throttled_domain_and_runs_others_first():
+    waits = {"slow.com": [0.05, 0.0], "fast.com": [0.0, 0.0]}
+
+    async def gate(target):
+        return waits[target["domain"]].pop(0)
+
+    executor = ScrapeExecutor(max_concurrency=2, domain_concurrency=1, domain_delay=0.0, gate=gate)
+    order = []
+
+    async def scrape(target):
+        order.append(target["domain"])
+
+    dispatched = run(executor.run(_targets({"slow.com": 1, "fast.com": 2}), scrape))
+
+    assert dispatched == 3
+    assert order == ["fast.com", "fast.com", "slow.com"]
+
+
+def test_gate_wait_beyond_max_defer_skips_domain_for_the_round():
+    async def gate(target):
+        return 300.0 if target["domain"] == "blocked.com" else 0.0
+
+    executor = ScrapeExecutor(max_concurrency=2, domain_delay=0.0, gate=gate, max_defer=60)
+    scraped, skipped = [], []
+
+    async def scrape(target):
+        scraped.append(target["id"])
+
+    async def on_skip(target):
+        skipped.append(target["id"])
+
+    dispatched = run(executor.run(_targets({"blocked.com": 2, "ok.com": 1}), scrape, on_skip=on_skip))
+
+    assert dispatched == 1
+    assert scraped == ["ok.com-0"]
+    assert skipped == ["blocked.com-0", "blocked.com-1"]
+
+
+def test_executor_waits_instead_of_spinning_while_every_domain_is_at_its_limit(monkeypatch):
+    monkeypatch.setattr("services.scraper_worker.scrape_executor.IDLE_POLL_SECONDS", 0.01)
+
+    class Controller:
+        """No slots for the first 50ms, then one."""
+
+        def __init__(self):
+            self.calls = 0
+            self.opens_at = None
+
+        def concurrency(self, domain):
+            self.calls += 1
+            loop = asyncio.get_running_loop()
+            if self.opens_at is None:
+                self.opens_at = loop.time() + 0.05
+            return 1 if loop.time() >= self.opens_at else 0
+
+    controller = Controller()
+    executor = ScrapeExecutor(max_concurrency=2, domain_delay=0.0, controller=controller)
+    scraped = []
+
+    async def scrape(target):
+        scraped.append(target["id"])
+
+    assert run(executor.run(_targets({"amazon.in": 1}), scrape)) == 1
+    assert scraped == ["amazon.in-0"]
+    assert controller.calls < 100
+
+
+def test_refill_reuses_freed_slots_while_a_slow_scrape_runs():
+    executor = ScrapeExecutor(max_concurrency=2, domain_concurrency=1, domain_delay=0.0)
+    feed = [{"id": "slow", "domain": "amazon.in"}] + _targets({"flipkart.com": 6})
+    asked = []
+    finished = []
+
+    async def refill(count):
+        asked.append(count)
+        batch, feed[:] = feed[:count], feed[count:]
+        if not batch:
+            await asyncio.sleep(0.01)
+        return batch
+
+    async def scrape(target):
+        await asyncio.sleep(0.2 if target["id"] == "slow" else 0.01)
+        finished.append(target["id"])
+
+    async def go():
+        task = asyncio.create_task(executor.run([], scrape, refill=refill))
+        while "slow" not in finished:
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    run(go())
+
+    # Everything claimed after the slow scrape started still ran before it ended
+    assert finished[-1] == "slow"
+    assert len(finished) == 7
+    # Never more than the backlog held at once
+    assert asked[0] == executor.backlog and max(asked) <= executor.backlog
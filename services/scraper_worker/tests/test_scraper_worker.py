@@ -1,6 +1,7 @@
 import asyncio
 from unittest.mock import MagicMock, AsyncMock, patch
 
+from services.scraper_worker.job_queue import Job
 from services.scraper_worker.main import ScraperWorker
 
 
@@ -9,15 +10,77 @@ def run(coro):
     return asyncio.run(coro)
 
 
-@patch("services.scraper_worker.main.redis.from_url")
-@patch("services.scraper_worker.main.DBManager")
+def scrape_and_flush(worker, target):
+    async def _go():
+        await worker.scrape_target(target)
+        await worker.writer.flush()
+
+    run(_go())
+
+
+def saved_rows(mock_db):
+    return [row for call in mock_db.save_price_history_batch.await_args_list for row in call.args[0]]
+
+
+def job_updates(mock_db):
+    return [u for call in mock_db.update_scrape_jobs_batch.await_args_list for u in call.args[0]]
+
+
+class FakePipeline:
+    def __init__(self):
+        self.calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append(name)
+
+    async def execute(self):
+        return []
+
+
+def make_redis():
+    mock_redis = AsyncMock()
+    mock_redis.pttl.return_value = -2
+    mock_redis.get.return_value = None
+    # No idle browser sessions; check-ins go through a pipeline
+    mock_redis.lpop.return_value = None
+    mock_redis.pipeline = MagicMock(side_effect=lambda **kwargs: FakePipeline())
+    # Token bucket admits immediately (0 ms wait); AIMD keeps rate/concurrency
+    mock_redis.bucket = AsyncMock(return_value=0)
+    mock_redis.aimd = AsyncMock(return_value=["0.2", "1", 0])
+    mock_redis.register_script = MagicMock(
+        side_effect=lambda source: mock_redis.aimd if "max_error_ratio" in source else mock_redis.bucket
+    )
+    return mock_redis
+
+
+def aimd_events(mock_redis):
+    return [call.kwargs["args"][0] for call in mock_redis.aimd.await_args_list]
+
+
+def _failing_http(mock_http_cls):
+    # HTTP tier unusable → worker falls back to the browser driver
+    mock_http = MagicMock()
+    mock_http.fetch_page = AsyncMock(side_effect=RuntimeError("blocked"))
+    mock_http_cls.return_value = mock_http
+    return mock_http
+
+
+@patch("services.scraper_worker.main.HttpFetcher")
+@patch("services.scraper_worker.main.create_redis")
+@patch("services.scraper_worker.main.AsyncDBManager")
 @patch("services.scraper_worker.main.AlertManager")
 @patch("services.scraper_worker.main.PlaywrightDriver")
-def test_scrape_target_success(mock_driver_cls, mock_alert_cls, mock_db_cls, mock_redis_from_url):
+def test_scrape_target_success(mock_driver_cls, mock_alert_cls, mock_db_cls, mock_create_redis, mock_http_cls):
     # Arrange
-    mock_redis = MagicMock()
-    mock_redis.exists.return_value = False
-    mock_redis_from_url.return_value = mock_redis
+    _failing_http(mock_http_cls)
+    mock_redis = make_redis()
+    mock_create_redis.return_value = mock_redis
 
     mock_driver = MagicMock()
     mock_driver.fetch_page = AsyncMock(
@@ -32,7 +95,7 @@ def test_scrape_target_success(mock_driver_cls, mock_alert_cls, mock_db_cls, moc
     )
     mock_driver_cls.return_value = mock_driver
 
-    mock_db = MagicMock()
+    mock_db = AsyncMock()
     mock_db.get_latest_price.return_value = None  # no prior price → no alert
     mock_db_cls.return_value = mock_db
 
@@ -57,23 +120,25 @@ def test_scrape_target_success(mock_driver_cls, mock_alert_cls, mock_db_cls, moc
     target = {"id": "t1", "domain": "amazon.in", "url": "https://example.com"}
 
     # Act
-    run(worker.scrape_target(target))
+    scrape_and_flush(worker, target)
 
     # Assert
-    mock_db.save_price_history.assert_called_once()
-    mock_db.update_scrape_job.assert_called_with("t1", "success")
+    assert len(saved_rows(mock_db)) == 1
+    assert job_updates(mock_db) == [("t1", "success", None)]
     mock_alerts.alert_price_drop.assert_not_called()
-    mock_redis.setex.assert_any_call("rate_limit:amazon.in", 5, "1")
+    mock_redis.bucket.assert_awaited_once()
+    assert aimd_events(mock_redis) == ["success"]
 
 
-@patch("services.scraper_worker.main.redis.from_url")
-@patch("services.scraper_worker.main.DBManager")
+@patch("services.scraper_worker.main.HttpFetcher")
+@patch("services.scraper_worker.main.create_redis")
+@patch("services.scraper_worker.main.AsyncDBManager")
 @patch("services.scraper_worker.main.AlertManager")
 @patch("services.scraper_worker.main.PlaywrightDriver")
-def test_scrape_target_captcha_path(mock_driver_cls, mock_alert_cls, mock_db_cls, mock_redis_from_url):
-    mock_redis = MagicMock()
-    mock_redis.exists.return_value = False
-    mock_redis_from_url.return_value = mock_redis
+def test_scrape_target_captcha_path(mock_driver_cls, mock_alert_cls, mock_db_cls, mock_create_redis, mock_http_cls):
+    _failing_http(mock_http_cls)
+    mock_redis = make_redis()
+    mock_create_redis.return_value = mock_redis
 
     mock_driver = MagicMock()
     mock_driver.fetch_page = AsyncMock(
@@ -88,7 +153,7 @@ def test_scrape_target_captcha_path(mock_driver_cls, mock_alert_cls, mock_db_cls
     )
     mock_driver_cls.return_value = mock_driver
 
-    mock_db = MagicMock()
+    mock_db = AsyncMock()
     mock_db_cls.return_value = mock_db
 
     mock_alerts = MagicMock()
@@ -110,27 +175,29 @@ def test_scrape_target_captcha_path(mock_driver_cls, mock_alert_cls, mock_db_cls
 
     target = {"id": "t2", "domain": "amazon.in", "url": "https://example.com"}
 
-    run(worker.scrape_target(target))
+    scrape_and_flush(worker, target)
 
     mock_alerts.alert_captcha_encounter.assert_called_once()
-    mock_db.update_scrape_job.assert_called_with("t2", "captcha", "CAPTCHA encountered")
-    mock_redis.setex.assert_any_call("rate_limit:amazon.in", 300, "1")
+    assert job_updates(mock_db) == [("t2", "captcha", "CAPTCHA encountered")]
+    assert saved_rows(mock_db) == []
+    assert aimd_events(mock_redis) == ["throttle"]
 
 
-@patch("services.scraper_worker.main.redis.from_url")
-@patch("services.scraper_worker.main.DBManager")
+@patch("services.scraper_worker.main.HttpFetcher")
+@patch("services.scraper_worker.main.create_redis")
+@patch("services.scraper_worker.main.AsyncDBManager")
 @patch("services.scraper_worker.main.AlertManager")
 @patch("services.scraper_worker.main.PlaywrightDriver")
-def test_scrape_target_driver_error_sets_failure(mock_driver_cls, mock_alert_cls, mock_db_cls, mock_redis_from_url):
-    mock_redis = MagicMock()
-    mock_redis.exists.return_value = False
-    mock_redis_from_url.return_value = mock_redis
+def test_scrape_target_driver_error_sets_failure(mock_driver_cls, mock_alert_cls, mock_db_cls, mock_create_redis, mock_http_cls):
+    _failing_http(mock_http_cls)
+    mock_redis = make_redis()
+    mock_create_redis.return_value = mock_redis
 
     mock_driver = MagicMock()
     mock_driver.fetch_page = AsyncMock(side_effect=RuntimeError("network error"))
     mock_driver_cls.return_value = mock_driver
 
-    mock_db = MagicMock()
+    mock_db = AsyncMock()
     mock_db_cls.return_value = mock_db
 
     mock_alerts = MagicMock()
@@ -152,13 +219,364 @@ def test_scrape_target_driver_error_sets_failure(mock_driver_cls, mock_alert_cls
 
     target = {"id": "t3", "domain": "amazon.in", "url": "https://example.com"}
 
-    run(worker.scrape_target(target))
+    scrape_and_flush(worker, target)
 
     # Failure path should mark job as failed and set a longer rate limit
-    mock_db.update_scrape_job.assert_called()
-    status_args = mock_db.update_scrape_job.call_args[0]
+    updates = job_updates(mock_db)
+    assert len(updates) == 1
+    status_args = updates[0]
     assert status_args[0] == "t3"
     assert status_args[1] == "failed"
-    mock_redis.setex.assert_any_call("rate_limit:amazon.in", 30, "1")
+    assert aimd_events(mock_redis) == ["error"]
+
+
+@patch("services.scraper_worker.main.HttpFetcher")
+@patch("services.scraper_worker.main.create_redis")
+@patch("services.scraper_worker.main.AsyncDBManager")
+@patch("services.scraper_worker.main.AlertManager")
+@patch("services.scraper_worker.main.PlaywrightDriver")
+def test_scrape_target_http_tier_skips_browser(mock_driver_cls, mock_alert_cls, mock_db_cls, mock_create_redis, mock_http_cls):
+    mock_redis = make_redis()
+    mock_create_redis.return_value = mock_redis
+
+    page = "<html><body>" + "<p>static</p>" * 100 + "<span class='a-price-whole'>1,999</span></body></html>"
+    mock_http = MagicMock()
+    mock_http.fetch_page = AsyncMock(
+        return_value={
+            "status": 200,
+            "html": page,
+            "screenshot": None,
+            "proxy": None,
+            "user_agent": "UA",
+            "response_time_ms": 80,
+            "tier": "http",
+        }
+    )
+    mock_http_cls.return_value = mock_http
+
+    mock_driver = MagicMock()
+    mock_driver.fetch_page = AsyncMock()
+    mock_driver_cls.return_value = mock_driver
+
+    mock_db = AsyncMock()
+    mock_db.get_latest_price.return_value = None
+    mock_db_cls.return_value = mock_db
+
+    worker = ScraperWorker()
+    scrape_and_flush(worker, {"id": "t4", "domain": "amazon.in", "url": "https://example.com"})
 
+    mock_driver.fetch_page.assert_not_called()
+    assert [row["price"] for row in saved_rows(mock_db)] == [1999.0]
+    assert job_updates(mock_db) == [("t4", "success", None)]
 
+
+@patch("services.scraper_worker.main.HttpFetcher")
+@patch("services.scraper_worker.main.create_redis")
+@patch("services.scraper_worker.main.AsyncDBManager")
+@patch("services.scraper_worker.main.AlertManager")
+@patch("services.scraper_worker.main.PlaywrightDriver")
+def test_scrape_target_js_shell_falls_back_to_browser(mock_driver_cls, mock_alert_cls, mock_db_cls, mock_create_redis, mock_http_cls):
+    mock_redis = make_redis()
+    mock_create_redis.return_value = mock_redis
+
+    mock_http = MagicMock()
+    mock_http.fetch_page = AsyncMock(
+        return_value={
+            "status": 200,
+            "html": "<html><body><div id=\"root\"></div></body></html>",
+            "screenshot": None,
+            "proxy": None,
+            "user_agent": "UA",
+            "response_time_ms": 50,
+            "tier": "http",
+        }
+    )
+    mock_http_cls.return_value = mock_http
+
+    mock_driver = MagicMock()
+    mock_driver.fetch_page = AsyncMock(
+        return_value={
+            "status": 200,
+            "html": "<span class='a-price-whole'>2,499</span>",
+            "screenshot": None,
+            "proxy": "http://proxy",
+            "user_agent": "UA",
+            "response_time_ms": 900,
+        }
+    )
+    mock_driver_cls.return_value = mock_driver
+
+    mock_db = AsyncMock()
+    mock_db.get_latest_price.return_value = None
+    mock_db_cls.return_value = mock_db
+
+    worker = ScraperWorker()
+    scrape_and_flush(worker, {"id": "t5", "domain": "amazon.in", "url": "https://example.com"})
+
+    mock_driver.fetch_page.assert_awaited_once()
+    assert [row["price"] for row in saved_rows(mock_db)] == [2499.0]
+
+
+@patch("services.scraper_worker.main.HttpFetcher")
+@patch("services.scraper_worker.main.create_redis")
+@patch("services.scraper_worker.main.AsyncDBManager")
+@patch("services.scraper_worker.main.AlertManager")
+@patch("services.scraper_worker.main.PlaywrightDriver")
+def test_unchanged_price_records_observation_instead_of_row(mock_driver_cls, mock_alert_cls, mock_db_cls, mock_create_redis, mock_http_cls):
+    _failing_http(mock_http_cls)
+    mock_redis = make_redis()
+    mock_create_redis.return_value = mock_redis
+
+    mock_driver = MagicMock()
+    mock_driver.fetch_page = AsyncMock(
+        return_value={
+            "status": 200,
+            "html": "<span class='a-price-whole'>1,999</span>",
+            "screenshot": None,
+            "proxy": "http://proxy",
+            "user_agent": "UA",
+            "response_time_ms": 123,
+        }
+    )
+    mock_driver_cls.return_value = mock_driver
+
+    mock_db = AsyncMock()
+    mock_db.get_latest_price.return_value = None
+    mock_db_cls.return_value = mock_db
+
+    worker = ScraperWorker()
+    target = {"id": "t6", "domain": "amazon.in", "url": "https://example.com"}
+
+    async def scrape_twice():
+        await worker.scrape_target(target)
+        await worker.scrape_target(target)
+        await worker.writer.flush()
+
+    run(scrape_twice())
+
+    # First sighting stores a row, the repeat only bumps the observation counter
+    assert len(saved_rows(mock_db)) == 1
+    mock_db.record_observations_batch.assert_awaited_once_with([("t6", 1)])
+    assert job_updates(mock_db) == [("t6", "success", None)]
+
+
+@patch("services.scraper_worker.main.HttpFetcher")
+@patch("services.scraper_worker.main.create_redis")
+@patch("services.scraper_worker.main.AsyncDBManager")
+@patch("services.scraper_worker.main.AlertManager")
+@patch("services.scraper_worker.main.PlaywrightDriver")
+def test_queue_mode_scrapes_claimed_jobs_and_acks_them(
+    mock_driver_cls, mock_alert_cls, mock_db_cls, mock_create_redis, mock_http_cls, monkeypatch
+):
+    monkeypatch.setenv("SCRAPER_MODE", "queue")
+    mock_create_redis.return_value = make_redis()
+    mock_db = AsyncMock()
+    mock_db.get_latest_prices.return_value = {}
+    mock_db_cls.return_value = mock_db
+    worker = ScraperWorker()
+
+    first = Job(message_id="1-0", target={"id": "t1", "domain": "a.com"}, enqueued_at=0)
+    second = Job(message_id="2-0", target={"id": "t2", "domain": "b.com"}, enqueued_at=0)
+    worker.jobs = AsyncMock()
+
+    batches = [[first, second]]
+
+    async def claim(count):
+        if batches:
+            return batches.pop()
+        # Stop the otherwise endless consume loop once both jobs are acked
+        while worker.jobs.ack.await_count < 2:
+            await asyncio.sleep(0.01)
+        raise asyncio.CancelledError()
+
+    worker.jobs.claim.side_effect = claim
+    worker.scrape_target = AsyncMock()
+    worker.control.refresh = AsyncMock()
+    worker.executor.domain_delay = 0
+
+    try:
+        run(worker._consume_loop())
+    except asyncio.CancelledError:
+        pass
+
+    scraped = {call.args[0]["id"] for call in worker.scrape_target.await_args_list}
+    assert scraped == {"t1", "t2"}
+    acked = {call.args[0].message_id for call in worker.jobs.ack.await_args_list}
+    assert acked == {"1-0", "2-0"}
+
+
+@patch("services.scraper_worker.main.HttpFetcher")
+@patch("services.scraper_worker.main.create_redis")
+@patch("services.scraper_worker.main.AsyncDBManager")
+@patch("services.scraper_worker.main.AlertManager")
+@patch("services.scraper_worker.main.PlaywrightDriver")
+def test_scrape_waits_for_token_and_uses_admitted_proxy(
+    mock_driver_cls, mock_alert_cls, mock_db_cls, mock_create_redis, mock_http_cls, monkeypatch
+):
+    monkeypatch.setenv("PROXY_LIST", "http://p1:8080")
+    _failing_http(mock_http_cls)
+    mock_redis = make_redis()
+    # Throttled for 10ms, then admitted
+    mock_redis.bucket.side_effect = [10, 0]
+    mock_create_redis.return_value = mock_redis
+    mock_driver = MagicMock()
+    mock_driver.fetch_page = AsyncMock(side_effect=RuntimeError("network error"))
+    mock_driver_cls.return_value = mock_driver
+    mock_db_cls.return_value = AsyncMock()
+
+    worker = ScraperWorker()
+    scrape_and_flush(worker, {"id": "t7", "domain": "amazon.in", "url": "https://example.com"})
+
+    bucket_keys = mock_redis.bucket.await_args.kwargs["keys"]
+    assert bucket_keys == [
+        "rate_limit:amazon.in",
+        "rate_limit:bucket:amazon.in",
+        "rate_limit:bucket:amazon.in:http://p1:8080",
+    ]
+    mock_driver.fetch_page.assert_awaited_once()
+    call = mock_driver.fetch_page.await_args
+    assert call.kwargs["proxy"] == "http://p1:8080"
+    # The browser session is bound to the admitted proxy
+    assert call.kwargs["session"].proxy == "http://p1:8080"
+
+
+@patch("services.scraper_worker.main.HttpFetcher")
+@patch("services.scraper_worker.main.create_redis")
+@patch("services.scraper_worker.main.AsyncDBManager")
+@patch("services.scraper_worker.main.AlertManager")
+@patch("services.scraper_worker.main.PlaywrightDriver")
+def test_scrape_waits_out_site_blocks_instead_of_using_a_blocked_proxy(
+    mock_driver_cls, mock_alert_cls, mock_db_cls, mock_create_redis, mock_http_cls, monkeypatch
+):
+    monkeypatch.setenv("PROXY_LIST", "http://p1:8080,http://p2:8080")
+    _failing_http(mock_http_cls)
+    mock_create_redis.return_value = make_redis()
+    mock_driver = MagicMock()
+    mock_driver.fetch_page = AsyncMock(side_effect=RuntimeError("network error"))
+    mock_driver_cls.return_value = mock_driver
+    mock_db_cls.return_value = AsyncMock()
+
+    worker = ScraperWorker()
+    proxies = worker.proxy_manager
+    # p1 is blocked for longer than the test; p2's block ends in 50ms
+    for proxy, recovery in (("http://p1:8080", 300), ("http://p2:8080", 0.05)):
+        proxies._recovery_time = recovery
+        for _ in range(3):
+            proxies.mark_blocked(proxy, "amazon.in")
+    target = {"id": "t13", "domain": "amazon.in", "url": "https://example.com"}
+
+    assert 0 < run(worker._admit(target)) <= 0.1
+    scrape_and_flush(worker, target)
+
+    call = mock_driver.fetch_page.await_args
+    assert call.kwargs["proxy"] == "http://p2:8080"
+    assert call.kwargs["session"].proxy == "http://p2:8080"
+
+
+@patch("services.scraper_worker.main.HttpFetcher")
+@patch("services.scraper_worker.main.create_redis")
+@patch("services.scraper_worker.main.AsyncDBManager")
+@patch("services.scraper_worker.main.AlertManager")
+@patch("services.scraper_worker.main.PlaywrightDriver")
+def test_throttling_status_backs_off_without_browser_retry(
+    mock_driver_cls, mock_alert_cls, mock_db_cls, mock_create_redis, mock_http_cls
+):
+    mock_http = MagicMock()
+    mock_http.fetch_page = AsyncMock(
+        return_value={"status": 429, "html": "", "proxy": None, "user_agent": "UA", "response_time_ms": 5}
+    )
+    mock_http_cls.return_value = mock_http
+    mock_redis = make_redis()
+    mock_create_redis.return_value = mock_redis
+    mock_driver = MagicMock()
+    mock_driver.fetch_page = AsyncMock()
+    mock_driver_cls.return_value = mock_driver
+    mock_db = AsyncMock()
+    mock_db_cls.return_value = mock_db
+
+    worker = ScraperWorker()
+    scrape_and_flush(worker, {"id": "t8", "domain": "amazon.in", "url": "https://example.com"})
+
+    mock_driver.fetch_page.assert_not_called()
+    assert aimd_events(mock_redis) == ["throttle"]
+    assert job_updates(mock_db) == [("t8", "failed", "HTTP 429")]
+
+
+@patch("services.scraper_worker.main.HttpFetcher")
+@patch("services.scraper_worker.main.create_redis")
+@patch("services.scraper_worker.main.AsyncDBManager")
+@patch("services.scraper_worker.main.AlertManager")
+@patch("services.scraper_worker.main.PlaywrightDriver")
+def test_repeated_timeouts_open_domain_circuit(
+    mock_driver_cls, mock_alert_cls, mock_db_cls, mock_create_redis, mock_http_cls, monkeypatch
+):
+    monkeypatch.setenv("CIRCUIT_FAILURE_THRESHOLD", "2")
+    # One failure per scrape; retries are covered separately
+    monkeypatch.setenv("FETCH_MAX_ATTEMPTS", "1")
+    _failing_http(mock_http_cls)
+    mock_redis = make_redis()
+    mock_create_redis.return_value = mock_redis
+    mock_driver = MagicMock()
+    mock_driver.fetch_page = AsyncMock(side_effect=asyncio.TimeoutError())
+    mock_driver_cls.return_value = mock_driver
+    mock_db_cls.return_value = AsyncMock()
+    mock_alerts = MagicMock()
+    mock_alert_cls.return_value = mock_alerts
+
+    worker = ScraperWorker()
+    for target_id in ("t9", "t10"):
+        scrape_and_flush(worker, {"id": target_id, "domain": "amazon.in", "url": "https://example.com"})
+
+    mock_alerts.alert_repeated_errors.assert_called_once()
+    # The gate now holds the domain back without taking tokens
+    admitted = mock_redis.bucket.await_count
+    wait = run(worker._admit({"id": "t11", "domain": "amazon.in", "url": "https://example.com"}))
+    assert wait > 0
+    assert mock_redis.bucket.await_count == admitted
+    assert run(worker._admit({"id": "t12", "domain": "flipkart.com", "url": "https://example.com"})) == 0
+
+
+@patch("services.scraper_worker.main.HttpFetcher")
+@patch("services.scraper_worker.main.create_redis")
+@patch("services.scraper_worker.main.AsyncDBManager")
+@patch("services.scraper_worker.main.AlertManager")
+@patch("services.scraper_worker.main.PlaywrightDriver")
+def test_proxy_error_is_retried_through_another_proxy_with_a_new_token(
+    mock_driver_cls, mock_alert_cls, mock_db_cls, mock_create_redis, mock_http_cls, monkeypatch
+):
+    monkeypatch.setenv("PROXY_LIST", "http://p1:8080,http://p2:8080")
+    monkeypatch.setattr("services.scraper_worker.retry_decorator.asyncio.sleep", AsyncMock())
+    _failing_http(mock_http_cls)
+    mock_redis = make_redis()
+    mock_create_redis.return_value = mock_redis
+    mock_driver = MagicMock()
+    mock_driver.fetch_page = AsyncMock(
+        side_effect=[
+            RuntimeError("net::ERR_PROXY_CONNECTION_FAILED"),
+            {
+                "status": 200,
+                "html": "<span class='a-price-whole'>1,999</span>",
+                "proxy": "http://p2:8080",
+                "user_agent": "UA",
+                "response_time_ms": 100,
+            },
+        ]
+    )
+    mock_driver_cls.return_value = mock_driver
+    mock_db = AsyncMock()
+    mock_db.get_latest_price.return_value = None
+    mock_db_cls.return_value = mock_db
+
+    worker = ScraperWorker()
+    worker._pick_proxy = MagicMock(side_effect=["http://p1:8080", "http://p2:8080"])
+    scrape_and_flush(worker, {"id": "t14", "domain": "amazon.in", "url": "https://example.com"})
+
+    proxies = [call.kwargs["proxy"] for call in mock_driver.fetch_page.await_args_list]
+    assert proxies == ["http://p1:8080", "http://p2:8080"]
+    assert worker._pick_proxy.call_args_list[1].kwargs == {"exclude": "http://p1:8080"}
+    # One token for the first attempt and one for the retry, on each proxy
+    assert [call.kwargs["keys"][-1] for call in mock_redis.bucket.await_args_list] == [
+        "rate_limit:bucket:amazon.in:http://p1:8080",
+        "rate_limit:bucket:amazon.in:http://p2:8080",
+    ]
+    assert job_updates(mock_db) == [("t14", "success", None)]
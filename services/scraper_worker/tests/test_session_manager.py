@@ -0,0 +1,161 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from prometheus_client import REGISTRY
+
+from services.scraper_worker.session_manager import Session, SessionManager, age_bucket
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class FakeRedis:
+    """Just enough of redis.asyncio for the session lists and keys."""
+
+    def __init__(self):
+        self.lists = {}
+        self.values = {}
+
+    async def lpop(self, key):
+        items = self.lists.get(key)
+        return items.pop(0) if items else None
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def delete(self, key):
+        self.values.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class Pipeline:
+            def __init__(self):
+                self.ops = []
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            def set(self, key, value, px=None):
+                self.ops.append(lambda: redis.values.__setitem__(key, value))
+
+            def rpush(self, key, value):
+                self.ops.append(lambda: redis.lists.setdefault(key, []).append(value))
+
+            def pexpire(self, key, ms):
+                pass
+
+            async def execute(self):
+                for op in self.ops:
+                    op()
+
+        return Pipeline()
+
+
+def test_checkout_without_idle_sessions_creates_one():
+    manager = SessionManager(FakeRedis(), enabled=True)
+
+    session = run(manager.checkout("amazon.in", "http://p1:8080"))
+
+    assert session.domain == "amazon.in"
+    assert session.proxy == "http://p1:8080"
+    assert session.uses == 0
+    assert session.storage_state is None
+
+
+def test_checked_in_session_is_reused_with_its_cookies():
+    redis = FakeRedis()
+    manager = SessionManager(redis, enabled=True)
+
+    first = run(manager.checkout("amazon.in", "http://p1:8080"))
+    first.storage_state = {"cookies": [{"name": "session-id", "value": "abc"}], "origins": []}
+    run(manager.checkin(first, latency_ms=1200))
+    again = run(manager.checkout("amazon.in", "http://p1:8080"))
+
+    assert again.id == first.id
+    assert again.uses == 1
+    assert again.user_agent == first.user_agent
+    assert again.storage_state == first.storage_state
+    # Sessions are bound to their proxy
+    run(manager.checkin(again))
+    assert run(manager.checkout("amazon.in", "http://p2:8080")).id != first.id
+
+
+def test_blocked_session_is_retired():
+    redis = FakeRedis()
+    manager = SessionManager(redis, enabled=True)
+
+    session = run(manager.checkout("amazon.in"))
+    run(manager.checkin(session))
+    session = run(manager.checkout("amazon.in"))
+    run(manager.checkin(session, blocked="captcha"))
+
+    assert f"session:{session.id}" not in redis.values
+    assert run(manager.checkout("amazon.in")).id != session.id
+
+
+def test_fetch_outcomes_are_counted_with_the_actual_retire_reason():
+    manager = SessionManager(FakeRedis(), enabled=True)
+
+    def sample(name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    before = {
+        "error": sample("scraper_session_fetches_total", domain="myntra.com", age="1", result="error"),
+        "latency": sample("scraper_session_fetch_seconds_count", age="1"),
+        "429": sample("scraper_sessions_retired_total", domain="myntra.com", reason="http_429"),
+    }
+    run(manager.checkin(run(manager.checkout("myntra.com")), error=True))
+    run(manager.checkin(run(manager.checkout("myntra.com", "http://p9")), blocked="http_429", latency_ms=300))
+
+    assert sample("scraper_session_fetches_total", domain="myntra.com", age="1", result="error") == before["error"] + 1
+    # Only the fetch that got a response has a latency
+    assert sample("scraper_session_fetch_seconds_count", age="1") == before["latency"] + 1
+    assert sample("scraper_sessions_retired_total", domain="myntra.com", reason="http_429") == before["429"] + 1
+
+
+def test_sessions_expire_after_max_uses_and_age(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("services.scraper_worker.session_manager.time.time", lambda: now[0])
+    redis = FakeRedis()
+    manager = SessionManager(redis, enabled=True, max_uses=2, max_age=600)
+
+    session = run(manager.checkout("amazon.in"))
+    run(manager.checkin(session))
+    session = run(manager.checkout("amazon.in"))
+    run(manager.checkin(session))
+    assert run(manager.checkout("amazon.in")).id != session.id
+
+    aged = run(manager.checkout("flipkart.com"))
+    run(manager.checkin(aged))
+    now[0] += 601
+    assert run(manager.checkout("flipkart.com")).id != aged.id
+    assert f"session:{aged.id}" not in redis.values
+
+
+def test_redis_errors_fall_back_to_a_fresh_session():
+    redis = MagicMock()
+    redis.lpop = AsyncMock(side_effect=ConnectionError("down"))
+    redis.pipeline.side_effect = ConnectionError("down")
+    manager = SessionManager(redis, enabled=True)
+
+    session = run(manager.checkout("amazon.in"))
+    run(manager.checkin(session))
+
+    assert isinstance(session, Session)
+    assert session.uses == 1
+
+
+def test_disabled_sessions_check_out_nothing():
+    manager = SessionManager(FakeRedis(), enabled=False)
+
+    assert run(manager.checkout("amazon.in")) is None
+    run(manager.checkin(None))
+
+
+def test_age_bucket():
+    assert [age_bucket(n) for n in (1, 3, 10, 50)] == ["1", "2-5", "6-20", "21+"]
@@ -0,0 +1,85 @@
+import asyncio
+from collections import Counter
+from unittest.mock import AsyncMock, MagicMock
+
+from services.scraper_worker.sharding import HashRing, ShardMembership
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class FakePipeline:
+    def __init__(self, results):
+        self.calls = []
+        self.results = results
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append(name)
+
+    async def execute(self):
+        return self.results
+
+
+KEYS = [f"target-{i}" for i in range(3000)]
+
+
+def test_ring_spreads_keys_roughly_evenly():
+    ring = HashRing(["a", "b", "c"])
+    load = Counter(ring.owner(k) for k in KEYS)
+
+    assert set(load) == {"a", "b", "c"}
+    assert min(load.values()) > len(KEYS) / 3 * 0.75
+
+
+def test_adding_a_member_only_moves_keys_to_it():
+    before = HashRing(["a", "b", "c"])
+    after = HashRing(["a", "b", "c", "d"])
+
+    moved = [k for k in KEYS if before.owner(k) != after.owner(k)]
+
+    assert all(after.owner(k) == "d" for k in moved)
+    # Roughly the new member's fair share, not a reshuffle
+    assert len(KEYS) * 0.15 < len(moved) < len(KEYS) * 0.35
+
+
+def test_heartbeat_rebuilds_ring_from_live_members():
+    client = MagicMock()
+    client.pipeline.return_value = FakePipeline([1, 0, ["w1", "w2"]])
+    shard = ShardMembership(client, member_id="w1", key="members", ttl=30)
+
+    run(shard.heartbeat())
+
+    assert shard.ring.members == ("w1", "w2")
+    assert client.pipeline.return_value.calls == ["zadd", "zremrangebyscore", "zrange"]
+    owned = shard.filter([{"id": k} for k in KEYS])
+    assert 0 < len(owned) < len(KEYS)
+    assert all(shard.ring.owner(t["id"]) == "w1" for t in owned)
+
+
+def test_failed_heartbeat_keeps_last_known_ring():
+    client = MagicMock()
+    client.pipeline.return_value = FakePipeline([1, 0, ["w1", "w2"]])
+    shard = ShardMembership(client, member_id="w1")
+    run(shard.heartbeat())
+
+    client.pipeline.side_effect = ConnectionError("redis down")
+    run(shard.heartbeat())
+
+    assert shard.ring.members == ("w1", "w2")
+
+
+def test_close_leaves_the_ring():
+    client = MagicMock()
+    client.zrem = AsyncMock()
+    shard = ShardMembership(client, member_id="w1", key="members")
+
+    run(shard.close())
+
+    client.zrem.assert_awaited_once_with("members", "w1")
@@ -0,0 +1,115 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+from services.scraper_worker.write_buffer import WriteBehindBuffer
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_flush_writes_prices_and_deduplicated_job_updates_in_bulk():
+    db = AsyncMock()
+    db.save_price_history_batch.return_value = True
+    db.update_scrape_jobs_batch.return_value = True
+    buffer = WriteBehindBuffer(db, max_batch=100, flush_interval=60)
+
+    buffer.add_price({"target_id": "t1", "price": 10.0})
+    buffer.add_price({"target_id": "t2", "price": 20.0})
+    buffer.add_job_update("t1", "failed", "timeout")
+    buffer.add_job_update("t1", "success")
+    buffer.add_job_update("t2", "success")
+    run(buffer.flush())
+
+    db.save_price_history_batch.assert_awaited_once()
+    assert len(db.save_price_history_batch.await_args.args[0]) == 2
+    db.update_scrape_jobs_batch.assert_awaited_once_with([("t1", "success", None), ("t2", "success", None)])
+    assert buffer.pending == 0
+
+
+def test_failed_flush_is_retried_on_close():
+    db = AsyncMock()
+    db.save_price_history_batch.side_effect = [False, True]
+    db.update_scrape_jobs_batch.return_value = True
+    buffer = WriteBehindBuffer(db, max_batch=100, flush_interval=60)
+
+    buffer.add_price({"target_id": "t1", "price": 10.0})
+    run(buffer.flush())
+    assert buffer.pending == 1
+
+    run(buffer.close())
+    assert db.save_price_history_batch.await_count == 2
+    assert buffer.pending == 0
+
+
+def test_background_loop_flushes_when_batch_size_reached():
+    db = AsyncMock()
+    db.save_price_history_batch.return_value = True
+    db.update_scrape_jobs_batch.return_value = True
+
+    async def scenario():
+        buffer = WriteBehindBuffer(db, max_batch=2, flush_interval=60)
+        await buffer.start()
+        buffer.add_price({"target_id": "t1", "price": 1.0})
+        buffer.add_price({"target_id": "t2", "price": 2.0})
+        for _ in range(50):
+            if db.save_price_history_batch.await_count:
+                break
+            await asyncio.sleep(0.01)
+        await buffer.close()
+
+    run(scenario())
+
+    db.save_price_history_batch.assert_awaited_once()
+
+
+def test_close_during_a_flush_waits_for_it_and_loses_nothing():
+    db = AsyncMock()
+    writing = asyncio.Event()
+    saved = []
+
+    async def save_prices(rows):
+        writing.set()
+        await asyncio.sleep(0.05)
+        saved.extend(rows)
+        return True
+
+    db.save_price_history_batch.side_effect = save_prices
+    db.update_scrape_jobs_batch.return_value = True
+
+    async def scenario():
+        buffer = WriteBehindBuffer(db, max_batch=2, flush_interval=60)
+        await buffer.start()
+        for i in range(2):
+            buffer.add_price({"target_id": f"t{i}", "price": 1.0})
+            buffer.add_job_update(f"t{i}", "success")
+        await writing.wait()
+        buffer.add_price({"target_id": "t2", "price": 2.0})
+        await buffer.close()
+        return buffer
+
+    buffer = run(scenario())
+
+    assert [row["target_id"] for row in saved] == ["t0", "t1", "t2"]
+    jobs = [job for call in db.update_scrape_jobs_batch.await_args_list for job in call.args[0]]
+    assert sorted(job[0] for job in jobs) == ["t0", "t1"]
+    assert buffer.pending == 0
+
+
+def test_job_update_waits_for_its_failed_price_row():
+    db = AsyncMock()
+    db.save_price_history_batch.side_effect = [False, True]
+    db.update_scrape_jobs_batch.return_value = True
+    buffer = WriteBehindBuffer(db, max_batch=100, flush_interval=60)
+
+    buffer.add_price({"target_id": "t1", "price": 10.0})
+    buffer.add_job_update("t1", "success")
+    buffer.add_job_update("t2", "failed", "timeout")
+    run(buffer.flush())
+
+    db.update_scrape_jobs_batch.assert_awaited_once_with([("t2", "failed", "timeout")])
+    assert buffer.pending == 2
+
+    run(buffer.flush())
+    assert db.update_scrape_jobs_batch.await_args.args[0] == [("t1", "success", None)]
+    assert buffer.pending == 0
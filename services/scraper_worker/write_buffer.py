@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from prometheus_client import Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+BUFFER_PENDING = Gauge("scraper_write_buffer_pending", "Writes waiting to be flushed", ["kind"])
+FLUSH_ROWS = Histogram(
+    "scraper_write_buffer_flush_rows",
+    "Rows written per flush",
+    ["kind"],
+    buckets=(1, 10, 50, 100, 250, 500, 1000, 2500),
+)
+FLUSH_SECONDS = Histogram(
+    "scraper_write_buffer_flush_seconds",
+    "Time spent flushing buffered writes",
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+
+class WriteBehindBuffer:
+    """
+    Accumulates scrape results and writes them to Postgres in bulk.
+
+    Unchanged-price sightings are coalesced per target into a counter bump on
+    the latest price_history row instead of a new row.
+
+    Flushes happen when any buffer reaches ``max_batch`` or every
+    ``flush_interval`` seconds, and always on ``close()``, which lets an
+    in-flight flush finish first. Price rows are written before job status
+    updates, and a job's update is held back while its price row is waiting
+    to be retried, so a job never reads 'success' without its price. Failed
+    flushes are retried on the next cycle up to ``max_pending`` rows.
+    """
+
+    def __init__(
+        self,
+        db,
+        max_batch: int = None,
+        flush_interval: float = None,
+        max_pending: int = None,
+    ):
+        self.db = db
+        self.max_batch = max_batch or int(os.getenv("WRITE_BUFFER_MAX_BATCH", "500"))
+        self.flush_interval = flush_interval or float(os.getenv("WRITE_BUFFER_FLUSH_SECONDS", "2.0"))
+        self.max_pending = max_pending or self.max_batch * 20
+        self._prices: List[Dict] = []
+        # Keyed by job id: only the latest status per job needs writing
+        self._jobs: Dict[str, Tuple[str, Optional[str]]] = {}
+        # Unchanged-price sightings per target since the last flush
+        self._observations: Dict[str, int] = {}
+        self._flush_lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._prices) + len(self._jobs) + len(self._observations)
+
+    def _update_gauges(self):
+        BUFFER_PENDING.labels(kind="price_history").set(len(self._prices))
+        BUFFER_PENDING.labels(kind="scrape_jobs").set(len(self._jobs))
+        BUFFER_PENDING.labels(kind="observations").set(len(self._observations))
+
+    def _maybe_wake(self):
+        self._update_gauges()
+        if max(len(self._prices), len(self._jobs), len(self._observations)) >= self.max_batch:
+            self._wake.set()
+
+    def add_price(self, row: Dict):
+        self._prices.append(row)
+        self._maybe_wake()
+
+    def add_observation(self, target_id: str):
+        self._observations[target_id] = self._observations.get(target_id, 0) + 1
+        self._maybe_wake()
+
+    def add_job_update(self, job_id: str, status: str, error: str = None):
+        self._jobs[job_id] = (status, error)
+        self._maybe_wake()
+
+    async def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Write buffer flush failed: {e}")
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self.pending:
+                return
+            prices, self._prices = self._prices, []
+            observations, self._observations = self._observations, {}
+            jobs, self._jobs = self._jobs, {}
+            start = time.perf_counter()
+
+            failed_prices: List[Dict] = []
+            for i in range(0, len(prices), self.max_batch):
+                chunk = prices[i:i + self.max_batch]
+                if await self.db.save_price_history_batch(chunk):
+                    FLUSH_ROWS.labels(kind="price_history").observe(len(chunk))
+                else:
+                    failed_prices.extend(chunk)
+
+            # After the inserts, so a sighting always lands on the newest row
+            seen = list(observations.items())
+            failed_observations: Dict[str, int] = {}
+            for i in range(0, len(seen), self.max_batch):
+                chunk = seen[i:i + self.max_batch]
+                if await self.db.record_observations_batch(chunk):
+                    FLUSH_ROWS.labels(kind="observations").observe(len(chunk))
+                else:
+                    failed_observations.update(chunk)
+
+            # Jobs are keyed by target id; one whose price row failed waits for it
+            unsaved = {str(row.get("target_id")) for row in failed_prices}
+            failed_jobs: Dict[str, Tuple[str, Optional[str]]] = {
+                job_id: update for job_id, update in jobs.items() if str(job_id) in unsaved
+            }
+            updates = [
+                (job_id, status, error)
+                for job_id, (status, error) in jobs.items()
+                if job_id not in failed_jobs
+            ]
+            for i in range(0, len(updates), self.max_batch):
+                chunk = updates[i:i + self.max_batch]
+                if await self.db.update_scrape_jobs_batch(chunk):
+                    FLUSH_ROWS.labels(kind="scrape_jobs").observe(len(chunk))
+                else:
+                    failed_jobs.update({job_id: (status, error) for job_id, status, error in chunk})
+
+            self._requeue(failed_prices, failed_jobs, failed_observations)
+            FLUSH_SECONDS.observe(time.perf_counter() - start)
+            self._update_gauges()
+
+    def _requeue(
+        self,
+        prices: List[Dict],
+        jobs: Dict[str, Tuple[str, Optional[str]]],
+        observations: Dict[str, int],
+    ):
+        if prices:
+            room = max(0, self.max_pending - len(self._prices))
+            if room < len(prices):
+                logger.error(f"Write buffer full, dropping {len(prices) - room} price rows")
+            self._prices = prices[:room] + self._prices
+        for target_id, count in observations.items():
+            self._observations[target_id] = self._observations.get(target_id, 0) + count
+        for job_id, update in jobs.items():
+            # Newer updates added during the flush win over the failed ones
+            self._jobs.setdefault(job_id, update)
+
+    async def close(self):
+        if self._task is not None:
+            # Stop the loop instead of cancelling it: a cancelled flush would
+            # lose the rows it had already taken out of the buffers
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        if self.pending:
+            logger.error(f"Write buffer closed with {self.pending} unflushed writes")